@@ -1,55 +1,42 @@
 # -*- coding: utf-8 -*-
-import boto3
 import pandas as pd
 import traceback
 from datetime import datetime, timedelta, UTC
-from botocore.exceptions import ClientError, BotoCoreError
+import cw_metrics
+from cw_metrics import fetch_metric_arrays, ecs_running_tasks_query, retention_segments, to_frame
+from metric_cache import MetricCache, fetch_cached
+from downtime_engine import analyze_segments, to_arrays
+from rollups import RollupStore
+from metric_discovery import MetricDiscovery
+import aws_clients
+
+# Where RunningTaskCount may be published, in order of preference
+RUNNING_TASKS_METRICS = [("ECS/ContainerInsights", "RunningTaskCount"), ("AWS/ECS", "RunningTaskCount")]
 
 # ---------------- CUSTOM EXCEPTIONS ---------------- #
 class AWSInitError(Exception): pass
 class MetricFetchError(Exception): pass
 
-def init_clients(region):
+def init_clients(region, role_arn=None):
+    # Pooled per (role, region); repeated calls reuse the same client
     try:
-        return boto3.client("cloudwatch", region_name=region)
-    except Exception as e:
+        return aws_clients.get_client("cloudwatch", region, role_arn)
+    except aws_clients.AWSInitError as e:
         raise AWSInitError("Failed to initialize CloudWatch client") from e
 
-def get_ecs_app_downtime(cluster, service, region, start, end):
-    cw = init_clients(region)
-    all_datapoints = []
-    
-    # Chunking: 5 days max per request
-    delta = timedelta(days=5)
-    current_start = start
-
+def summarize_ecs_datapoints(service, ts, values, start, end, now=None, rollups=None, resource=None):
+    """(epoch seconds, RunningTaskCount) arrays for one service -> (df, downtime minutes)"""
     print(f"  Checking {service}...")
+    print(f"    Found {len(ts)} datapoints")
 
-    while current_start < end:
-        current_end = min(current_start + delta, end)
-        try:
-            response = cw.get_metric_statistics(
-                Namespace="ECS/ContainerInsights",  # FIXED: Correct namespace
-                MetricName="RunningTaskCount",
-                Dimensions=[
-                    {"Name": "ClusterName", "Value": cluster},
-                    {"Name": "ServiceName", "Value": service}
-                ],
-                StartTime=current_start,
-                EndTime=current_end,
-                Period=300,  # 5 minutes
-                Statistics=["Average"]
-            )
-            all_datapoints.extend(response.get("Datapoints", []))
-        except ClientError as e:
-            print(f"    API Error chunk {current_start}: {e}")
-            # Continue to next chunk
-        
-        current_start = current_end
-
-    print(f"    Found {len(all_datapoints)} datapoints")
+    # Downtime: Average == 0 OR gaps in data = downtime (missing buckets on the grid;
+    # 5-min buckets, hourly for data older than 63 days)
+    segments = retention_segments(start, end, 300, now)
+    result = analyze_segments(ts, values, segments)
+    if rollups is not None:
+        rollups.record(resource or service, result, start, end, gaps_as_down=True)
 
-    if not all_datapoints:
+    if not len(ts):
         # NO DATA = 100% downtime (service never ran)
         total_periods = int((end - start).total_seconds() / 300)
         downtime_minutes = total_periods * 5
@@ -64,25 +51,71 @@ def get_ecs_app_downtime(cluster, service, region, start, end):
         })
         return df, downtime_minutes
 
-    # Process data
-    all_datapoints = sorted(all_datapoints, key=lambda x: x["Timestamp"])
-    df = pd.DataFrame(all_datapoints)
-    df["Timestamp"] = pd.to_datetime(df["Timestamp"])
-    df["Service"] = "ECS"
-    df["Resource"] = service
-    df.rename(columns={"Average": "MetricValue"}, inplace=True)
+    # Columnar frame straight from the fetched arrays (already time-ordered)
+    df = to_frame(ts, values, "ECS", service)
 
-    # Downtime: Average == 0 OR gaps in data = downtime
-    downtime_minutes = sum(5 for d in all_datapoints if d["Average"] == 0)
-    
-    # Account for data gaps (missing datapoints = downtime)
-    expected_points = int((end - start).total_seconds() / 300)
-    gap_downtime = max(0, expected_points - len(all_datapoints)) * 5
+    downtime_minutes = result.downtime_minutes
+    gap_downtime = result.gap_minutes
     total_downtime = downtime_minutes + gap_downtime
     
-    print(f"    Recorded downtime: {downtime_minutes} min + gaps: {gap_downtime} min")
+    print(f"    Recorded downtime: {downtime_minutes:.0f} min ({len(result.outages)} outages)"
+          f" + gaps: {gap_downtime:.0f} min ({len(result.gaps)} gaps)")
     
-    return df[["Timestamp", "Service", "Resource", "MetricValue"]], total_downtime
+    return df, total_downtime
+
+def no_metrics(service, start, tried=RUNNING_TASKS_METRICS):
+    """Result for a service that publishes no RunningTaskCount at all: unknown, not down."""
+    namespaces = " or ".join(namespace for namespace, _ in tried)
+    print(f"  Checking {service}...")
+    print(f"    ⚠️  NO METRICS PUBLISHED (no RunningTaskCount in {namespaces}) - not counted as downtime")
+    df = pd.DataFrame({"Timestamp": [start], "Service": ["ECS"], "Resource": [service], "MetricValue": [float("nan")]})
+    return df, None
+
+def get_ecs_cluster_downtime(cluster, services, region, start, end, cache=None, role_arn=None, rollups=None,
+                             discovery=None):
+    """
+    All services of a cluster in batched GetMetricData calls -> {service: (df, downtime)}
+    rollups: optional RollupStore; full days are stored under "ecs/<account>/<region>/<cluster>/<service>"
+    discovery: optional MetricDiscovery; services with no published series are not fetched
+    and come back with downtime None
+    """
+    cw = init_clients(region, role_arn)
+    now = datetime.now(UTC)
+    namespaces = {service: RUNNING_TASKS_METRICS[0][0] for service in services}
+    if discovery is not None:
+        for service in services:
+            found = discovery.resolve(cw, RUNNING_TASKS_METRICS, {"ClusterName": cluster, "ServiceName": service},
+                                      filters={"ClusterName": cluster})
+            namespaces[service] = found[0] if found else None
+        discovery.save()
+    queries = {
+        service: ecs_running_tasks_query(cluster, service, namespace=namespaces[service], period=300)
+        for service in services if namespaces[service]
+    }
+
+    try:
+        if cache is not None:
+            cached = fetch_cached(cw, cache, queries, start, end, now=now)
+            series = {service: to_arrays(cached.pop(service)) for service in queries}
+        else:
+            series = fetch_metric_arrays(cw, queries, start, end, now=now)
+    except cw_metrics.MetricFetchError as e:
+        raise MetricFetchError(f"Failed to fetch ECS metrics for cluster {cluster}") from e
+
+    # Same cluster/service names may exist in other accounts and regions
+    prefix = "ecs/{}/{}/{}".format(*aws_clients.client_scope(cw), cluster) if rollups is not None else None
+
+    # Popped so only the returned frames keep each service's arrays alive
+    return {
+        service: summarize_ecs_datapoints(
+            service, *series.pop(service), start, end, now,
+            rollups=rollups, resource=f"{prefix}/{service}"
+        ) if service in series else no_metrics(service, start)
+        for service in services
+    }
+
+def get_ecs_app_downtime(cluster, service, region, start, end, cache=None):
+    return get_ecs_cluster_downtime(cluster, [service], region, start, end, cache)[service]
 
 if __name__ == "__main__":
     try:
@@ -104,9 +137,22 @@ if __name__ == "__main__":
         print(f"Services: {ECS_SERVICES}")
 
         all_reports = []
+        cache = MetricCache()  # only missing / still-mutable ranges hit CloudWatch
+        rollups = RollupStore()  # daily summaries for rollups.py SLO reports
+        discovery = MetricDiscovery()  # skips services that publish no RunningTaskCount
+        results = get_ecs_cluster_downtime(ECS_CLUSTER, ECS_SERVICES, REGION, START, END, cache,
+                                           rollups=rollups, discovery=discovery)
+        rollups.close()
+        cache.close()
 
         for service in ECS_SERVICES:
-            ecs_df, ecs_down = get_ecs_app_downtime(ECS_CLUSTER, service, REGION, START, END)
+            ecs_df, ecs_down = results[service]
+
+            if ecs_down is None:
+                print(f"\n❔ {service}: no metrics published - not counted as downtime")
+                all_reports.append({"Service": service, "Downtime_Min": None, "Uptime_Pct": None,
+                                    "Status": "NO METRICS"})
+                continue
 
             # Save CSV
             output_file = f"cloudwatch_downtime_metrics_{service}.csv"
@@ -121,7 +167,8 @@ if __name__ == "__main__":
             print(f"   Uptime:   {uptime_pct:.1f}%")
             print(f"   Saved:    {output_file}")
 
-            all_reports.append({"Service": service, "Downtime_Min": ecs_down, "Uptime_Pct": uptime_pct})
+            all_reports.append({"Service": service, "Downtime_Min": ecs_down, "Uptime_Pct": uptime_pct,
+                                "Status": "OK" if ecs_down == 0 else "DOWNTIME"})
 
         # Summary table
         summary_df = pd.DataFrame(all_reports)
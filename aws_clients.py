@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Shared boto3 client pool keyed by (account role / profile, region, service)
+Sessions and clients are created once per key and reused by every report;
+each client keeps its own keep-alive HTTPS connection pool
+"""
+
+import threading
+import boto3
+import botocore.session
+from botocore.config import Config
+from botocore.credentials import (
+    AssumeRoleCredentialFetcher, CredentialProvider, CredentialResolver, DeferredRefreshableCredentials
+)
+
+ASSUME_ROLE_SESSION_NAME = "downtime-report"
+ASSUME_ROLE_SECONDS = 3600
+
+# Connection pool per client; keep >= the thread count sharing it (urllib3 drops extras)
+MAX_POOL_CONNECTIONS = 32
+# "adaptive" adds client-side rate limiting. One attempt per call: aws_retry.call_with_backoff
+# is the only retry layer, so throttled calls are not retried inside each of its attempts.
+RETRY_MODE = "adaptive"
+RETRY_TOTAL_ATTEMPTS = 1
+TCP_KEEPALIVE = True
+
+_lock = threading.Lock()
+_sessions = {}   # (role_arn, profile) -> boto3.Session
+_clients = {}    # (role_arn, profile, region, service, max_pool_connections, endpoint_url) -> client
+_owners = {}     # id(pooled client) -> (role_arn, profile)
+_accounts = {}   # profile -> account id of its default credentials
+
+
+class AWSInitError(Exception): pass
+
+
+class _AssumeRoleProvider(CredentialProvider):
+    METHOD = "assume-role"
+
+    def __init__(self, credentials):
+        self.credentials = credentials
+
+    def load(self):
+        return self.credentials
+
+
+def _assumed_role_session(role_arn, profile):
+    base = botocore.session.Session(profile=profile)
+    fetcher = AssumeRoleCredentialFetcher(
+        client_creator=base.create_client,
+        source_credentials=base.get_credentials(),
+        role_arn=role_arn,
+        extra_args={"RoleSessionName": ASSUME_ROLE_SESSION_NAME, "DurationSeconds": ASSUME_ROLE_SECONDS},
+    )
+    # Deferred: AssumeRole runs on first use, then again before expiry, so multi-hour sweeps keep working
+    credentials = DeferredRefreshableCredentials(refresh_using=fetcher.fetch_credentials, method="assume-role")
+    core = botocore.session.Session(profile=profile)
+    core.register_component("credential_provider", CredentialResolver([_AssumeRoleProvider(credentials)]))
+    return boto3.Session(botocore_session=core)
+
+
+def get_session(role_arn=None, profile=None):
+    key = (role_arn, profile)
+    session = _sessions.get(key)
+    if session is not None:
+        return session
+    # Built outside the lock; a concurrent caller's session may win the setdefault
+    try:
+        if role_arn:
+            session = _assumed_role_session(role_arn, profile)
+        else:
+            session = boto3.Session(profile_name=profile)
+    except Exception as e:
+        raise AWSInitError(f"Failed to create AWS session for {role_arn or profile or 'default'}") from e
+    with _lock:
+        return _sessions.setdefault(key, session)
+
+
+def client_config(max_pool_connections=MAX_POOL_CONNECTIONS):
+    return Config(
+        max_pool_connections=max_pool_connections,
+        retries={"mode": RETRY_MODE, "total_max_attempts": RETRY_TOTAL_ATTEMPTS},
+        tcp_keepalive=TCP_KEEPALIVE,
+    )
+
+
+def get_client(service, region, role_arn=None, profile=None, max_pool_connections=MAX_POOL_CONNECTIONS,
+               endpoint_url=None):
+    """Pooled client; safe to call from many threads. endpoint_url is for local stand-ins."""
+    key = (role_arn, profile, region, service, max_pool_connections, endpoint_url)
+    client = _clients.get(key)
+    if client is not None:
+        return client
+
+    session = get_session(role_arn, profile)
+    # boto3 sessions are not thread-safe, so client creation is serialized
+    with _lock:
+        if key not in _clients:
+            try:
+                _clients[key] = session.client(
+                    service, region_name=region, endpoint_url=endpoint_url,
+                    config=client_config(max_pool_connections)
+                )
+            except Exception as e:
+                raise AWSInitError(f"Failed to initialize {service} client in {region}") from e
+            _owners[id(_clients[key])] = (role_arn, profile)
+        return _clients[key]
+
+
+# ---------- SCOPE ----------
+def account_id(region, role_arn=None, profile=None):
+    """Account the credentials act in: parsed from the role ARN, else one GetCallerIdentity per profile."""
+    if role_arn:
+        return role_arn.split(":")[4]
+    if profile not in _accounts:
+        try:
+            identity = get_client("sts", region, profile=profile).get_caller_identity()
+        except Exception as e:
+            raise AWSInitError(f"Failed to resolve the account for {profile or 'default'} credentials") from e
+        _accounts.setdefault(profile, identity["Account"])
+    return _accounts[profile]
+
+
+def client_scope(client):
+    """
+    (account id, region) a client's calls are answered from, for keying local caches.
+    The account is None for clients not created by get_client.
+    """
+    region = client.meta.region_name
+    owner = _owners.get(id(client))
+    if owner is None:
+        return None, region
+    return account_id(region, *owner), region
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Throttling-aware retry with exponential backoff for AWS API calls
+The only retry layer: pooled clients (aws_clients) make a single attempt per call
+"""
+
+import random
+import time
+from botocore.exceptions import ClientError, ConnectionError, HTTPClientError
+
+MAX_ATTEMPTS = 8
+BASE_DELAY = 0.5   # seconds
+MAX_DELAY = 20.0   # seconds
+
+THROTTLE_CODES = {
+    "Throttling",
+    "ThrottlingException",
+    "ThrottledException",
+    "RequestThrottled",
+    "RequestThrottledException",
+    "RequestLimitExceeded",
+    "TooManyRequestsException",
+    "SlowDown",
+}
+
+# Retried like throttles; botocore's standard retry mode treats these as transient
+TRANSIENT_CODES = {
+    "RequestTimeout",
+    "RequestTimeoutException",
+    "PriorRequestNotComplete",
+    "InternalError",
+    "InternalFailure",
+    "ServiceUnavailable",
+}
+
+
+# Called as listener(operation_name, error, attempt) before each retry
+_retry_listeners = []
+
+
+def add_retry_listener(listener):
+    if listener not in _retry_listeners:
+        _retry_listeners.append(listener)
+
+
+def is_throttle_error(e):
+    return isinstance(e, ClientError) and e.response.get("Error", {}).get("Code") in THROTTLE_CODES
+
+
+def is_retryable(e):
+    if isinstance(e, (ConnectionError, HTTPClientError)):
+        return True
+    if not isinstance(e, ClientError):
+        return False
+    code = e.response.get("Error", {}).get("Code")
+    status = e.response.get("ResponseMetadata", {}).get("HTTPStatusCode") or 0
+    return code in THROTTLE_CODES or code in TRANSIENT_CODES or status >= 500
+
+
+def call_with_backoff(fn, *args, max_attempts=MAX_ATTEMPTS, **kwargs):
+    """Call fn(*args, **kwargs), retrying throttling and transient errors with full-jitter backoff."""
+    for attempt in range(1, max_attempts + 1):
+        try:
+            return fn(*args, **kwargs)
+        except (ClientError, ConnectionError, HTTPClientError) as e:
+            if not is_retryable(e) or attempt == max_attempts:
+                raise
+            operation = getattr(e, "operation_name", None) or getattr(fn, "__name__", "unknown")
+            for listener in _retry_listeners:
+                listener(operation, e, attempt)
+            delay = min(MAX_DELAY, BASE_DELAY * 2 ** (attempt - 1))
+            time.sleep(random.uniform(0, delay))
+
+
+def paginate(fn, input_token, output_token=None, **kwargs):
+    """
+    Yield every page of a paginated API call, each page retried through call_with_backoff
+    (botocore paginators would call the single-attempt client directly).
+    """
+    output_token = output_token or input_token
+    while True:
+        page = call_with_backoff(fn, **kwargs)
+        yield page
+        token = page.get(output_token)
+        if not token:
+            return
+        kwargs[input_token] = token
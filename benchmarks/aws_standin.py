@@ -0,0 +1,401 @@
+#!/usr/bin/env python3
+"""
+In-process stand-in for the CloudWatch / ECS / ELBv2 / S3 / STS calls the downtime
+scripts make. Attached to real boto3 clients through botocore events, so the
+code under test runs unchanged: parameters are validated and serialized as
+usual, but no request leaves the process.
+
+Synthetic world: one cluster of N services (most behind an ALB), M EC2
+instances, and per-series 60s signals with outages (value 0, or 1 for
+StatusCheckFailed) and gaps (no datapoint). Coarser periods aggregate the
+60s signal, and CloudWatch's retention tiers and response limits apply.
+"""
+
+import gzip
+import io
+import json
+import random
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta, UTC
+import numpy as np
+from botocore.awsrequest import AWSResponse
+from botocore.exceptions import ClientError
+from botocore.response import StreamingBody
+
+ACCOUNT_ID = "123456789012"
+MAX_QUERIES_PER_REQUEST = 500
+MAX_DATAPOINTS_PER_RESPONSE = 100_800
+MAX_STATISTICS_DATAPOINTS = 1_440
+# (max age, finest period stored up to that age) -- older data only exists at coarser periods
+RETENTION = ((timedelta(days=15), 60), (timedelta(days=63), 300), (timedelta(days=455), 3600))
+PAGE_SIZE = {"ListServices": 10, "ListClusters": 100, "ListObjectsV2": 1000}
+
+
+def _seed(*parts):
+    return zlib.crc32("|".join(map(str, parts)).encode())
+
+
+def _paint(n, intervals):
+    """Boolean mask of length n with [start, end) minute intervals set."""
+    diff = np.zeros(n + 1, dtype=np.int32)
+    for s, e in intervals:
+        s, e = max(0, s), min(n, e)
+        if s < e:
+            diff[s] += 1
+            diff[e] -= 1
+    return np.cumsum(diff[:-1]) > 0
+
+
+class World:
+    def __init__(self, services=100, instances=20, days=30, end=None, region="eu-west-1",
+                 cluster="bench-cluster", alb_share=0.9, outages_per_day=0.3, gaps_per_day=0.2,
+                 trail_files_per_day=24, trail_records_per_file=200):
+        self.region = region
+        self.cluster = cluster
+        self.end = end or datetime.now(UTC)
+        # Signals cover the lookback plus one day of slack for period alignment
+        self.origin = int((self.end - timedelta(days=max(days, 1) + 1)).timestamp()) // 60 * 60
+        self.minutes = (int(self.end.timestamp()) - self.origin) // 60 + 1
+        self.outages_per_day = outages_per_day
+        self.gaps_per_day = gaps_per_day
+
+        self.services = [f"svc-{i:04d}" for i in range(services)]
+        self.instances = [f"i-{i:017x}" for i in range(1, instances + 1)]
+        self.alb = {
+            svc: (f"tg-{svc}", f"alb-{i // 25:03d}")
+            for i, svc in enumerate(self.services) if random.Random(_seed(svc)).random() < alb_share
+        }
+        self.trail_files_per_day = trail_files_per_day
+        self.trail_records_per_file = trail_records_per_file
+
+        self._signals = {}
+        self._objects = {}
+        self._lock = threading.Lock()
+
+    # ---------- ARNS ----------
+    def service_arn(self, svc):
+        return f"arn:aws:ecs:{self.region}:{ACCOUNT_ID}:service/{self.cluster}/{svc}"
+
+    def tg_arn(self, svc):
+        return f"arn:aws:elasticloadbalancing:{self.region}:{ACCOUNT_ID}:targetgroup/{self.alb[svc][0]}/0123456789abcdef"
+
+    def lb_arn(self, svc):
+        return f"arn:aws:elasticloadbalancing:{self.region}:{ACCOUNT_ID}:loadbalancer/app/{self.alb[svc][1]}/fedcba9876543210"
+
+    # ---------- METRIC SIGNALS ----------
+    def signal(self, metric):
+        """(up value, down value, outage mask, gap mask) at 60s from self.origin for one metric"""
+        key = (metric["Namespace"], metric["MetricName"],
+               tuple(sorted((d["Name"], d["Value"]) for d in metric.get("Dimensions", []))))
+        with self._lock:
+            if key in self._signals:
+                return self._signals[key]
+
+        rng = np.random.default_rng(_seed(*key))
+        days = self.minutes / 1440
+
+        def intervals(rate, mean_len):
+            starts = rng.integers(0, self.minutes, rng.poisson(rate * days))
+            return zip(starts, starts + 1 + rng.geometric(1 / mean_len, len(starts)))
+
+        status_check = metric["MetricName"].startswith("StatusCheckFailed")
+        up, down = (0.0, 1.0) if status_check else (float(1 + rng.integers(0, 3)), 0.0)
+        sig = (up, down, _paint(self.minutes, intervals(self.outages_per_day, 8)),
+               _paint(self.minutes, intervals(self.gaps_per_day, 5)))
+        with self._lock:
+            return self._signals.setdefault(key, sig)
+
+    def series(self, metric, period, stat, start, end):
+        """(epoch seconds, values) CloudWatch would return for [start, end)"""
+        up, down, outage, gap = self.signal(metric)
+        period = max(60, int(period) // 60 * 60)
+        t0 = int(start.timestamp()) // period * period
+        t1 = -(-int(end.timestamp()) // period) * period
+
+        # Retention: buckets older than a tier exist only at that tier's period or coarser
+        now = int(self.end.timestamp())
+        oldest = now
+        for age, finest in RETENTION:
+            if period >= finest:
+                oldest = now - int(age.total_seconds())
+        t0 = max(t0, -(-oldest // period) * period)
+        if t1 <= t0:
+            return np.empty(0, np.int64), np.empty(0)
+
+        step = period // 60
+        lo, hi = (t0 - self.origin) // 60, (t1 - self.origin) // 60
+        idx = np.arange(lo, hi)
+        inside = (idx >= 0) & (idx < self.minutes)
+        values = np.full(len(idx), np.nan)
+        values[inside] = np.where(gap[idx[inside]], np.nan, np.where(outage[idx[inside]], down, up))
+        # Minute samples past "now" do not exist yet
+        values[self.origin + idx * 60 > now] = np.nan
+
+        buckets = values.reshape(-1, step)
+        present = ~np.isnan(buckets)
+        keep = present.any(axis=1)
+        filled = np.where(present, buckets, 0.0)
+        counts = present.sum(axis=1)
+        if stat == "Minimum":
+            agg = np.where(present, buckets, np.inf).min(axis=1)
+        elif stat == "Maximum":
+            agg = np.where(present, buckets, -np.inf).max(axis=1)
+        elif stat == "Sum":
+            agg = filled.sum(axis=1)
+        elif stat == "SampleCount":
+            agg = counts.astype(float)
+        else:
+            agg = filled.sum(axis=1) / np.maximum(counts, 1)
+
+        stamps = t0 + np.arange(len(buckets), dtype=np.int64) * period
+        return stamps[keep], agg[keep]
+
+    # ---------- CLOUDTRAIL OBJECTS ----------
+    def trail_keys(self, prefix):
+        """Keys under a CloudTrail day prefix ".../<region>/YYYY/MM/DD/"."""
+        parts = prefix.rstrip("/").split("/")
+        if len(parts) < 4:
+            return []
+        try:
+            day = datetime(int(parts[-3]), int(parts[-2]), int(parts[-1]), tzinfo=UTC)
+        except ValueError:
+            return []
+        first_day = datetime.fromtimestamp(self.origin, UTC).replace(hour=0, minute=0, second=0)
+        if not first_day <= day <= self.end:
+            return []
+        region = parts[-4]
+        minutes = [n * 1440 // self.trail_files_per_day for n in range(self.trail_files_per_day)]
+        return [
+            f"{prefix}{ACCOUNT_ID}_CloudTrail_{region}_{day:%Y%m%d}T{m // 60:02d}{m % 60:02d}Z_{n:04d}.json.gz"
+            for n, m in enumerate(minutes)
+        ]
+
+    def trail_object(self, key):
+        with self._lock:
+            if key in self._objects:
+                return self._objects[key]
+
+        rng = random.Random(_seed(key))
+        stamp = datetime.strptime(key.rsplit("_", 2)[-2], "%Y%m%dT%H%MZ").replace(tzinfo=UTC)
+        records = []
+        for n in range(self.trail_records_per_file):
+            when = stamp + timedelta(seconds=rng.randrange(3600))
+            if self.instances and rng.random() < 0.05:
+                iid = rng.choice(self.instances)
+                name = rng.choice(("StartInstances", "StopInstances", "StopInstances", "TerminateInstances"))
+                records.append({
+                    "eventSource": "ec2.amazonaws.com", "eventName": name,
+                    "eventTime": when.strftime("%Y-%m-%dT%H:%M:%SZ"),
+                    "requestParameters": {"instancesSet": {"items": [{"instanceId": iid}]}},
+                    "resources": [{"resourceName": iid}],
+                })
+            else:
+                records.append({
+                    "eventSource": "s3.amazonaws.com", "eventName": "GetObject",
+                    "eventTime": when.strftime("%Y-%m-%dT%H:%M:%SZ"),
+                    "requestParameters": {"bucketName": "app-assets", "key": f"obj/{n}"},
+                })
+        body = gzip.compress(json.dumps({"Records": records}).encode(), compresslevel=6)
+        with self._lock:
+            return self._objects.setdefault(key, body)
+
+
+class StandIn:
+    """
+    Answers API calls for `world` after `latency` seconds (+/- 50% jitter).
+    throttle_rate injects ThrottlingException on that share of calls.
+    Counters: calls / throttles per operation, datapoints and bytes returned.
+    """
+
+    def __init__(self, world, latency=0.02, throttle_rate=0.0):
+        self.world = world
+        self.latency = latency
+        self.throttle_rate = throttle_rate
+        self.calls = {}
+        self.throttles = {}
+        self.datapoints = 0
+        self.bytes = 0
+        self._lock = threading.Lock()
+        self._handlers = {
+            "GetMetricData": self._get_metric_data,
+            "GetMetricStatistics": self._get_metric_statistics,
+            "ListClusters": self._list_clusters,
+            "ListServices": self._list_services,
+            "DescribeServices": self._describe_services,
+            "DescribeTargetGroups": self._describe_target_groups,
+            "ListObjectsV2": self._list_objects_v2,
+            "GetObject": self._get_object,
+            "GetCallerIdentity": self._get_caller_identity,
+        }
+
+    def attach(self, client):
+        events = client.meta.events
+        events.register("before-parameter-build", self._capture, unique_id="standin-capture")
+        events.register("before-call", self._respond, unique_id="standin-respond")
+        return client
+
+    def reset(self):
+        with self._lock:
+            self.calls, self.throttles, self.datapoints, self.bytes = {}, {}, 0, 0
+
+    def _count(self, table, op):
+        with self._lock:
+            table[op] = table.get(op, 0) + 1
+
+    # ---------- EVENT HOOKS ----------
+    def _capture(self, params, context, **kwargs):
+        context["standin_params"] = dict(params)
+
+    def _respond(self, model, context, **kwargs):
+        op = model.name
+        self._count(self.calls, op)
+        if self.latency:
+            time.sleep(self.latency * (0.5 + random.random()))
+        if self.throttle_rate and random.random() < self.throttle_rate:
+            self._count(self.throttles, op)
+            raise ClientError({"Error": {"Code": "Throttling", "Message": "Rate exceeded"}}, op)
+
+        handler = self._handlers.get(op)
+        if handler is None:
+            raise NotImplementedError(f"stand-in has no {op}")
+        before = self.bytes
+        parsed = handler(context.get("standin_params", {}))
+        parsed.setdefault("ResponseMetadata", {"HTTPStatusCode": 200})
+        # Approximate size, so instrumentation sees a content-length like real responses
+        headers = {"content-length": str(max(0, self.bytes - before))}
+        return AWSResponse(None, 200, headers, None), parsed
+
+    def _error(self, op, code, message):
+        return ClientError({"Error": {"Code": code, "Message": message}}, op)
+
+    # ---------- CLOUDWATCH ----------
+    def _get_metric_data(self, params):
+        queries = params["MetricDataQueries"]
+        if len(queries) > MAX_QUERIES_PER_REQUEST:
+            raise self._error("GetMetricData", "ValidationError", "Too many metric data queries")
+
+        # NextToken = "<query index>:<offset>"; results fill up to the per-response cap
+        qi, offset = map(int, params.get("NextToken", "0:0").split(":"))
+        budget = MAX_DATAPOINTS_PER_RESPONSE
+        results, token = [], None
+        for i in range(qi, len(queries)):
+            q = queries[i]
+            stat = q["MetricStat"]
+            stamps, values = self.world.series(stat["Metric"], stat["Period"], stat["Stat"],
+                                               params["StartTime"], params["EndTime"])
+            stamps, values = stamps[offset:], values[offset:]
+            take = min(len(stamps), budget)
+            results.append({
+                "Id": q["Id"],
+                "Label": stat["Metric"]["MetricName"],
+                "Timestamps": [datetime.fromtimestamp(t, UTC) for t in stamps[:take].tolist()],
+                "Values": values[:take].tolist(),
+                "StatusCode": "Complete" if take == len(stamps) else "PartialData",
+            })
+            budget -= take
+            with self._lock:
+                self.datapoints += take
+                self.bytes += take * 16
+            if take < len(stamps):
+                token = f"{i}:{offset + take}"
+                break
+            offset = 0
+            if budget == 0 and i + 1 < len(queries):
+                token = f"{i + 1}:0"
+                break
+
+        response = {"MetricDataResults": results, "Messages": []}
+        if token:
+            response["NextToken"] = token
+        return response
+
+    def _get_metric_statistics(self, params):
+        metric = {k: params[k] for k in ("Namespace", "MetricName")}
+        metric["Dimensions"] = params.get("Dimensions", [])
+        start, end, period = params["StartTime"], params["EndTime"], params["Period"]
+        if (end - start).total_seconds() / period > MAX_STATISTICS_DATAPOINTS:
+            raise self._error("GetMetricStatistics", "InvalidParameterCombination",
+                              "You have requested up to 1,441 datapoints, which exceeds the limit of 1,440.")
+        stats = params.get("Statistics", [])
+        datapoints = []
+        for stat in stats:
+            stamps, values = self.world.series(metric, period, stat, start, end)
+            for i, (t, v) in enumerate(zip(stamps.tolist(), values.tolist())):
+                if len(datapoints) <= i:
+                    datapoints.append({"Timestamp": datetime.fromtimestamp(t, UTC), "Unit": "Count"})
+                datapoints[i][stat] = v
+        with self._lock:
+            self.datapoints += len(datapoints)
+            self.bytes += len(datapoints) * 16 * max(1, len(stats))
+        # The real API returns datapoints unordered
+        random.Random(0).shuffle(datapoints)
+        return {"Label": params["MetricName"], "Datapoints": datapoints}
+
+    # ---------- ECS / ELBV2 ----------
+    def _page(self, op, items, params, token_key):
+        start = int(params.get(token_key) or 0)
+        size = min(PAGE_SIZE[op], params.get("maxResults") or params.get("MaxKeys") or PAGE_SIZE[op])
+        page = items[start:start + size]
+        nxt = str(start + size) if start + size < len(items) else None
+        return page, nxt
+
+    def _list_clusters(self, params):
+        arns = [f"arn:aws:ecs:{self.world.region}:{ACCOUNT_ID}:cluster/{self.world.cluster}"]
+        page, nxt = self._page("ListClusters", arns, params, "nextToken")
+        return {"clusterArns": page, **({"nextToken": nxt} if nxt else {})}
+
+    def _list_services(self, params):
+        arns = [self.world.service_arn(s) for s in self.world.services]
+        page, nxt = self._page("ListServices", arns, params, "nextToken")
+        return {"serviceArns": page, **({"nextToken": nxt} if nxt else {})}
+
+    def _describe_services(self, params):
+        if len(params["services"]) > 10:
+            raise self._error("DescribeServices", "InvalidParameterException", "services can have at most 10 items")
+        known = set(self.world.services)
+        out = []
+        for ref in params["services"]:
+            name = ref.split("/")[-1]
+            if name not in known:
+                continue
+            lbs = []
+            if name in self.world.alb:
+                lbs = [{"targetGroupArn": self.world.tg_arn(name), "containerName": name, "containerPort": 8080}]
+            out.append({"serviceArn": self.world.service_arn(name), "serviceName": name, "loadBalancers": lbs})
+        return {"services": out, "failures": []}
+
+    def _describe_target_groups(self, params):
+        arns = params.get("TargetGroupArns", [])
+        if len(arns) > 20:
+            raise self._error("DescribeTargetGroups", "ValidationError", "TargetGroupArns can have at most 20 items")
+        by_tg = {self.world.tg_arn(s): s for s in self.world.alb}
+        return {"TargetGroups": [
+            {"TargetGroupArn": arn, "TargetGroupName": self.world.alb[by_tg[arn]][0],
+             "LoadBalancerArns": [self.world.lb_arn(by_tg[arn])]}
+            for arn in arns if arn in by_tg
+        ]}
+
+    # ---------- STS ----------
+    def _get_caller_identity(self, params):
+        return {"Account": ACCOUNT_ID, "Arn": f"arn:aws:iam::{ACCOUNT_ID}:user/bench", "UserId": "AIDABENCH"}
+
+    # ---------- S3 ----------
+    def _list_objects_v2(self, params):
+        keys = self.world.trail_keys(params.get("Prefix", ""))
+        page, nxt = self._page("ListObjectsV2", keys, params, "ContinuationToken")
+        response = {
+            "Contents": [{"Key": k, "Size": 0} for k in page],
+            "KeyCount": len(page),
+            "IsTruncated": nxt is not None,
+        }
+        if nxt:
+            response["NextContinuationToken"] = nxt
+        return response
+
+    def _get_object(self, params):
+        body = self.world.trail_object(params["Key"])
+        with self._lock:
+            self.bytes += len(body)
+        return {"Body": StreamingBody(io.BytesIO(body), len(body)), "ContentLength": len(body)}
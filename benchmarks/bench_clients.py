@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Benchmark a new CloudWatch client per call (previous init_cw / init_clients)
+against the shared aws_clients pool
+
+    python benchmarks/bench_clients.py --services 200 --workers 8
+
+Calls go to a local keep-alive HTTP stand-in, so the numbers cover client
+construction, credential/endpoint resolution and TCP connects only; against
+real endpoints every new connection also pays a TLS handshake.
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import boto3  # noqa: E402
+import aws_clients  # noqa: E402
+
+REGION = "eu-west-1"
+
+
+class StandIn(BaseHTTPRequestHandler):
+    """Empty 200 for every call; records each TCP connection it sees."""
+    protocol_version = "HTTP/1.1"
+    connections = set()
+    lock = threading.Lock()
+
+    def do_POST(self):
+        with self.lock:
+            self.connections.add(self.client_address)
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.send_response(200)
+        self.send_header("smithy-protocol", "rpc-v2-cbor")
+        self.send_header("Content-Type", "application/cbor")
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+def call(cw):
+    cw.get_metric_data(MetricDataQueries=[], StartTime=0, EndTime=1)
+
+
+def run(label, services, workers, make_client):
+    StandIn.connections.clear()
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(lambda _: call(make_client()), range(services)))
+    elapsed = time.perf_counter() - t0
+    print(f"{label:<10}{elapsed:>10.3f}{elapsed / services * 1000:>12.2f}{len(StandIn.connections):>14}")
+    return elapsed
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--services", type=int, default=200)
+    ap.add_argument("--workers", type=int, default=8)
+    args = ap.parse_args()
+
+    os.environ.setdefault("AWS_ACCESS_KEY_ID", "bench")
+    os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "bench")
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandIn)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    endpoint = f"http://127.0.0.1:{server.server_port}"
+
+    print(f"{args.services} calls on {args.workers} threads")
+    print(f"{'mode':<10}{'seconds':>10}{'ms/call':>12}{'connections':>14}")
+
+    # boto3.client() uses the shared default session, which is not thread-safe
+    fresh_lock = threading.Lock()
+
+    def fresh():
+        with fresh_lock:
+            return boto3.client("cloudwatch", region_name=REGION, endpoint_url=endpoint)
+
+    before = run("fresh", args.services, args.workers, fresh)
+    after = run("pooled", args.services, args.workers,
+                lambda: aws_clients.get_client("cloudwatch", REGION, endpoint_url=endpoint))
+    print(f"speed-up  {before / after:.1f}x")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+Stage-by-stage benchmark of the downtime pipeline against the local AWS stand-in
+
+    python benchmarks/bench_pipeline.py --services 100 --days 30 --period 60
+    python benchmarks/bench_pipeline.py --matrix --json bench.json
+
+Each (scenario, stage) runs in a fresh process with pooled clients wired to
+benchmarks/aws_standin.py, so API call counts, wall time and peak RSS are per
+stage. Setup a stage depends on (topology, fetched series) is not timed.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing as mp
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import time
+import traceback
+from datetime import timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+REGION = "eu-west-1"
+BUCKET = "bench-cloudtrail"
+TRAIL_PREFIX = "AWSLogs/123456789012/CloudTrail/"
+
+STAGES = ["discovery", "fetch", "compute", "alb_report", "ecs_report", "ec2_report", "write", "cloudtrail"]
+# Run only when named in --stages: ec2_ecs_downtime.py does not import as the tree stands
+OPT_IN_STAGES = ["ec2_legacy"]
+
+# Nightly-shaped grid; 60s stages are left out where the series would not fit in memory
+MATRIX = [
+    {"services": 10, "days": 30, "period": 60, "stages": STAGES},
+    {"services": 100, "days": 30, "period": 60, "stages": STAGES},
+    {"services": 100, "days": 90, "period": 300, "stages": STAGES},
+    {"services": 1000, "days": 30, "period": 300,
+     "stages": ["discovery", "fetch", "compute", "ecs_report", "cloudtrail"]},
+]
+
+
+def _peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+# ---------- ONE STAGE (CHILD PROCESS) ----------
+def run_stage(stage, scenario, queue):
+    # Always report back, or the driver would wait forever on a dead child
+    try:
+        queue.put(_run_stage(stage, scenario))
+    except Exception as e:
+        if scenario.get("verbose"):
+            traceback.print_exc()
+        queue.put({"stage": stage, **{k: scenario[k] for k in ("services", "days", "period")},
+                   "error": f"setup {type(e).__name__}: {str(e).splitlines()[0][:80]}", "seconds": 0.0,
+                   "items": 0, "datapoints": 0, "datapoints_per_sec": 0.0, "api_calls": {}, "throttles": {},
+                   "bytes": 0, "peak_rss_mb": _peak_rss_mb()})
+
+
+def _run_stage(stage, scenario):
+    os.environ.setdefault("AWS_ACCESS_KEY_ID", "bench")
+    os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "bench")
+    os.environ.setdefault("AWS_DEFAULT_REGION", REGION)
+
+    from aws_standin import World, StandIn
+    import aws_clients
+    import cw_metrics
+    import downtime_engine
+    import ecs_alb_downtime as alb
+    import ECS_downtime
+    import sorted_csv_ec2_ecs
+    import cloudtrail_scanner
+    from report_writers import make_writer
+
+    world = World(services=scenario["services"], instances=scenario["instances"], days=scenario["days"])
+    # Throttling is switched on for the timed body only, so setup always completes
+    standin = StandIn(world, latency=scenario["latency_ms"] / 1000)
+    clients = {name: standin.attach(aws_clients.get_client(name, REGION))
+               for name in ("ecs", "elbv2", "cloudwatch", "s3", "sts")}
+    end = world.end
+    start = end - timedelta(days=scenario["days"])
+    period = scenario["period"]
+
+    def topology():
+        services = alb.get_services(world.cluster, clients["ecs"])
+        topo = alb.resolve_topology(world.cluster, services, clients["ecs"], clients["elbv2"])
+        return {arn.split("/")[-1]: pair for arn, pair in topo.items() if pair[0]}
+
+    def queries(targets, p):
+        return {svc: cw_metrics.alb_healthy_hosts_query(tg, lb, period=p) for svc, (tg, lb) in targets.items()}
+
+    # Untimed setup, then the timed body returns (items, datapoints processed)
+    if stage == "discovery":
+        def body():
+            return len(topology()), 0
+    elif stage == "fetch":
+        qs = queries(topology(), period)
+
+        def body():
+            series = cw_metrics.fetch_metric_data(clients["cloudwatch"], qs, start, end, max_workers=alb.MAX_WORKERS)
+            return len(series), sum(map(len, series.values()))
+    elif stage == "compute":
+        series = cw_metrics.fetch_metric_data(clients["cloudwatch"], queries(topology(), period), start, end,
+                                              max_workers=alb.MAX_WORKERS)
+
+        def body():
+            downtime_engine.compute_many(series, start, end, period)
+            return len(series), sum(map(len, series.values()))
+    elif stage == "alb_report":
+        targets = topology()
+
+        def body():
+            results = alb.get_downtime_series(targets, start, end, cw_client=clients["cloudwatch"])
+            return len(results), sum(len(points) for points, _ in results.values())
+    elif stage == "ecs_report":
+        def body():
+            results = ECS_downtime.get_ecs_cluster_downtime(world.cluster, world.services, REGION, start, end)
+            return len(results), sum(len(df) for df, _ in results.values())
+    elif stage == "ec2_report":
+        def body():
+            rows = 0
+            for iid in world.instances:
+                df, _ = sorted_csv_ec2_ecs.get_ec2_metrics(iid, REGION, start, end)
+                rows += len(df)
+            return len(world.instances), rows
+    elif stage == "ec2_legacy":
+        import ec2_ecs_downtime
+
+        def body():
+            for iid in world.instances:
+                ec2_ecs_downtime.get_ec2_app_downtime(iid, REGION, start, end)
+            return len(world.instances), 0
+    elif stage == "write":
+        results = alb.get_downtime_series(topology(), start, end, cw_client=clients["cloudwatch"])
+
+        def body():
+            out_dir = tempfile.mkdtemp(prefix="bench_pipeline_")
+            try:
+                target = os.path.join(out_dir, "report" + (".xlsx" if scenario["output"] in ("xlsx", "pandas") else ""))
+                writer = make_writer(scenario["output"], target)
+                for svc, (points, _) in results.items():
+                    writer.write_service(svc, points)
+                writer.write_summary([{"Service": svc, "Downtime_Minutes": d} for svc, (_, d) in results.items()])
+                writer.close()
+            finally:
+                shutil.rmtree(out_dir, ignore_errors=True)
+            return len(results), sum(len(points) for points, _ in results.values())
+    elif stage == "cloudtrail":
+        def body():
+            events = cloudtrail_scanner.scan_state_events(
+                clients["s3"], BUCKET, TRAIL_PREFIX, [REGION], start, end, world.instances
+            )
+            return len(events), sum(map(len, events.values()))
+    else:
+        raise ValueError(f"Unknown stage {stage!r}")
+
+    standin.reset()
+    standin.throttle_rate = scenario["throttle_rate"]
+    result = {"stage": stage, **{k: scenario[k] for k in ("services", "days", "period")}, "error": None}
+    t0 = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            items, datapoints = body()
+    except Exception as e:
+        items, datapoints = 0, 0
+        cause = e.__cause__ or e
+        result["error"] = f"{type(cause).__name__}: {str(cause).splitlines()[0][:80]}"
+        if scenario.get("verbose"):
+            traceback.print_exc()
+    elapsed = time.perf_counter() - t0
+
+    result.update({
+        "seconds": elapsed,
+        "items": items,
+        "datapoints": datapoints,
+        "datapoints_per_sec": datapoints / elapsed if elapsed else 0.0,
+        "api_calls": dict(standin.calls),
+        "throttles": dict(standin.throttles),
+        "bytes": standin.bytes,
+        "peak_rss_mb": _peak_rss_mb(),
+    })
+    return result
+
+
+# ---------- DRIVER ----------
+def run_scenario(scenario, stages, ctx):
+    results = []
+    for stage in stages:
+        queue = ctx.Queue()
+        proc = ctx.Process(target=run_stage, args=(stage, scenario, queue))
+        proc.start()
+        results.append(queue.get())
+        proc.join()
+    return results
+
+
+def print_results(results):
+    print(f"{'services':>8} {'days':>4} {'period':>6}  {'stage':<11} {'seconds':>8} {'calls':>6} "
+          f"{'throttled':>9} {'datapoints':>11} {'dp/s':>10} {'peak MB':>8}  note")
+    for r in results:
+        calls = sum(r["api_calls"].values())
+        note = r["error"] or ", ".join(f"{op} {n}" for op, n in sorted(r["api_calls"].items()))
+        print(f"{r['services']:>8} {r['days']:>4} {r['period']:>6}  {r['stage']:<11} {r['seconds']:>8.2f} "
+              f"{calls:>6} {sum(r['throttles'].values()):>9} {r['datapoints']:>11} "
+              f"{r['datapoints_per_sec']:>10.0f} {r['peak_rss_mb']:>8.0f}  {note}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--services", type=int, default=100)
+    parser.add_argument("--instances", type=int, default=20)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--period", type=int, default=60, choices=[60, 300, 3600])
+    parser.add_argument("--stages", nargs="+", default=STAGES, choices=STAGES + OPT_IN_STAGES)
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="mean stand-in latency per API call")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="share of calls answered with Throttling")
+    parser.add_argument("--output", default="csv", help="report_writers mode for the write stage")
+    parser.add_argument("--matrix", action="store_true", help="run the MATRIX scenarios instead")
+    parser.add_argument("--json", help="also write results to this file")
+    parser.add_argument("--verbose", action="store_true", help="print tracebacks of failing stages")
+    args = parser.parse_args()
+
+    common = {"instances": args.instances, "latency_ms": args.latency_ms, "throttle_rate": args.throttle_rate,
+              "output": args.output, "verbose": args.verbose}
+    if args.matrix:
+        plan = [({**common, **{k: m[k] for k in ("services", "days", "period")}}, m["stages"]) for m in MATRIX]
+    else:
+        plan = [({**common, "services": args.services, "days": args.days, "period": args.period}, args.stages)]
+
+    ctx = mp.get_context("spawn")
+    results = []
+    for scenario, stages in plan:
+        results.extend(run_scenario(scenario, stages, ctx))
+
+    print(f"stand-in latency {args.latency_ms:.0f} ms/call, throttle rate {args.throttle_rate:.0%}")
+    print_results(results)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Benchmark the ALB report output modes against the previous pandas path
+
+    python benchmarks/bench_report_writers.py --services 40 --days 30
+
+Each mode runs in a fresh process so peak RSS is not shared between modes.
+"""
+
+import argparse
+import multiprocessing as mp
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, UTC
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from report_writers import WRITERS, make_writer  # noqa: E402
+
+
+def synthetic_series(services, days, period=60):
+    start = datetime(2026, 1, 1, tzinfo=UTC)
+    n = days * 86400 // period
+    return {
+        f"service-{i:03d}": [(start + timedelta(seconds=k * period), float((k + i) % 4)) for k in range(n)]
+        for i in range(services)
+    }
+
+
+def _peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _size(path):
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(d, f)) for d, _, files in os.walk(path) for f in files)
+
+
+def run_mode(mode, services, days, out_dir, queue):
+    series = synthetic_series(services, days)
+    baseline = _peak_rss_mb()
+
+    target = os.path.join(out_dir, f"report_{mode}" + (".xlsx" if mode in ("xlsx", "pandas") else ""))
+    t0 = time.perf_counter()
+    writer = make_writer(mode, target)
+    for svc, points in series.items():
+        writer.write_service(svc, points)
+    writer.write_summary([{"Service": svc, "Downtime_Minutes": 0, "Uptime_%": 100.0} for svc in series])
+    writer.close()
+    elapsed = time.perf_counter() - t0
+
+    queue.put({
+        "mode": mode,
+        "seconds": elapsed,
+        "rows_per_sec": services * days * 1440 / elapsed,
+        "peak_rss_mb": _peak_rss_mb(),
+        "write_rss_mb": _peak_rss_mb() - baseline,
+        "output_mb": _size(target) / 2**20,
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--services", type=int, default=40)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--modes", nargs="+", default=["pandas", "xlsx", "parquet", "csv"], choices=sorted(WRITERS))
+    args = parser.parse_args()
+
+    out_dir = tempfile.mkdtemp(prefix="bench_writers_")
+    ctx = mp.get_context("spawn")
+    results = []
+    try:
+        for mode in args.modes:
+            queue = ctx.Queue()
+            proc = ctx.Process(target=run_mode, args=(mode, args.services, args.days, out_dir, queue))
+            proc.start()
+            results.append(queue.get())
+            proc.join()
+    finally:
+        shutil.rmtree(out_dir, ignore_errors=True)
+
+    print(f"{args.services} services x {args.days} days x 1440 rows/day")
+    print(f"{'mode':<8} {'seconds':>8} {'rows/s':>10} {'peak MB':>8} {'write MB':>9} {'out MB':>7}")
+    for r in results:
+        print(f"{r['mode']:<8} {r['seconds']:>8.2f} {r['rows_per_sec']:>10.0f} "
+              f"{r['peak_rss_mb']:>8.0f} {r['write_rss_mb']:>9.0f} {r['output_mb']:>7.1f}")
+
+
+if __name__ == "__main__":
+    main()
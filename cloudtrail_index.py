@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Persistent local index of EC2 Start/Stop/Terminate events from CloudTrail
+Each log object is scanned once; later runs only read newly delivered objects
+"""
+
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, UTC
+from cloudtrail_scanner import MAX_WORKERS, day_prefixes, list_keys, scan_object
+
+DEFAULT_INDEX_PATH = "cloudtrail_state_index.sqlite"
+# CloudTrail can deliver a day's objects late; after this a day prefix is never re-listed
+SEAL_AFTER = timedelta(days=1)
+
+
+def _utc(dt):
+    return dt.replace(tzinfo=UTC) if dt.tzinfo is None else dt
+
+
+class CloudTrailIndex:
+    def __init__(self, path=DEFAULT_INDEX_PATH):
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS events (
+                instance_id TEXT NOT NULL,
+                ts          INTEGER NOT NULL,
+                event       TEXT NOT NULL,
+                key         TEXT NOT NULL,
+                PRIMARY KEY (instance_id, ts, event, key)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS scanned_keys (
+                key        TEXT PRIMARY KEY,
+                scanned_at INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS sealed_prefixes (
+                prefix TEXT PRIMARY KEY
+            );
+        """)
+
+    def close(self):
+        self.conn.close()
+
+    # ---------- UPDATE ----------
+    def update(self, s3, bucket, prefix, regions, start, end, max_workers=MAX_WORKERS):
+        """Scan objects under the [start, end] day partitions that are not yet indexed."""
+        start, end = _utc(start), _utc(end)
+        sealed = {row[0] for row in self.conn.execute("SELECT prefix FROM sealed_prefixes")}
+        prefixes = [p for p in day_prefixes(prefix, regions, start, end) if p not in sealed]
+
+        keys = list_keys(s3, bucket, prefixes, max_workers)
+        scanned = {row[0] for row in self.conn.execute("SELECT key FROM scanned_keys")}
+        new_keys = [k for k in keys if k not in scanned]
+
+        # Scan concurrently, write from this thread only (one transaction per object)
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            for key, found in zip(new_keys, pool.map(lambda k: scan_object(s3, bucket, k, None), new_keys)):
+                with self.conn:
+                    self.conn.executemany(
+                        "INSERT OR IGNORE INTO events (instance_id, ts, event, key) VALUES (?, ?, ?, ?)",
+                        [(iid, int(when.timestamp()), name, key) for iid, when, name in found]
+                    )
+                    self.conn.execute(
+                        "INSERT OR REPLACE INTO scanned_keys (key, scanned_at) VALUES (?, ?)",
+                        (key, int(time.time()))
+                    )
+
+        # Day partitions old enough to be complete are never listed again
+        now = datetime.now(UTC)
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO sealed_prefixes (prefix) VALUES (?)",
+                [(p,) for p in prefixes if _prefix_day_end(p) + SEAL_AFTER < now]
+            )
+        return len(new_keys)
+
+    # ---------- LOOKUP ----------
+    def events(self, instance_id, start, end):
+        rows = self.conn.execute(
+            "SELECT ts, event FROM events WHERE instance_id = ? AND ts BETWEEN ? AND ? ORDER BY ts",
+            (instance_id, int(_utc(start).timestamp()), int(_utc(end).timestamp()))
+        )
+        return [{"time": datetime.fromtimestamp(ts, UTC), "event": event} for ts, event in rows]
+
+    def events_many(self, instance_ids, start, end):
+        return {iid: self.events(iid, start, end) for iid in instance_ids}
+
+    def instances(self):
+        return [row[0] for row in self.conn.execute("SELECT DISTINCT instance_id FROM events ORDER BY 1")]
+
+
+def _prefix_day_end(prefix):
+    # ".../<region>/YYYY/MM/DD/" -> end of that UTC day
+    y, m, d = prefix.rstrip("/").split("/")[-3:]
+    return datetime(int(y), int(m), int(d), tzinfo=UTC) + timedelta(days=1)
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Streaming, parallel CloudTrail S3 scanner
+Prunes keys by the region/YYYY/MM/DD partitions, fetches objects concurrently
+and stream-decodes records for many instances in one pass
+"""
+
+import gzip
+import io
+import json
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, UTC
+from aws_retry import call_with_backoff, paginate
+
+MAX_WORKERS = 16          # concurrent S3 GETs; size the client's max_pool_connections to match
+CHUNK_SIZE = 64 * 1024    # decompressed characters read per step
+
+STATE_EVENTS = ("StartInstances", "StopInstances", "TerminateInstances")
+
+
+class CloudTrailReadError(Exception): pass
+
+
+def _utc(dt):
+    return dt.replace(tzinfo=UTC) if dt.tzinfo is None else dt
+
+
+# ---------- KEY LISTING ----------
+def day_prefixes(prefix, regions, start, end):
+    """One prefix per region per UTC day touched by [start, end]."""
+    days, day = [], start.date()
+    while day <= end.date():
+        days.append(day)
+        day += timedelta(days=1)
+    return [f"{prefix}{region}/{d:%Y/%m/%d}/" for region in regions for d in days]
+
+
+def list_keys(s3, bucket, prefixes, max_workers=MAX_WORKERS):
+    def list_prefix(prefix):
+        keys = []
+        for page in paginate(s3.list_objects_v2, "ContinuationToken", "NextContinuationToken",
+                             Bucket=bucket, Prefix=prefix):
+            keys.extend(obj["Key"] for obj in page.get("Contents", []) if obj["Key"].endswith(".gz"))
+        return keys
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        return [key for keys in pool.map(list_prefix, prefixes) for key in keys]
+
+
+# ---------- STREAM DECODE ----------
+def iter_records(fileobj, chunk_size=CHUNK_SIZE):
+    """
+    Yield each entry of a gzipped {"Records": [...]} document while
+    decompressing, holding at most one record plus one chunk in memory.
+    """
+    decoder = json.JSONDecoder()
+    reader = io.TextIOWrapper(gzip.GzipFile(fileobj=fileobj), encoding="utf-8")
+
+    # Advance to the opening bracket of the Records array
+    buf = ""
+    while True:
+        key_at = buf.find('"Records"')
+        bracket = buf.find("[", key_at) if key_at >= 0 else -1
+        if bracket >= 0:
+            pos = bracket + 1
+            break
+        chunk = reader.read(chunk_size)
+        if not chunk:
+            return
+        buf += chunk
+
+    while True:
+        while pos < len(buf) and buf[pos] in " \t\r\n,":
+            pos += 1
+        if pos == len(buf):
+            buf, pos = reader.read(chunk_size), 0
+            if not buf:
+                return
+            continue
+        if buf[pos] == "]":
+            return
+
+        try:
+            record, pos = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            # Record straddles the chunk boundary: pull more and retry
+            chunk = reader.read(chunk_size)
+            if not chunk:
+                raise
+            buf, pos = buf[pos:] + chunk, 0
+            continue
+
+        yield record
+        if pos > chunk_size:
+            buf, pos = buf[pos:], 0
+
+
+def _instance_ids(record):
+    ids = {res.get("resourceName") for res in record.get("resources", [])}
+    items = ((record.get("requestParameters") or {}).get("instancesSet") or {}).get("items", [])
+    ids.update(item.get("instanceId") for item in items)
+    ids.discard(None)
+    return ids
+
+
+def scan_object(s3, bucket, key, instance_ids, start=None, end=None):
+    """
+    [(instance_id, time, event)] for EC2 state changes in one log object.
+    instance_ids=None collects every instance; start/end=None keeps every event.
+    """
+    try:
+        obj = call_with_backoff(s3.get_object, Bucket=bucket, Key=key)
+        found = []
+        for record in iter_records(obj["Body"]):
+            if record.get("eventSource") != "ec2.amazonaws.com" or record.get("eventName") not in STATE_EVENTS:
+                continue
+            when = datetime.fromisoformat(record["eventTime"].replace("Z", "+00:00"))
+            if (start and when < start) or (end and when > end):
+                continue
+            for iid in _instance_ids(record):
+                if instance_ids is None or iid in instance_ids:
+                    found.append((iid, when, record["eventName"]))
+        return found
+    except Exception as e:
+        raise CloudTrailReadError(f"Failed to read {key}") from e
+
+
+# ---------- SCAN ----------
+def scan_state_events(s3, bucket, prefix, regions, start, end, instance_ids=None, max_workers=MAX_WORKERS):
+    """{instance_id: [{"time", "event"}, ...]} for [start, end] in a single pass over the bucket."""
+    start, end = _utc(start), _utc(end)
+    wanted = set(instance_ids) if instance_ids is not None else None
+    keys = list_keys(s3, bucket, day_prefixes(prefix, regions, start, end), max_workers)
+
+    events = {iid: [] for iid in wanted} if wanted is not None else {}
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        for found in pool.map(lambda k: scan_object(s3, bucket, k, wanted, start, end), keys):
+            for iid, when, name in found:
+                events.setdefault(iid, []).append({"time": when, "event": name})
+
+    for evs in events.values():
+        evs.sort(key=lambda e: e["time"])
+    return events
@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""
+Shared CloudWatch fetch engine
+Packs many metric queries into GetMetricData requests, planned around
+CloudWatch's datapoint limits and retention tiers
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, UTC
+import numpy as np
+from botocore.exceptions import ClientError, BotoCoreError
+from aws_retry import call_with_backoff
+from downtime_engine import epoch_seconds
+
+# GetMetricData accepts at most 500 MetricDataQuery entries per request
+MAX_QUERIES_PER_REQUEST = 500
+# ...and returns at most this many datapoints per response (the rest needs NextToken)
+MAX_DATAPOINTS_PER_RESPONSE = 100_800
+# GetMetricStatistics rejects requests for more datapoints than this
+MAX_STATISTICS_DATAPOINTS = 1_440
+
+# (max age, finest period kept up to that age); older data is only kept at coarser periods
+RETENTION_TIERS = (
+    (timedelta(days=15), 60),
+    (timedelta(days=63), 300),
+    (timedelta(days=455), 3600),
+)
+
+
+# ================= EXCEPTIONS ================= #
+
+class MetricFetchError(Exception): pass
+
+
+# ================= QUERY BUILDERS ================= #
+
+def metric_query(namespace, metric_name, dimensions, period, stat):
+    return {
+        "Namespace": namespace,
+        "MetricName": metric_name,
+        "Dimensions": dimensions,
+        "Period": period,
+        "Stat": stat,
+    }
+
+
+def ecs_running_tasks_query(cluster, service, namespace="ECS/ContainerInsights", period=300):
+    return metric_query(
+        namespace, "RunningTaskCount",
+        {"ClusterName": cluster, "ServiceName": service},
+        period, "Average"
+    )
+
+
+def alb_healthy_hosts_query(tg_name, lb_name, period=60):
+    return metric_query(
+        "AWS/ApplicationELB", "HealthyHostCount",
+        {"TargetGroup": tg_name, "LoadBalancer": lb_name},
+        period, "Average"
+    )
+
+
+def ec2_status_check_query(instance_id, period=300):
+    return metric_query(
+        "AWS/EC2", "StatusCheckFailed",
+        {"InstanceId": instance_id},
+        period, "Sum"
+    )
+
+
+def _to_api_query(query_id, query):
+    return {
+        "Id": query_id,
+        "MetricStat": {
+            "Metric": {
+                "Namespace": query["Namespace"],
+                "MetricName": query["MetricName"],
+                "Dimensions": [{"Name": k, "Value": v} for k, v in query["Dimensions"].items()],
+            },
+            "Period": query["Period"],
+            "Stat": query["Stat"],
+        },
+        "ReturnData": True,
+    }
+
+
+# ================= PLANNING ================= #
+
+def _epoch(dt):
+    return int((dt if dt.tzinfo else dt.replace(tzinfo=UTC)).timestamp())
+
+
+def _dt(epoch):
+    return datetime.fromtimestamp(epoch, UTC)
+
+
+def retention_segments(start, end, period=60, now=None):
+    """
+    Split [start, end) by retention tier, oldest first: [(seg_start, seg_end, period)].
+    Each segment uses max(period, finest period CloudWatch still keeps at that age);
+    data older than the last tier is dropped. Tier edges sit on the coarser period's grid.
+    """
+    now = _epoch(now or datetime.now(UTC))
+    lo, hi = _epoch(start), _epoch(end)
+
+    segments, newer_edge = [], hi
+    for i, (age, finest) in enumerate(RETENTION_TIERS):
+        # Round the edge up to the next tier's grid so this side never asks for rolled-up data
+        coarser = RETENTION_TIERS[min(i + 1, len(RETENTION_TIERS) - 1)][1]
+        edge = max(lo, -(-(now - int(age.total_seconds())) // coarser) * coarser)
+        if edge < newer_edge:
+            segments.append((edge, newer_edge, max(period, finest)))
+            newer_edge = edge
+
+    merged = []
+    for seg_lo, seg_hi, p in reversed(segments):
+        if merged and merged[-1][2] == p and merged[-1][1] == seg_lo:
+            merged[-1] = (merged[-1][0], seg_hi, p)
+        else:
+            merged.append((seg_lo, seg_hi, p))
+    return [(_dt(a), _dt(b), p) for a, b, p in merged]
+
+
+def plan_chunks(start, end, period, series=1, max_datapoints=MAX_DATAPOINTS_PER_RESPONSE):
+    """
+    Fewest [(chunk_start, chunk_end)] covering [start, end) such that `series`
+    queries at `period` stay within max_datapoints per call. Inner edges sit on
+    the period grid and chunk sizes are balanced.
+    """
+    lo, hi = _epoch(start), _epoch(end)
+    if hi <= lo:
+        return []
+    origin = lo // period * period
+    buckets = -(-(hi - origin) // period)
+    per_chunk = max(1, max_datapoints // max(1, series))
+    n_chunks = -(-buckets // per_chunk)
+    size = -(-buckets // n_chunks) * period
+
+    edges = [lo] + [origin + i * size for i in range(1, n_chunks)] + [hi]
+    return [(_dt(a), _dt(b)) for a, b in zip(edges, edges[1:]) if a < b]
+
+
+# ================= FETCH ================= #
+
+def _fetch_pages(cw, queries, batch, start, end):
+    """Yield (key, timestamps, values) for every MetricDataResult of every page."""
+    # Query ids must match ^[a-z][a-zA-Z0-9_]*$, so map keys to positional ids
+    ids = {f"q{i}": key for i, key in enumerate(batch)}
+    api_queries = [_to_api_query(qid, queries[key]) for qid, key in ids.items()]
+
+    kwargs = {
+        "MetricDataQueries": api_queries,
+        "StartTime": start,
+        "EndTime": end,
+        "ScanBy": "TimestampAscending",
+    }
+    while True:
+        try:
+            response = call_with_backoff(cw.get_metric_data, **kwargs)
+        except (ClientError, BotoCoreError) as e:
+            raise MetricFetchError("GetMetricData request failed") from e
+
+        for result in response.get("MetricDataResults", []):
+            yield ids[result["Id"]], result["Timestamps"], result["Values"]
+
+        token = response.get("NextToken")
+        if not token:
+            break
+        kwargs["NextToken"] = token
+
+
+def _fetch_batch(cw, queries, batch, start, end):
+    series = {key: [] for key in batch}
+    for key, timestamps, values in _fetch_pages(cw, queries, batch, start, end):
+        series[key].extend(zip(timestamps, values))
+
+    # Pages are ascending per query, but a query can span several pages
+    for key in batch:
+        series[key].sort(key=lambda p: p[0])
+    return series
+
+
+def _fetch_batch_arrays(cw, queries, batch, start, end):
+    # Each result page goes straight into int64 / float64 arrays; no per-point tuples
+    chunks = {key: [] for key in batch}
+    for key, timestamps, values in _fetch_pages(cw, queries, batch, start, end):
+        n = len(timestamps)
+        chunks[key].append((
+            np.fromiter(map(epoch_seconds, timestamps), dtype=np.int64, count=n),
+            np.fromiter(values, dtype=np.float64, count=n),
+        ))
+    return chunks
+
+
+def plan_requests(queries, start, end, retention=True, now=None):
+    """
+    [(segment queries, batch keys, chunk_start, chunk_end)], one GetMetricData call each:
+    retention segments (periods coarsened for old data) x batches of 500 queries x
+    time chunks sized so every response fits in one page.
+    """
+    keys = list(queries)
+    batches = [keys[i:i + MAX_QUERIES_PER_REQUEST] for i in range(0, len(keys), MAX_QUERIES_PER_REQUEST)]
+
+    plan = []
+    for batch in batches:
+        period = min(queries[k]["Period"] for k in batch)
+        segments = retention_segments(start, end, period, now) if retention else [(start, end, period)]
+        for seg_start, seg_end, seg_period in segments:
+            seg_queries = {k: dict(queries[k], Period=max(queries[k]["Period"], seg_period)) for k in batch}
+            for chunk_start, chunk_end in plan_chunks(seg_start, seg_end, seg_period, len(batch)):
+                plan.append((seg_queries, batch, chunk_start, chunk_end))
+    # Oldest first keeps each series sorted when the results are concatenated in plan order
+    return sorted(plan, key=lambda p: p[2])
+
+
+def fetch_metric_data(cw, queries, start, end, max_workers=1, retention=True, now=None):
+    """
+    Fetch every query in `queries` ({key: metric_query(...)}) for [start, end).
+    Returns {key: [(timestamp, value), ...]} sorted by timestamp.
+    With retention=True, data older than a retention tier comes back at that tier's
+    period (see retention_segments). All planned calls run concurrently when max_workers > 1.
+    """
+    plan = plan_requests(queries, start, end, retention, now)
+
+    series = {key: [] for key in queries}
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        for batch_series in pool.map(lambda p: _fetch_batch(cw, p[0], p[1], p[2], p[3]), plan):
+            for key, points in batch_series.items():
+                series[key].extend(points)
+    return series
+
+
+def fetch_metric_arrays(cw, queries, start, end, max_workers=1, retention=True, now=None):
+    """
+    fetch_metric_data, columnar: {key: (int64 epoch seconds, float64 values)} sorted by time.
+    Each series is assembled with a single concatenate of its response pages.
+    """
+    plan = plan_requests(queries, start, end, retention, now)
+
+    chunks = {key: [] for key in queries}
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        for batch_chunks in pool.map(lambda p: _fetch_batch_arrays(cw, p[0], p[1], p[2], p[3]), plan):
+            for key, parts in batch_chunks.items():
+                chunks[key].extend(parts)
+
+    series = {}
+    for key in queries:
+        parts = chunks.pop(key)
+        ts = np.concatenate([t for t, _ in parts]) if parts else np.empty(0, np.int64)
+        values = np.concatenate([v for _, v in parts]) if parts else np.empty(0, np.float64)
+        if len(ts) > 1 and (np.diff(ts) < 0).any():
+            order = np.argsort(ts, kind="stable")
+            ts, values = ts[order], values[order]
+        series[key] = (ts, values)
+    return series
+
+
+def get_metric_statistics(cw, start, end, period, max_workers=1, now=None, **kwargs):
+    """
+    GetMetricStatistics over any window: split by retention tier and into the
+    fewest calls under the 1,440-datapoint limit, run concurrently.
+    Returns the merged Datapoints sorted by timestamp.
+    """
+    calls = [
+        (chunk_start, chunk_end, seg_period)
+        for seg_start, seg_end, seg_period in retention_segments(start, end, period, now)
+        for chunk_start, chunk_end in plan_chunks(seg_start, seg_end, seg_period, 1, MAX_STATISTICS_DATAPOINTS)
+    ]
+
+    def fetch(call):
+        chunk_start, chunk_end, seg_period = call
+        return call_with_backoff(
+            cw.get_metric_statistics, StartTime=chunk_start, EndTime=chunk_end, Period=seg_period, **kwargs
+        ).get("Datapoints", [])
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        datapoints = [d for chunk in pool.map(fetch, calls) for d in chunk]
+    return sorted(datapoints, key=lambda d: d["Timestamp"])
+
+
+def to_datapoints(points, stat):
+    """Convert a fetched series to get_metric_statistics-style datapoints."""
+    return [{"Timestamp": ts, stat: value} for ts, value in points]
+
+
+def to_frame(ts, values, service, resource):
+    """
+    Columnar series -> report DataFrame (Timestamp, Service, Resource, MetricValue).
+    Timestamps are a view of the epoch array, labels are one-byte categoricals.
+    """
+    import pandas as pd
+    n = len(ts)
+    codes = np.zeros(n, dtype=np.int8)
+    return pd.DataFrame({
+        "Timestamp": pd.DatetimeIndex(ts.view("datetime64[s]")).tz_localize(UTC),
+        "Service": pd.Categorical.from_codes(codes, [service]),
+        "Resource": pd.Categorical.from_codes(codes, [resource]),
+        "MetricValue": values,
+    }, copy=False)
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Vectorized downtime engine
+Aligns datapoints to a fixed period grid and finds down / missing buckets
+as boolean arrays (resources x buckets)
+"""
+
+from collections import namedtuple
+from datetime import UTC
+import numpy as np
+
+# Each result holds minutes plus [start, end) epoch-second intervals (N x 2 int64 arrays)
+DowntimeResult = namedtuple("DowntimeResult", ["downtime_minutes", "gap_minutes", "outages", "gaps"])
+
+
+# ---------- DOWN PREDICATES ----------
+def down_if_zero(values):
+    # RunningTaskCount / HealthyHostCount
+    return values == 0
+
+
+def down_if_positive(values):
+    # StatusCheckFailed / UnHealthyHostCount
+    return values > 0
+
+
+# ---------- INGEST ----------
+def epoch_seconds(dt):
+    # Naive datetimes (datetime.utcnow()) are UTC
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=UTC)
+    return int(dt.timestamp())
+
+
+def to_arrays(points):
+    """[(timestamp, value), ...] -> (int64 epoch seconds, float64 values)"""
+    n = len(points)
+    ts = np.fromiter((epoch_seconds(t) for t, _ in points), dtype=np.int64, count=n)
+    values = np.fromiter((v for _, v in points), dtype=np.float64, count=n)
+    return ts, values
+
+
+def from_datapoints(datapoints, stat):
+    """get_metric_statistics-style datapoints -> (timestamp, value) pairs"""
+    return [(d["Timestamp"], d[stat]) for d in datapoints]
+
+
+# ---------- GRID ----------
+def grid(start, end, period):
+    """(origin epoch, bucket count) for the period grid covering [start, end)"""
+    origin = epoch_seconds(start) // period * period
+    n_buckets = -(-(epoch_seconds(end) - origin) // period)
+    return origin, max(0, n_buckets)
+
+
+def bucket_masks(series, start, end, period, is_down=down_if_zero):
+    """
+    series: list of (ts, values) arrays, one per resource.
+    Returns (down, present) boolean matrices of shape (resources, buckets).
+    A bucket is down if any datapoint in it satisfies is_down.
+    """
+    origin, n_buckets = grid(start, end, period)
+    down = np.zeros((len(series), n_buckets), dtype=bool)
+    present = np.zeros((len(series), n_buckets), dtype=bool)
+
+    for row, (ts, values) in enumerate(series):
+        idx = (ts - origin) // period
+        ok = (idx >= 0) & (idx < n_buckets)
+        if not ok.all():
+            idx, values = idx[ok], values[ok]
+        present[row, idx] = True
+        down[row, idx[is_down(values)]] = True
+
+    return down, present
+
+
+def runs(mask, origin, period):
+    """Contiguous True runs per row -> list of (N x 2) [start, end) epoch arrays"""
+    rows, n_buckets = mask.shape
+    # Work on the (usually sparse) set bucket positions rather than the full matrix
+    flat = np.flatnonzero(mask)
+    row_of, col_of = np.divmod(flat, max(1, n_buckets))
+
+    new_run = np.ones(len(flat), dtype=bool)
+    new_run[1:] = (np.diff(flat) != 1) | (row_of[1:] != row_of[:-1])
+    first = np.flatnonzero(new_run)
+    last = np.append(first[1:], len(flat))[:len(first)] - 1
+
+    intervals = np.column_stack((
+        origin + col_of[first] * period,
+        origin + (col_of[last] + 1) * period,
+    )).astype(np.int64)
+
+    splits = np.searchsorted(row_of[first], np.arange(1, rows))
+    return np.split(intervals, splits)
+
+
+# ---------- ANALYZE ----------
+def analyze(series, start, end, period, is_down=down_if_zero):
+    """List of DowntimeResult, one per entry in series."""
+    origin, _ = grid(start, end, period)
+    down, present = bucket_masks(series, start, end, period, is_down)
+    missing = ~present
+
+    minutes_per_bucket = period / 60
+    down_minutes = down.sum(axis=1) * minutes_per_bucket
+    gap_minutes = missing.sum(axis=1) * minutes_per_bucket
+    outages = runs(down, origin, period)
+    gaps = runs(missing, origin, period)
+
+    return [
+        DowntimeResult(float(down_minutes[i]), float(gap_minutes[i]), outages[i], gaps[i])
+        for i in range(len(series))
+    ]
+
+
+def compute_downtime(points, start, end, period, is_down=down_if_zero):
+    """Single-series convenience wrapper: [(timestamp, value), ...] -> DowntimeResult"""
+    return analyze([to_arrays(points)], start, end, period, is_down)[0]
+
+
+def _join(a, b):
+    # Concatenate interval arrays, merging a run that continues across the seam
+    if len(a) and len(b) and a[-1, 1] == b[0, 0]:
+        a = a.copy()
+        a[-1, 1] = b[0, 1]
+        b = b[1:]
+    return np.concatenate([a, b])
+
+
+def join_results(earlier, later):
+    """Two DowntimeResults of consecutive, non-overlapping windows -> one over both"""
+    return DowntimeResult(
+        earlier.downtime_minutes + later.downtime_minutes, earlier.gap_minutes + later.gap_minutes,
+        _join(earlier.outages, later.outages), _join(earlier.gaps, later.gaps)
+    )
+
+
+def compute_segments(points, segments, is_down=down_if_zero):
+    """
+    Downtime over consecutive [(start, end, period)] segments, e.g. from
+    cw_metrics.retention_segments when older data comes back at coarser periods.
+    """
+    ts, values = to_arrays(points)
+    return analyze_segments(ts, values, segments, is_down)
+
+
+def analyze_segments(ts, values, segments, is_down=down_if_zero):
+    """compute_segments for a series already held as (epoch seconds, values) arrays"""
+    total = None
+    for seg_start, seg_end, period in segments:
+        r = analyze([(ts, values)], seg_start, seg_end, period, is_down)[0]
+        total = r if total is None else join_results(total, r)
+    if total is None:
+        return DowntimeResult(0.0, 0.0, np.empty((0, 2), np.int64), np.empty((0, 2), np.int64))
+    return total
+
+
+def compute_many(series_by_key, start, end, period, is_down=down_if_zero):
+    """{key: [(timestamp, value), ...]} -> {key: DowntimeResult}"""
+    keys = list(series_by_key)
+    results = analyze([to_arrays(series_by_key[k]) for k in keys], start, end, period, is_down)
+    return dict(zip(keys, results))
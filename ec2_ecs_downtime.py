@@ -6,8 +6,12 @@ EC2 + ECS
 
 import boto3
 import traceback
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, UTC
 from botocore.exceptions import ClientError, BotoCoreError
+import cw_metrics
+from downtime_engine import compute_segments, from_datapoints, down_if_positive, down_if_zero
+from intervals import from_downtime, composite
+from aws_clients import get_client
 
 # ---------------- CUSTOM EXCEPTIONS ---------------- #
 
@@ -16,11 +20,15 @@ class MetricFetchError(Exception): pass
 class NoDataError(Exception): pass
 
 
+# Concurrent GetMetricStatistics chunks per resource
+MAX_WORKERS = 4
+
 # ---------------- INIT ---------------- #
 
 def init_clients(region):
+    # Cached per region: one client and connection pool for every instance / service
     try:
-        cw = boto3.client("cloudwatch", region_name=region)
+        cw = get_client("cloudwatch", region)
         return cw
     except Exception as e:
         traceback.print_exc()
@@ -31,82 +39,93 @@ def init_clients(region):
 # EC2 APPLICATION DOWNTIME (StatusCheck or ALB metrics)
 # ============================================================
 
-def get_ec2_app_downtime(instance_id, region, start, end):
+def get_ec2_app_timeline(instance_id, region, start, end):
+    """downtime_engine.DowntimeResult (minutes plus outage intervals) for one instance"""
     cw = init_clients(region)
+    now = datetime.now(UTC)
 
     try:
-        response = cw.get_metric_statistics(
+        # Chunked under the 1,440-datapoint limit; coarser periods for data past retention
+        datapoints = cw_metrics.get_metric_statistics(
+            cw, start, end, 300, max_workers=MAX_WORKERS, now=now,
             Namespace="AWS/EC2",
             MetricName="StatusCheckFailed",
             Dimensions=[{"Name":"InstanceId","Value":instance_id}],
-            StartTime=start,
-            EndTime=end,
-            Period=300,
             Statistics=["Sum"]
         )
     except (ClientError, BotoCoreError):
         traceback.print_exc()
         raise MetricFetchError("Failed to fetch EC2 CloudWatch metrics")
 
-    datapoints = response.get("Datapoints", [])
     if not datapoints:
         raise NoDataError("No EC2 metric data found")
 
-    downtime_minutes = sum(5 for d in datapoints if d["Sum"] > 0)
+    segments = cw_metrics.retention_segments(start, end, 300, now)
+    result = compute_segments(from_datapoints(datapoints, "Sum"), segments, down_if_positive)
+    downtime_minutes = result.downtime_minutes
     downtime_hours = downtime_minutes / 60
 
     print("\n========== EC2 APPLICATION DOWNTIME REPORT ==========")
     print(f"Instance ID : {instance_id}")
     print(f"Period      : {start} -> {end}")
-    print(f"Downtime    : {downtime_minutes} minutes ({downtime_hours:.2f} hrs)")
+    print(f"Downtime    : {downtime_minutes:.0f} minutes ({downtime_hours:.2f} hrs, {len(result.outages)} outages)")
 
     if downtime_minutes == 0:
         print("✅ No EC2 application downtime detected")
 
-    return downtime_minutes
+    return result
+
+
+def get_ec2_app_downtime(instance_id, region, start, end):
+    return get_ec2_app_timeline(instance_id, region, start, end).downtime_minutes
 
 
 # ============================================================
 # ECS APPLICATION DOWNTIME (RunningTaskCount)
 # ============================================================
 
-def get_ecs_app_downtime(cluster, service, region, start, end):
+def get_ecs_app_timeline(cluster, service, region, start, end):
+    """downtime_engine.DowntimeResult (minutes plus outage intervals) for one service"""
     cw = init_clients(region)
+    now = datetime.now(UTC)
 
     try:
-        response = cw.get_metric_statistics(
+        datapoints = cw_metrics.get_metric_statistics(
+            cw, start, end, 300, max_workers=MAX_WORKERS, now=now,
             Namespace="AWS/ECS",
             MetricName="RunningTaskCount",
             Dimensions=[
                 {"Name":"ClusterName","Value":cluster},
                 {"Name":"ServiceName","Value":service}
             ],
-            StartTime=start,
-            EndTime=end,
-            Period=300,
             Statistics=["Average"]
         )
     except (ClientError, BotoCoreError):
         traceback.print_exc()
         raise MetricFetchError("Failed to fetch ECS metrics")
 
-    datapoints = response.get("Datapoints", [])
     if not datapoints:
         raise NoDataError("No ECS metric data found")
 
-    downtime_minutes = sum(5 for d in datapoints if d["Average"] == 0)
+    segments = cw_metrics.retention_segments(start, end, 300, now)
+    result = compute_segments(from_datapoints(datapoints, "Average"), segments, down_if_zero)
+    downtime_minutes = result.downtime_minutes
     downtime_hours = downtime_minutes / 60
 
     print("\n========== ECS APPLICATION DOWNTIME REPORT ==========")
     print(f"Cluster      : {cluster}")
     print(f"Service      : {service}")
     print(f"Period       : {start} -> {end}")
-    print(f"Downtime     : {downtime_minutes} minutes ({downtime_hours:.2f} hrs)")
+    print(f"Downtime     : {downtime_minutes:.0f} minutes ({downtime_hours:.2f} hrs, {len(result.outages)} outages)")
 
     if downtime_minutes == 0:
         print("✅ No ECS application downtime detected")
 
-    return downtime_minutes
+    return result
+
+
+def get_ecs_app_downtime(cluster, service, region, start, end):
+    return get_ecs_app_timeline(cluster, service, region, start, end).downtime_minutes
 
 
 # ============================================================
@@ -128,12 +147,19 @@ if __name__ == "__main__":
         ECS_CLUSTER = "prod-cluster"
         ECS_SERVICE = "orders-service"
 
-        ec2_down = get_ec2_app_downtime(EC2_INSTANCE_ID, REGION, START_DATE, END_DATE)
-        ecs_down = get_ecs_app_downtime(ECS_CLUSTER, ECS_SERVICE, REGION, START_DATE, END_DATE)
+        ec2_result = get_ec2_app_timeline(EC2_INSTANCE_ID, REGION, START_DATE, END_DATE)
+        ecs_result = get_ecs_app_timeline(ECS_CLUSTER, ECS_SERVICE, REGION, START_DATE, END_DATE)
+
+        # Composite downtime: union of both timelines, so overlapping outages count once
+        ec2_outages, ecs_outages = from_downtime(ec2_result), from_downtime(ecs_result)
+        combined = composite(ec2_outages, ecs_outages).clip(START_DATE, END_DATE)
+        overlap = ec2_outages.intersection(ecs_outages)
+        print(f"\nCombined downtime: {combined.total_minutes():.0f} min "
+              f"({overlap.total_minutes():.0f} min when EC2 and ECS were down together)")
 
         # DORA RELIABILITY %
         total_seconds = (END_DATE - START_DATE).total_seconds()
-        total_downtime_seconds = (ec2_down + ecs_down) * 60
+        total_downtime_seconds = combined.total_seconds()
 
         reliability = (total_seconds - total_downtime_seconds) / total_seconds * 100
         print("\n========== DORA RELIABILITY KPI ==========")
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Fleet-wide EC2 downtime
+Discovers instances by tag or Auto Scaling group with paginated
+describe_instances, then evaluates StatusCheckFailed for all of them in
+batched, concurrent GetMetricData calls -> one downtime row per instance
+"""
+
+import traceback
+from datetime import datetime, timedelta, UTC, date
+import pandas as pd
+import cw_metrics
+from cw_metrics import fetch_metric_arrays, ec2_status_check_query, retention_segments
+from metric_cache import MetricCache, fetch_cached
+from downtime_engine import analyze_segments, to_arrays, down_if_positive
+from intervals import from_downtime
+from report_writers import make_writer
+from rollups import RollupStore
+from aws_clients import get_client
+from aws_retry import paginate
+
+REGION = "us-east-1"
+DAYS = 30
+MAX_WORKERS = 8
+PERIOD = 300              # StatusCheckFailed is published every minute; 5-min sums as before
+DATE = date.today()
+
+# Instances matching every tag filter; ASG_NAMES adds an aws:autoscaling:groupName filter
+TAG_FILTERS = {"Environment": ["prod"]}
+ASG_NAMES = []
+INSTANCE_STATES = ["pending", "running", "stopping", "stopped"]
+
+OUTPUT_MODE = "xlsx"
+OUTPUT_FILE = f"ec2_fleet_downtime_{DATE}.xlsx"
+
+
+# ================= EXCEPTIONS ================= #
+
+class FleetDiscoveryError(Exception): pass
+class MetricFetchError(Exception): pass
+
+
+# =====================================================
+# DISCOVERY
+# =====================================================
+
+def _tag(instance, key):
+    return next((t["Value"] for t in instance.get("Tags", []) if t["Key"] == key), None)
+
+
+def discover_instances(ec2_client, tags=None, asg_names=None, states=INSTANCE_STATES):
+    """[{"InstanceId", "Name", "State", "ASG", "Type", "LaunchTime"}] for every matching instance"""
+    filters = [{"Name": "instance-state-name", "Values": list(states)}]
+    filters += [{"Name": f"tag:{key}", "Values": list(values)} for key, values in (tags or {}).items()]
+    if asg_names:
+        filters.append({"Name": "tag:aws:autoscaling:groupName", "Values": list(asg_names)})
+
+    instances = []
+    try:
+        for page in paginate(ec2_client.describe_instances, "NextToken", Filters=filters):
+            for reservation in page["Reservations"]:
+                for inst in reservation["Instances"]:
+                    instances.append({
+                        "InstanceId": inst["InstanceId"],
+                        "Name": _tag(inst, "Name"),
+                        "State": inst["State"]["Name"],
+                        "ASG": _tag(inst, "aws:autoscaling:groupName"),
+                        "Type": inst.get("InstanceType"),
+                        "LaunchTime": inst.get("LaunchTime"),
+                    })
+    except Exception as e:
+        raise FleetDiscoveryError("describe_instances failed") from e
+    return instances
+
+
+# =====================================================
+# DOWNTIME
+# =====================================================
+
+def get_fleet_downtime(instances, region, start, end, cache=None, role_arn=None, rollups=None):
+    """
+    Per-instance downtime rows for [start, end); instances without data are
+    reported (Has_Data = False, downtime and uptime None) instead of raising.
+    rollups: optional RollupStore; full days are stored under "ec2/<instance_id>"
+    """
+    cw = get_client("cloudwatch", region, role_arn)
+    now = datetime.now(UTC)
+    queries = {inst["InstanceId"]: ec2_status_check_query(inst["InstanceId"], period=PERIOD) for inst in instances}
+
+    try:
+        if cache is not None:
+            cached = fetch_cached(cw, cache, queries, start, end, max_workers=MAX_WORKERS, now=now)
+            series = {iid: to_arrays(cached.pop(iid)) for iid in queries}
+        else:
+            series = fetch_metric_arrays(cw, queries, start, end, max_workers=MAX_WORKERS, now=now)
+    except cw_metrics.MetricFetchError as e:
+        raise MetricFetchError(f"Failed to fetch StatusCheckFailed for {len(queries)} instances") from e
+
+    segments = retention_segments(start, end, PERIOD, now)
+    total_minutes = (end - start).total_seconds() / 60
+    rows = []
+    for inst in instances:
+        iid = inst["InstanceId"]
+        ts, values = series.pop(iid)
+        result = analyze_segments(ts, values, segments, down_if_positive)
+        has_data = bool(len(ts))
+        if rollups is not None and has_data:
+            rollups.record(f"ec2/{iid}", result, start, end)
+        # No StatusCheckFailed at all: unknown, not up; left out of fleet figures
+        rows.append({
+            "InstanceId": iid,
+            "Name": inst.get("Name"),
+            "State": inst.get("State"),
+            "ASG": inst.get("ASG"),
+            "Has_Data": has_data,
+            "Downtime_Minutes": result.downtime_minutes if has_data else None,
+            "Gap_Minutes": result.gap_minutes,
+            "Outages": len(result.outages) if has_data else None,
+            "Longest_Outage_Minutes": from_downtime(result).longest_seconds() / 60 if has_data else None,
+            "Uptime_%": round(100 - (result.downtime_minutes / total_minutes * 100), 3) if has_data else None,
+        })
+    return rows
+
+
+# =====================================================
+# MAIN
+# =====================================================
+
+if __name__ == "__main__":
+    try:
+        END = datetime.now(UTC)
+        START = END - timedelta(days=DAYS)
+
+        instances = discover_instances(get_client("ec2", REGION), TAG_FILTERS, ASG_NAMES)
+        print(f"Found {len(instances)} instances in {REGION} (tags {TAG_FILTERS}, ASGs {ASG_NAMES or 'any'})")
+
+        cache = MetricCache()      # only missing / still-mutable ranges hit CloudWatch
+        rollups = RollupStore()    # daily summaries for rollups.py SLO reports
+        rows = get_fleet_downtime(instances, REGION, START, END, cache, rollups=rollups)
+        rollups.close()
+        cache.close()
+
+        writer = make_writer(OUTPUT_MODE, OUTPUT_FILE)
+        writer.write_summary(rows)
+        writer.close()
+
+        df = pd.DataFrame(rows)
+        if not df.empty:
+            print(df.sort_values("Downtime_Minutes", ascending=False).to_string(index=False))
+            no_data = df.loc[~df["Has_Data"], "InstanceId"].tolist()
+            if no_data:
+                print(f"\n⚠️  No StatusCheckFailed data for {len(no_data)} instances: {', '.join(no_data)}")
+            measured = df[df["Has_Data"]]
+            if measured.empty:
+                print("\nFleet uptime: n/a (no instance published StatusCheckFailed)")
+            else:
+                fleet_minutes = len(measured) * (END - START).total_seconds() / 60
+                print(f"\nFleet uptime: {100 - measured['Downtime_Minutes'].sum() / fleet_minutes * 100:.3f}%"
+                      f" over {len(measured)} of {len(df)} instances")
+        print(f"Report saved: {OUTPUT_FILE}")
+
+    except Exception:
+        print("\n❌ SCRIPT FAILED")
+        traceback.print_exc()
+        raise SystemExit(1)
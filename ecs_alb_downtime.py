@@ -1,85 +1,134 @@
 # ecs_alb_downtime_report.py
 
-import boto3
+import logging
 import pandas as pd
 from datetime import datetime, timedelta, UTC, date
 import traceback
+from concurrent.futures import ThreadPoolExecutor
+from aws_retry import call_with_backoff, paginate
+from cw_metrics import (
+    MAX_QUERIES_PER_REQUEST, MAX_DATAPOINTS_PER_RESPONSE, fetch_metric_data, plan_requests,
+    alb_healthy_hosts_query, to_datapoints, retention_segments
+)
+from metric_cache import MetricCache, fetch_cached
+from rollups import RollupStore
+from downtime_engine import compute_segments, compute_downtime, epoch_seconds, from_datapoints
+from report_writers import make_writer
+from aws_clients import get_client
+from instrumentation import RunMetrics, buffered_logger
 
 REGION = "eu-west-1"
 # REGION = "me-central-1"
 CLUSTER_NAME = "analytics-dashboards-prod"#"uae-pass-prod-cluster"#
 DAYS = 30
+MAX_WORKERS = 8  # concurrent AWS calls; keep at or below the client connection pool size
+# full   = every bucket of the window at 60s (older data at its retention period)
+# coarse = hourly Minimum first, then minute data only for hours where it hit 0;
+#          falls back to full whenever that would take more GetMetricData calls
+FETCH_MODE = "full"
+COARSE_PERIOD = 3600
 DATE = date.today()
 
 STATUS_FILE = f"ecs_downtime_status_{DATE}.txt"
-OUTPUT_FILE = f"ecs_alb_downtime_report_{DATE}.xlsx"
+# xlsx (constant memory) | parquet (service/day partitions) | csv (gzip) | pandas (previous path)
+OUTPUT_MODE = "xlsx"
+OUTPUT_TARGETS = {
+    "xlsx": f"ecs_alb_downtime_report_{DATE}.xlsx",
+    "pandas": f"ecs_alb_downtime_report_{DATE}.xlsx",
+    "parquet": f"ecs_alb_downtime_report_{DATE}_parquet",
+    "csv": f"ecs_alb_downtime_report_{DATE}_csv",
+}
+OUTPUT_FILE = OUTPUT_TARGETS[OUTPUT_MODE]
 
+# Run metrics (stage timings, API calls, throttles, bytes, datapoints/s)
+METRICS_JSON = f"ecs_alb_downtime_metrics_{DATE}.json"
+METRICS_PROM = None  # e.g. "/var/lib/node_exporter/textfile_collector/ecs_alb_downtime.prom"
 
-def log(msg):
-    print(msg)
-    with open(STATUS_FILE, "a", encoding='utf-8') as f:
-        f.write(msg + "\n")
+run = RunMetrics("ecs_alb_downtime")
+_logger = buffered_logger("ecs_alb_downtime", STATUS_FILE)
+
+
+def log(msg, level=logging.INFO):
+    _logger.log(level, msg)
 
 
 # ---------- AWS CLIENTS ----------
-ecs = boto3.client("ecs", region_name=REGION)
-elbv2 = boto3.client("elbv2", region_name=REGION)
-cw = boto3.client("cloudwatch", region_name=REGION)
+# Defaults for this script; multi_region_report passes pooled clients per (account, region)
+ecs = run.instrument(get_client("ecs", REGION))
+elbv2 = run.instrument(get_client("elbv2", REGION))
+cw = run.instrument(get_client("cloudwatch", REGION))
 
 
 # ---------- GET ECS SERVICES ----------
-def get_services(cluster):
+def get_services(cluster, ecs_client=None):
     services = []
-    paginator = ecs.get_paginator("list_services")
-    for page in paginator.paginate(cluster=cluster):
+    for page in paginate((ecs_client or ecs).list_services, "nextToken", cluster=cluster):
         services.extend(page["serviceArns"])
     return services
 
 
-# ---------- GET TARGET GROUP ----------
-def get_target_group_and_lb(service_arn):
-    svc = ecs.describe_services(cluster=CLUSTER_NAME, services=[service_arn])["services"][0]
-    
-    if "loadBalancers" not in svc or not svc["loadBalancers"]:
-        return None, None
-    
-    tg_arn = svc["loadBalancers"][0]["targetGroupArn"]
+# ---------- RESOLVE CLUSTER TOPOLOGY ----------
+DESCRIBE_SERVICES_BATCH = 10       # describe_services limit
+DESCRIBE_TARGET_GROUPS_BATCH = 20  # describe_target_groups limit
+
+# {(ecs client, cluster): {service_arn: (tg_name, lb_name)}}, memoized across calls.
+# Pooled clients are unique per (account, region), so same-named clusters never collide.
+_topology = {}
+
+
+def _batches(items, size):
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def resolve_topology(cluster, service_arns, ecs_client=None, elbv2_client=None):
+    """
+    Map each service to its (target group, load balancer) with batched
+    describe_services / describe_target_groups calls. (None, None) = no ALB.
+    """
+    ecs_client, elbv2_client = ecs_client or ecs, elbv2_client or elbv2
+    known = _topology.setdefault((ecs_client, cluster), {})
+    todo = list(dict.fromkeys(a for a in service_arns if a not in known))
+
+    if todo:
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
+            described = pool.map(
+                lambda batch: call_with_backoff(ecs_client.describe_services, cluster=cluster, services=batch)["services"],
+                _batches(todo, DESCRIBE_SERVICES_BATCH)
+            )
+            svc_tg = {}
+            for svc in (s for page in described for s in page):
+                lbs = [lb for lb in svc.get("loadBalancers", []) if lb.get("targetGroupArn")]
+                tg_arn = lbs[0]["targetGroupArn"] if lbs else None
+                svc_tg[svc["serviceArn"]] = tg_arn
+                svc_tg[svc["serviceName"]] = tg_arn
+
+            tg_arns = list(dict.fromkeys(tg for tg in svc_tg.values() if tg))
+            described = pool.map(
+                lambda batch: call_with_backoff(elbv2_client.describe_target_groups, TargetGroupArns=batch)["TargetGroups"],
+                _batches(tg_arns, DESCRIBE_TARGET_GROUPS_BATCH)
+            )
+            tg_lb = {
+                tg["TargetGroupArn"]: tg["LoadBalancerArns"][0]
+                for page in described for tg in page if tg.get("LoadBalancerArns")
+            }
+
+        for arn in todo:
+            tg_arn = svc_tg.get(arn, svc_tg.get(arn.split("/")[-1]))
+            lb_arn = tg_lb.get(tg_arn)
+            if not lb_arn:
+                known[arn] = (None, None)
+                continue
+            known[arn] = (tg_arn.split(":")[-1], lb_arn.split("loadbalancer/")[1])
+
+    return {arn: known[arn] for arn in service_arns}
 
-    #Find LoadBalancer for TargetGroup
-    tg_info = elbv2.describe_target_groups(TargetGroupArns=[tg_arn])["TargetGroups"][0]
-    lb_arn = tg_info["LoadBalancerArns"][0]
 
-    lb_name = lb_arn.split("loadbalancer/")[1]
-    return tg_arn.split(":")[-1], lb_name
+def get_target_group_and_lb(service_arn):
+    return resolve_topology(CLUSTER_NAME, [service_arn])[service_arn]
 
 
 # ---------- GET ALB HEALTH METRICS ----------
-def get_downtime(tg_name, lb_name, start, end):
-    all_points = []
-    delta = timedelta(days=1)
-    current = start
-
-    while current < end:
-        chunk_end = min(current + delta, end)
-
-        response = cw.get_metric_statistics(
-            Namespace="AWS/ApplicationELB",
-            MetricName="HealthyHostCount",
-            Dimensions=[
-                {"Name": "TargetGroup", "Value": tg_name},
-                {"Name": "LoadBalancer", "Value": lb_name}
-            ],
-            StartTime=current,      # ✅ FIXED
-            EndTime=chunk_end,       # ✅ FIXED
-            Period=60,
-            Statistics=["Average"]
-        )
-
-        all_points.extend(response.get("Datapoints", []))
-        current = chunk_end
-
-    all_points = sorted(all_points, key=lambda x: x["Timestamp"])
-
+def summarize_healthy_hosts(all_points, start, end, now=None):
     if not all_points:
         return None, (end - start).total_seconds() / 60
 
@@ -87,9 +136,167 @@ def get_downtime(tg_name, lb_name, start, end):
     df["Timestamp"] = pd.to_datetime(df["Timestamp"]).dt.tz_localize(None)
     df.rename(columns={"Average": "HealthyHosts"}, inplace=True)
 
-    downtime = sum(1 for p in all_points if p["Average"] == 0)
+    # Older than 15 days only 5-minute (then hourly) data exists; segments follow it
+    segments = retention_segments(start, end, 60, now)
+    downtime = compute_segments(from_datapoints(all_points, "Average"), segments).downtime_minutes
     return df, downtime
 
+
+def _fetch(cw_client, queries, start, end, cache, now, max_workers=MAX_WORKERS):
+    if cache is not None:
+        return fetch_cached(cw_client, cache, queries, start, end, max_workers=max_workers, now=now)
+    return fetch_metric_data(cw_client, queries, start, end, max_workers=max_workers, now=now)
+
+
+def _fetch_coarse_to_fine(cw_client, queries, start, end, cache, now):
+    """
+    -> ({svc: minute points inside suspect hours}, {svc: hourly DowntimeResult, None = no data}).
+    An hour whose Minimum is above 0 cannot contain a minute whose Average is 0,
+    so only hours with Minimum == 0 are fetched at full resolution.
+    Whenever the fine pass (or the coarse pass itself) would take more calls than the
+    full fetch, this returns the full fetch instead, with coarse results None.
+    """
+    full_calls = len(plan_requests(queries, start, end, now=now))
+    coarse_queries = {svc: dict(q, Period=COARSE_PERIOD, Stat="Minimum") for svc, q in queries.items()}
+    # CloudWatch anchors buckets at StartTime (rounded only to the minute for recent data), so the
+    # hourly pass starts on the hour: each Minimum then covers exactly the clock hour it is filed under
+    coarse_start = datetime.fromtimestamp(epoch_seconds(start) // COARSE_PERIOD * COARSE_PERIOD, UTC)
+    if len(plan_requests(coarse_queries, coarse_start, end, now=now)) >= full_calls:
+        return _fetch(cw_client, queries, start, end, cache, now), None
+
+    coarse_series = _fetch(cw_client, coarse_queries, coarse_start, end, cache, now)
+    coarse = {
+        svc: compute_downtime(points, coarse_start, end, COARSE_PERIOD) if points else None
+        for svc, points in coarse_series.items()
+    }
+    run.count("datapoints", sum(len(p) for p in coarse_series.values()), stage="fetch_coarse")
+
+    # Suspect hours split at the retention tiers, so each packed request stays within one period
+    requests = []
+    for seg_start, seg_end, period in retention_segments(start, end, 60, now):
+        lo_bound, hi_bound = epoch_seconds(seg_start), epoch_seconds(seg_end)
+        suspects = [
+            (max(int(lo), lo_bound), min(int(hi), hi_bound), svc)
+            for svc, result in coarse.items() if result is not None
+            for lo, hi in result.outages
+            if int(lo) < hi_bound and int(hi) > lo_bound
+        ]
+        requests.extend(_pack_windows(suspects, period, MAX_DATAPOINTS_PER_RESPONSE, MAX_QUERIES_PER_REQUEST))
+
+    def fine_calls(request):
+        lo, hi, windows = request
+        return len(plan_requests({svc: queries[svc] for svc in windows},
+                                 datetime.fromtimestamp(lo, UTC), datetime.fromtimestamp(hi, UTC), now=now))
+
+    if sum(map(fine_calls, requests)) >= full_calls:
+        return _fetch(cw_client, queries, start, end, cache, now), None
+
+    def fetch_request(request):
+        lo, hi, windows = request
+        group = {svc: queries[svc] for svc in windows}
+        fetched = _fetch(cw_client, group, datetime.fromtimestamp(lo, UTC), datetime.fromtimestamp(hi, UTC),
+                         cache, now, max_workers=1)
+        # Keep each service's own windows only, so packed requests never duplicate a point.
+        # Windows start on the hour, except that the first one may start at `start`; a bucket
+        # straddling `start` still belongs to it, as in a full fetch.
+        hours = {svc: [(a // COARSE_PERIOD * COARSE_PERIOD, b) for a, b in w] for svc, w in windows.items()}
+        return {
+            svc: [p for p in points if any(a <= epoch_seconds(p[0]) < b for a, b in hours[svc])]
+            for svc, points in fetched.items()
+        }
+
+    if cache is not None:
+        fetched = [fetch_request(r) for r in requests]  # sqlite stays on this thread
+    else:
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
+            fetched = list(pool.map(fetch_request, requests))
+
+    # Requests are in time order (by tier, then by window) and a service's windows never overlap,
+    # so each series stays sorted
+    series = {svc: [] for svc in queries}
+    for request_series in fetched:
+        for svc, points in request_series.items():
+            series[svc].extend(points)
+    return series, coarse
+
+
+def _pack_windows(suspects, period, max_datapoints, max_queries):
+    """
+    [(lo, hi, svc)] suspect windows within one retention tier -> [(lo, hi, {svc: [(lo, hi), ...]})].
+    Sweeping by start, a window joins the open request while every member over the widened
+    range still fits one GetMetricData response (max_datapoints at `period`, max_queries).
+    """
+    requests = []
+    for lo, hi, svc in sorted(suspects):
+        if requests:
+            r_lo, r_hi, members = requests[-1]
+            n = len(members) + (svc not in members)
+            new_hi = max(r_hi, hi)
+            buckets = -(-(new_hi - r_lo // period * period) // period)
+            if n <= max_queries and n * buckets <= max_datapoints:
+                members.setdefault(svc, []).append((lo, hi))
+                requests[-1] = (r_lo, new_hi, members)
+                continue
+        requests.append((lo, hi, {svc: [(lo, hi)]}))
+    return requests
+
+
+def get_downtime_series(targets, start, end, cache=None, cw_client=None, rollups=None, rollup_prefix="alb",
+                        mode=None):
+    """
+    targets: {service: (tg_name, lb_name)} -> {service: ([(timestamp, healthy_hosts)], downtime)}
+    rollups: optional RollupStore; full days are stored under "<rollup_prefix>/<service>"
+    mode: FETCH_MODE override. In coarse mode the returned points cover only the suspect hours;
+    downtime minutes and outage intervals are the same as in full mode.
+    """
+    cw_client = cw_client or cw
+    mode = mode or FETCH_MODE
+    now = datetime.now(UTC)  # one retention reference for fetch and compute
+    queries = {
+        svc: alb_healthy_hosts_query(tg_name, lb_name, period=60)
+        for svc, (tg_name, lb_name) in targets.items()
+    }
+    with run.stage("fetch"):
+        if mode == "coarse":
+            series, coarse = _fetch_coarse_to_fine(cw_client, queries, start, end, cache, now)
+        else:
+            series, coarse = _fetch(cw_client, queries, start, end, cache, now), None
+    datapoints = sum(len(points) for points in series.values())
+    run.count("datapoints", datapoints, stage="fetch")
+
+    results = {}
+    segments = retention_segments(start, end, 60, now)
+    with run.stage("compute"):
+        for svc in targets:
+            points = series[svc]
+            result = compute_segments(points, segments)
+            has_data = bool(points) if coarse is None else coarse[svc] is not None
+            if coarse is not None and has_data:
+                # Healthy hours were never fetched at full resolution; gaps come from the hourly pass
+                result = result._replace(gap_minutes=coarse[svc].gap_minutes, gaps=coarse[svc].gaps)
+            if not has_data:
+                results[svc] = (points, (end - start).total_seconds() / 60)
+            else:
+                results[svc] = (points, result.downtime_minutes)
+            if rollups is not None:
+                # No data at all counts as down, as above; otherwise gaps are not downtime
+                rollups.record(f"{rollup_prefix}/{svc}", result, start, end, gaps_as_down=not has_data)
+    run.count("datapoints", datapoints, stage="compute")
+    return results
+
+
+def get_downtimes(targets, start, end, cache=None):
+    """targets: {service: (tg_name, lb_name)} -> {service: (df, downtime)}"""
+    return {
+        svc: summarize_healthy_hosts(to_datapoints(points, "Average"), start, end)
+        for svc, (points, _) in get_downtime_series(targets, start, end, cache).items()
+    }
+
+
+def get_downtime(tg_name, lb_name, start, end, cache=None):
+    return get_downtimes({tg_name: (tg_name, lb_name)}, start, end, cache)[tg_name]
+
+
 # ---------- MAIN ----------
 def main():
     log(f"=== ECS ALB DOWNTIME REPORT STARTED {datetime.now(UTC)} ===")
@@ -97,50 +304,77 @@ def main():
     end = datetime.now(UTC)
     start = end - timedelta(days=DAYS)
 
-    services = get_services(CLUSTER_NAME)
-    log(f"Found {len(services)} services in cluster {CLUSTER_NAME}")
+    with run.stage("discovery"):
+        services = get_services(CLUSTER_NAME)
+        log(f"Found {len(services)} services in cluster {CLUSTER_NAME}")
+
+        # Whole cluster in batched describe calls; keeps the cluster's service order
+        topology = resolve_topology(CLUSTER_NAME, services)
 
-    writer = pd.ExcelWriter(OUTPUT_FILE, engine="xlsxwriter")
+    writer = make_writer(OUTPUT_MODE, OUTPUT_FILE)
     summary = []
 
-    for svc_arn in services:
+    targets = {}
+    for svc_arn, (tg_name, lb_name) in topology.items():
         svc_name = svc_arn.split("/")[-1]
         log(f"Processing service: {svc_name}")
 
-        tg_name, lb_name = get_target_group_and_lb(svc_arn)
-
         if not tg_name:
             log(f"  ⚠ No ALB target group for {svc_name}, skipping")
             continue
 
-        df, downtime = get_downtime(tg_name, lb_name, start, end)
+        targets[svc_name] = (tg_name, lb_name)
+
+    # One batched GetMetricData sweep for every target group
+    cache = MetricCache()  # only missing / still-mutable ranges hit CloudWatch
+    rollups = RollupStore()  # daily summaries for rollups.py SLO reports
+    results = get_downtime_series(targets, start, end, cache=cache,
+                                  rollups=rollups, rollup_prefix=f"alb/{CLUSTER_NAME}")
+    rollups.close()
+    cache.close()
 
-        total_minutes = (end - start).total_seconds() / 60
-        uptime = 100 - (downtime / total_minutes * 100)
+    with run.stage("write"):
+        for svc_name in targets:
+            points, downtime = results[svc_name]
 
-        summary.append({
-            "Service": svc_name,
-            "Downtime_Minutes": downtime,
-            "Uptime_%": round(uptime, 2)
-        })
+            total_minutes = (end - start).total_seconds() / 60
+            uptime = 100 - (downtime / total_minutes * 100)
 
-        if df is not None:
-            df.to_excel(writer, sheet_name=svc_name[:31], index=False)
+            summary.append({
+                "Service": svc_name,
+                "Downtime_Minutes": downtime,
+                "Uptime_%": round(uptime, 2)
+            })
 
-        log(f"  ✅ Downtime: {downtime:.0f} min | Uptime: {uptime:.2f}%")
+            if points:
+                # Streamed straight from the fetched series; no per-service DataFrame
+                writer.write_service(svc_name, points)
 
-    # Write summary sheet
-    summary_df = pd.DataFrame(summary)
-    summary_df.to_excel(writer, sheet_name="SUMMARY", index=False)
-    writer.close()
+            log(f"  {svc_name} ✅ Downtime: {downtime:.0f} min | Uptime: {uptime:.2f}%")
+
+        # Write summary sheet
+        writer.write_summary(summary)
+        writer.close()
 
     log(f"Report saved: {OUTPUT_FILE}")
+    log_run_metrics()
     log("=== FINISHED ===")
 
 
+def log_run_metrics(json_path=METRICS_JSON, prom_path=METRICS_PROM):
+    stats = run.emit(json_path, prom_path)
+    for stage, s in stats["stages"].items():
+        rate = f" | {s['datapoints_per_sec']:.0f} datapoints/s" if s["datapoints"] else ""
+        log(f"  stage {stage}: {s['seconds']:.1f}s{rate}")
+    log(f"  API calls: {sum(stats['api_calls'].values())} | throttled: "
+        f"{sum(stats['throttled_responses'].values()) + sum(stats['backoff_retries'].values())} | "
+        f"downloaded: {stats['bytes_downloaded'] / 2**20:.1f} MB")
+    log(f"Run metrics saved: {json_path}")
+
+
 if __name__ == "__main__":
     try:
         main()
     except Exception:
-        log("❌ SCRIPT FAILED")
-        log(traceback.format_exc())
+        log("❌ SCRIPT FAILED", logging.ERROR)
+        log(traceback.format_exc(), logging.ERROR)
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Concurrent GitLab REST collector for the DORA report
+Connection-pooled, fans out across projects, fetches pages in parallel
+from X-Total-Pages and honors GitLab rate-limit headers
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
+import requests
+from requests.adapters import HTTPAdapter
+
+MAX_CONCURRENCY = 16      # in-flight HTTP requests across all threads
+PER_PAGE = 100
+MIN_REMAINING = 5         # pause when RateLimit-Remaining drops to this
+MAX_RETRIES = 5
+DEFAULT_RETRY_AFTER = 10  # seconds, when a 429 carries no hint
+
+
+class GitLabAPIError(Exception): pass
+
+
+def retry_after_seconds(value):
+    """Retry-After as seconds to wait; the header may be delta-seconds or an HTTP-date."""
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return DEFAULT_RETRY_AFTER
+
+
+# =========================
+# HTTP CLIENT
+# =========================
+class GitLabClient:
+    def __init__(self, base_url, token, max_concurrency=MAX_CONCURRENCY, per_page=PER_PAGE):
+        self.api = f"{base_url.rstrip('/')}/api/v4"
+        self.graphql_url = f"{base_url.rstrip('/')}/api/graphql"
+        self.per_page = per_page
+
+        self.session = requests.Session()
+        self.session.headers.update({"PRIVATE-TOKEN": token})
+        adapter = HTTPAdapter(pool_connections=max_concurrency, pool_maxsize=max_concurrency)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._pause_lock = threading.Lock()
+        self._resume_at = 0.0
+        # Page fan-out only; its tasks never submit further tasks, so it cannot deadlock
+        self._pages = ThreadPoolExecutor(max_workers=max_concurrency)
+
+    def close(self):
+        self._pages.shutdown()
+        self.session.close()
+
+    # ---------- RATE LIMITS ----------
+    def _pause(self, seconds):
+        with self._pause_lock:
+            self._resume_at = max(self._resume_at, time.time() + seconds)
+
+    def _wait_for_quota(self):
+        delay = self._resume_at - time.time()
+        if delay > 0:
+            time.sleep(delay)
+
+    def _note_limits(self, response):
+        remaining = response.headers.get("RateLimit-Remaining")
+        reset = response.headers.get("RateLimit-Reset")
+        if remaining is not None and reset is not None and int(remaining) <= MIN_REMAINING:
+            self._pause(max(0.0, float(reset) - time.time()))
+
+    # ---------- REQUESTS ----------
+    def get(self, path, params=None):
+        return self._request("GET", path, params=params)
+
+    def post(self, path, json=None):
+        return self._request("POST", path, json=json)
+
+    def _request(self, method, path, **kwargs):
+        url = path if path.startswith("http") else f"{self.api}{path}"
+        for _ in range(MAX_RETRIES):
+            self._wait_for_quota()
+            with self._slots:
+                r = self.session.request(method, url, **kwargs)
+            self._note_limits(r)
+
+            if r.status_code == 429:
+                retry_after = r.headers.get("Retry-After")
+                reset = r.headers.get("RateLimit-Reset")
+                if retry_after is not None:
+                    self._pause(retry_after_seconds(retry_after))
+                elif reset is not None:
+                    self._pause(max(1.0, float(reset) - time.time()))
+                else:
+                    self._pause(DEFAULT_RETRY_AFTER)
+                continue
+
+            r.raise_for_status()
+            return r
+        raise GitLabAPIError(f"Rate limited after {MAX_RETRIES} attempts: {url}")
+
+    def get_all_pages(self, path, params=None):
+        base = dict(params or {}, per_page=self.per_page)
+        first = self.get(path, dict(base, page=1))
+        results = list(first.json())
+
+        total_pages = first.headers.get("X-Total-Pages")
+        if total_pages:
+            # Known page count: fetch the rest concurrently, keep page order
+            pages = range(2, int(total_pages) + 1)
+            for r in self._pages.map(lambda p: self.get(path, dict(base, page=p)), pages):
+                results.extend(r.json())
+            return results
+
+        # GitLab omits X-Total-Pages on very large collections; follow X-Next-Page
+        next_page = first.headers.get("X-Next-Page")
+        while next_page:
+            r = self.get(path, dict(base, page=int(next_page)))
+            results.extend(r.json())
+            next_page = r.headers.get("X-Next-Page")
+        return results
+
+
+# =========================
+# ENDPOINTS
+# =========================
+def project_team(project):
+    # root-group/<team>/.../project -> team; projects directly under the root group are their own team
+    parts = project["path_with_namespace"].split("/")
+    return parts[1] if len(parts) > 2 else parts[0]
+
+
+def fetch_projects(client, group_id):
+    return client.get_all_pages(f"/groups/{group_id}/projects", {"include_subgroups": True})
+
+
+def fetch_deployments(client, project_id, environment, updated_after=None):
+    params = {"environment": environment}
+    if updated_after:
+        # updated_after requires ordering by updated_at
+        params.update({"updated_after": updated_after, "order_by": "updated_at", "sort": "asc"})
+    return client.get_all_pages(f"/projects/{project_id}/deployments", params)
+
+
+def fetch_pipelines(client, project_id, start_date, end_date=None):
+    params = {"updated_after": start_date}
+    if end_date:
+        params["updated_before"] = end_date
+    return client.get_all_pages(f"/projects/{project_id}/pipelines", params)
+
+
+def fetch_jobs(client, project_id, pipeline_id):
+    return client.get_all_pages(f"/projects/{project_id}/pipelines/{pipeline_id}/jobs")
+
+
+def fetch_incidents(client, project_id, start_date=None, end_date=None, updated_after=None):
+    params = {"labels": "type::incident,env::prod"}
+    if start_date:
+        params["created_after"] = start_date
+    if end_date:
+        params["created_before"] = end_date
+    if updated_after:
+        # Catches incidents closed after they were first collected
+        params["updated_after"] = updated_after
+    return client.get_all_pages(f"/projects/{project_id}/issues", params)
+
+
+# =========================
+# COLLECTION
+# =========================
+def collect(client, group_id, environment, start_date, end_date, max_concurrency=MAX_CONCURRENCY):
+    """
+    (projects, deployments, pipelines, jobs, incidents) as raw API dicts.
+    Project-level resources fan out first, then every pipeline's jobs;
+    results keep project (and pipeline) order.
+    """
+    projects = fetch_projects(client, group_id)
+
+    def per_project(p):
+        pid = p["id"]
+        return (
+            fetch_deployments(client, pid, environment),
+            fetch_pipelines(client, pid, start_date, end_date),
+            fetch_incidents(client, pid, start_date, end_date),
+        )
+
+    with ThreadPoolExecutor(max_workers=max_concurrency) as pool:
+        per_project_results = list(pool.map(per_project, projects))
+
+        pipeline_refs = [
+            (p["id"], pl)
+            for p, (_, pipelines, _) in zip(projects, per_project_results)
+            for pl in pipelines
+        ]
+        jobs = list(pool.map(lambda ref: fetch_jobs(client, ref[0], ref[1]["id"]), pipeline_refs))
+
+    deployments = {p["id"]: r[0] for p, r in zip(projects, per_project_results)}
+    pipelines = {p["id"]: r[1] for p, r in zip(projects, per_project_results)}
+    incidents = {p["id"]: r[2] for p, r in zip(projects, per_project_results)}
+    jobs_by_pipeline = {(pid, pl["id"]): js for (pid, pl), js in zip(pipeline_refs, jobs)}
+    return projects, deployments, pipelines, jobs_by_pipeline, incidents
@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+GitLab Monthly DORA + Cost Report
+Audience: Director, CTO, PMO
+Scope: Group-level (multi-team, multi-project)
+"""
+
+import pandas as pd
+import os
+from datetime import date, timedelta
+from gitlab_collector import GitLabClient, collect, project_team
+import gitlab_graphql
+from gitlab_store import HighWaterMarks, ColumnarStore, collect_incremental, load_frames
+
+# =========================
+# CONFIGURATION
+# =========================
+GITLAB_URL = "https://gitlab.com"
+PRIVATE_TOKEN = "glpat-XXXXXXXXXXXX"
+GROUP_ID = 12345678
+GROUP_PATH = None  # full path (e.g. "my-org/platform"); required by the GraphQL collector
+
+# "rest": one request per pipeline for its jobs; "graphql": jobs nested in the pipeline pages
+COLLECTOR = "rest"
+
+PER_PAGE = 100
+MAX_CONCURRENCY = 16  # in-flight GitLab API requests
+PROD_ENV = "prod"
+
+RUNNER_COST_PER_MINUTE = 0.008  # Adjust to your infra
+OUTPUT_ROOT = "reports"
+BREAKDOWNS = ["team", "project"]  # extra per-key monthly reports
+
+# Incremental mode: fetch only records updated since the last run
+INCREMENTAL = True
+STATE_FILE = "gitlab_dora_state.json"
+STORE_DIR = "gitlab_dora_store"
+INITIAL_SINCE = "2025-01-01"  # first-run backfill start
+
+# =========================
+# TIME WINDOW (LAST MONTH)
+# =========================
+def last_month_range():
+    today = date.today().replace(day=1)
+    end = today - timedelta(days=1)
+    start = end.replace(day=1)
+    return start.isoformat(), end.isoformat(), end.strftime("%Y-%m")
+
+START_DATE, END_DATE, REPORT_MONTH = last_month_range()
+
+# =========================
+# DATA COLLECTION
+# =========================
+def collect_data():
+    deployments, pipelines, jobs, incidents = [], [], [], []
+    client = GitLabClient(GITLAB_URL, PRIVATE_TOKEN, MAX_CONCURRENCY, PER_PAGE)
+    try:
+        if COLLECTOR == "graphql":
+            collected = gitlab_graphql.collect(client, GROUP_PATH, PROD_ENV, START_DATE, END_DATE, MAX_CONCURRENCY)
+        else:
+            collected = collect(client, GROUP_ID, PROD_ENV, START_DATE, END_DATE, MAX_CONCURRENCY)
+        projects, project_deployments, project_pipelines, pipeline_jobs, project_incidents = collected
+    finally:
+        client.close()
+
+    for p in projects:
+        pid = p["id"]
+        keys = {"project": p["path_with_namespace"], "team": project_team(p)}
+
+        for d in project_deployments[pid]:
+            deployments.append({
+                **keys,
+                "created_at": d["created_at"],
+                "commit_time": d["deployable"]["commit"]["created_at"]
+            })
+
+        for pl in project_pipelines[pid]:
+            pipelines.append({
+                **keys,
+                "created_at": pl["created_at"],
+                "status": pl["status"]
+            })
+
+            for j in pipeline_jobs[(pid, pl["id"])]:
+                if j["duration"]:
+                    jobs.append({
+                        **keys,
+                        "created_at": j["created_at"],
+                        "duration": j["duration"]
+                    })
+
+        for i in project_incidents[pid]:
+            if i["closed_at"]:
+                incidents.append({
+                    **keys,
+                    "created_at": i["created_at"],
+                    "closed_at": i["closed_at"]
+                })
+
+    return (
+        pd.DataFrame(deployments),
+        pd.DataFrame(pipelines),
+        pd.DataFrame(jobs),
+        pd.DataFrame(incidents)
+    )
+
+def collect_data_incremental():
+    store = ColumnarStore(STORE_DIR)
+    client = GitLabClient(GITLAB_URL, PRIVATE_TOKEN, MAX_CONCURRENCY, PER_PAGE)
+    try:
+        added = collect_incremental(
+            client, store, HighWaterMarks(STATE_FILE), GROUP_ID, PROD_ENV, INITIAL_SINCE, MAX_CONCURRENCY
+        )
+    finally:
+        client.close()
+    print(f"New records: {added}")
+    return load_frames(store)
+
+# =========================
+# TYPED FRAMES (PARSED ONCE)
+# =========================
+def _utc(series):
+    return pd.to_datetime(series, utc=True, format="ISO8601")
+
+
+def _month(ts):
+    return ts.dt.tz_convert(None).dt.to_period("M")
+
+
+def _typed(df, columns):
+    """Ensure columns exist (empty collections come back without them) and key columns are categorical."""
+    df = df.reindex(columns=list(dict.fromkeys([*df.columns, *columns])))
+    for key in ("team", "project"):
+        if key in df.columns:
+            df[key] = df[key].astype("category")
+    return df
+
+
+def prepare_frames(deploy_df, pipeline_df, jobs_df, incident_df):
+    """
+    Parse every timestamp column exactly once and derive the per-row measures.
+    All monthly / team / project aggregates are computed from these frames.
+    """
+    deploy = _typed(deploy_df, ["team", "project", "created_at", "commit_time"])
+    created = _utc(deploy["created_at"])
+    deploy = deploy.assign(
+        created_at=created,
+        month=_month(created),
+        lead_time_hours=(created - _utc(deploy["commit_time"])).dt.total_seconds() / 3600,
+    )
+
+    pipelines = _typed(pipeline_df, ["team", "project", "created_at", "status"])
+    created = _utc(pipelines["created_at"])
+    pipelines = pipelines.assign(
+        created_at=created,
+        month=_month(created),
+        failed=(pipelines["status"] == "failed").astype("float64"),
+    )
+
+    jobs = _typed(jobs_df, ["team", "project", "created_at", "duration"])
+    created = _utc(jobs["created_at"])
+    jobs = jobs.assign(
+        created_at=created,
+        month=_month(created),
+        ci_minutes=jobs["duration"].astype("float64") / 60,
+    )
+
+    incidents = _typed(incident_df, ["team", "project", "created_at", "closed_at"])
+    created = _utc(incidents["created_at"])
+    incidents = incidents.assign(
+        created_at=created,
+        month=_month(created),
+        mttr_minutes=(_utc(incidents["closed_at"]) - created).dt.total_seconds() / 60,
+    )
+
+    return {"deployments": deploy, "pipelines": pipelines, "jobs": jobs, "incidents": incidents}
+
+
+def window_frames(frames, start_date, end_date):
+    """Rows created in [start_date, end_date] (dates, inclusive), as the REST collection is bounded."""
+    lo = pd.Timestamp(start_date, tz="UTC")
+    hi = pd.Timestamp(end_date, tz="UTC") + pd.Timedelta(days=1)
+    return {
+        name: df[(df["created_at"] >= lo) & (df["created_at"] < hi)].reset_index(drop=True)
+        for name, df in frames.items()
+    }
+
+
+def _group(df, by):
+    # observed=True: only the category combinations that actually occur
+    return df.groupby(["month", *by], observed=True, sort=True)
+
+
+def _finish(df):
+    df["month"] = df["month"].astype(str)
+    return df
+
+
+# =========================
+# DORA METRICS (MONTHLY)
+# =========================
+def calculate_dora(frames, by=()):
+    """Monthly DORA metrics, optionally broken down by ("team",) or ("project",)."""
+    by = list(by)
+    dora = _group(frames["deployments"], by).agg(
+        prod_deployments=("created_at", "count"),
+        lead_time_hours=("lead_time_hours", "median")
+    )
+    # Failure rate is the mean of a 0/1 column: a plain vectorized reduction
+    cfr = _group(frames["pipelines"], by)["failed"].mean().mul(100).rename("change_failure_rate")
+    mttr = _group(frames["incidents"], by)["mttr_minutes"].mean()
+
+    dora = dora.join(cfr, how="left").join(mttr, how="left").reset_index()
+    return _finish(dora)
+
+# =========================
+# CI COST
+# =========================
+def calculate_cost(frames, by=()):
+    cost = _group(frames["jobs"], list(by))["ci_minutes"].sum().reset_index()
+    cost["ci_cost"] = cost["ci_minutes"] * RUNNER_COST_PER_MINUTE
+    return _finish(cost)
+
+# =========================
+# COST VS DORA
+# =========================
+def merge_cost_dora(dora_df, cost_df, by=()):
+    df = dora_df.merge(cost_df, on=["month", *by], how="left")
+    df["deployments_per_1k_cost"] = (
+        df["prod_deployments"] / df["ci_cost"] * 1000
+    )
+    return df
+
+# =========================
+# EXECUTIVE SUMMARY
+# =========================
+def generate_summary(df, output_dir, month=REPORT_MONTH):
+    if df.empty:
+        # No prod deployments in the window: nothing to average, but the report still gets a summary
+        with open(f"{output_dir}/executive_summary.txt", "w") as f:
+            f.write(f"ENGINEERING PORTFOLIO – MONTHLY SUMMARY ({month})\n\nNo production deployments in {month}")
+        return
+
+    latest = df.iloc[-1]
+
+    summary = f"""
+ENGINEERING PORTFOLIO – MONTHLY SUMMARY ({latest.month})
+
+Production Deployments : {int(latest.prod_deployments)}
+Lead Time              : {round(latest.lead_time_hours / 24, 2)} days
+Change Failure Rate    : {round(latest.change_failure_rate, 2)} %
+MTTR                   : {round(latest.mttr_minutes, 1)} minutes
+CI Cost                : ${round(latest.ci_cost, 2)}
+Deployments per $1K CI : {round(latest.deployments_per_1k_cost, 1)}
+"""
+
+    with open(f"{output_dir}/executive_summary.txt", "w") as f:
+        f.write(summary.strip())
+
+# =========================
+# MAIN
+# =========================
+def main():
+    output_dir = f"{OUTPUT_ROOT}/{REPORT_MONTH}"
+    os.makedirs(output_dir, exist_ok=True)
+
+    if INCREMENTAL:
+        deploy_df, pipeline_df, jobs_df, incident_df = collect_data_incremental()
+    else:
+        deploy_df, pipeline_df, jobs_df, incident_df = collect_data()
+
+    frames = prepare_frames(deploy_df, pipeline_df, jobs_df, incident_df)
+    if INCREMENTAL:
+        # The store holds all history since INITIAL_SINCE; report on last month only
+        frames = window_frames(frames, START_DATE, END_DATE)
+
+    dora_df = calculate_dora(frames)
+    cost_df = calculate_cost(frames)
+    final_df = merge_cost_dora(dora_df, cost_df)
+
+    dora_df.to_csv(f"{output_dir}/dora_monthly.csv", index=False)
+    cost_df.to_csv(f"{output_dir}/ci_cost_monthly.csv", index=False)
+    final_df.to_csv(f"{output_dir}/cost_vs_dora.csv", index=False)
+
+    # Per-team / per-project breakdowns reuse the already-typed frames
+    for key in BREAKDOWNS:
+        breakdown = merge_cost_dora(calculate_dora(frames, [key]), calculate_cost(frames, [key]), [key])
+        breakdown.to_csv(f"{output_dir}/cost_vs_dora_by_{key}.csv", index=False)
+
+    generate_summary(final_df, output_dir, REPORT_MONTH)
+
+    print(f"✅ Monthly GitLab report generated for {REPORT_MONTH}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+GitLab GraphQL collector for the DORA report
+Projects with their prod deployments, pipelines (with job durations) and
+incidents in nested, cursor-paginated queries; only connections with more
+pages get follow-up requests. Returns the same shapes as gitlab_collector.collect
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from gitlab_collector import MAX_CONCURRENCY, GitLabAPIError
+
+# Page sizes per connection; lower them if GitLab rejects a query as too complex
+PROJECTS_PER_PAGE = 10
+PIPELINES_PER_PAGE = 20
+JOBS_PER_PAGE = 50
+DEPLOYMENTS_PER_PAGE = 50
+INCIDENTS_PER_PAGE = 50
+
+INCIDENT_LABELS = ["type::incident", "env::prod"]
+
+PAGE_INFO = "pageInfo { hasNextPage endCursor }"
+JOBS = f"jobs(first: {JOBS_PER_PAGE}, after: $jobsAfter) {{ {PAGE_INFO} nodes {{ id createdAt duration }} }}"
+
+# Project connections: (variables they use, selection); each pages with its own cursor.
+# Incidents are matched by label only, as with the REST issues endpoint.
+CONNECTIONS = {
+    "pipelines": (("since", "until", "pipelinesAfter", "jobsAfter"), f"""
+        pipelines(updatedAfter: $since, updatedBefore: $until, first: {PIPELINES_PER_PAGE}, after: $pipelinesAfter) {{
+            {PAGE_INFO}
+            nodes {{ id iid status createdAt updatedAt {JOBS} }}
+        }}"""),
+    "deployments": (("env", "deploymentsAfter"), f"""
+        environment(name: $env) {{
+            deployments(first: {DEPLOYMENTS_PER_PAGE}, after: $deploymentsAfter) {{
+                {PAGE_INFO}
+                nodes {{ id createdAt updatedAt commit {{ committedDate }} }}
+            }}
+        }}"""),
+    "incidents": (("labels", "since", "until", "incidentsAfter"), f"""
+        issues(labelName: $labels, createdAfter: $since, createdBefore: $until,
+               first: {INCIDENTS_PER_PAGE}, after: $incidentsAfter) {{
+            {PAGE_INFO}
+            nodes {{ id createdAt closedAt updatedAt }}
+        }}"""),
+}
+
+VARIABLE_TYPES = {
+    "env": "String!", "since": "Time", "until": "Time", "labels": "[String]", "jobsAfter": "String",
+    "pipelinesAfter": "String", "deploymentsAfter": "String", "incidentsAfter": "String",
+}
+
+
+def _declare(names):
+    # GraphQL rejects declared-but-unused variables, so each query declares only its own
+    return ", ".join(f"${n}: {VARIABLE_TYPES[n]}" for n in names)
+
+
+GROUP_QUERY = f"""
+query($group: ID!, $after: String, {_declare(VARIABLE_TYPES)}) {{
+    group(fullPath: $group) {{
+        projects(includeSubgroups: true, first: {PROJECTS_PER_PAGE}, after: $after) {{
+            {PAGE_INFO}
+            nodes {{ id fullPath {" ".join(selection for _, selection in CONNECTIONS.values())} }}
+        }}
+    }}
+}}"""
+
+JOBS_QUERY = f"""
+query($path: ID!, $iid: ID!, $jobsAfter: String) {{
+    project(fullPath: $path) {{ pipeline(iid: $iid) {{ {JOBS} }} }}
+}}"""
+
+
+def _project_query(connection):
+    names, selection = CONNECTIONS[connection]
+    return f"query($path: ID!, {_declare(names)}) {{ project(fullPath: $path) {{ {selection} }} }}"
+
+
+def _gid(global_id):
+    # "gid://gitlab/Ci::Pipeline/123" -> 123, the REST id
+    return int(global_id.rsplit("/", 1)[-1])
+
+
+def _time(value):
+    # Plain dates (START_DATE / END_DATE) as midnight UTC
+    return f"{value}T00:00:00Z" if value and len(value) == 10 else value
+
+
+# =========================
+# REQUESTS
+# =========================
+def query(client, document, variables):
+    r = client.post(client.graphql_url, json={"query": document, "variables": variables})
+    body = r.json()
+    if body.get("errors"):
+        raise GitLabAPIError(f"GraphQL error: {body['errors'][0].get('message')}")
+    return body["data"]
+
+
+def _connection(project, name):
+    if name == "deployments":
+        return (project.get("environment") or {}).get("deployments") or {"nodes": [], "pageInfo": {}}
+    return project.get("issues" if name == "incidents" else name) or {"nodes": [], "pageInfo": {}}
+
+
+# =========================
+# REST-SHAPED ROWS
+# =========================
+def _pipeline(node):
+    # iid is a String in the schema, an integer in REST
+    return {"id": _gid(node["id"]), "iid": int(node["iid"]), "status": node["status"].lower(),
+            "created_at": node["createdAt"], "updated_at": node["updatedAt"]}
+
+
+def _job(node):
+    return {"id": _gid(node["id"]), "created_at": node["createdAt"], "duration": node["duration"]}
+
+
+def _deployment(node):
+    commit = node.get("commit") or {}
+    return {"id": _gid(node["id"]), "created_at": node["createdAt"], "updated_at": node["updatedAt"],
+            "deployable": {"commit": {"created_at": commit.get("committedDate")}}}
+
+
+def _incident(node):
+    return {"id": _gid(node["id"]), "created_at": node["createdAt"], "closed_at": node["closedAt"],
+            "updated_at": node["updatedAt"]}
+
+
+ROWS = {"pipelines": _pipeline, "deployments": _deployment, "incidents": _incident}
+
+
+# =========================
+# COLLECTION
+# =========================
+def collect(client, group_path, environment, start_date, end_date, max_concurrency=MAX_CONCURRENCY):
+    """
+    (projects, deployments, pipelines, jobs, incidents) like gitlab_collector.collect,
+    keyed by the same numeric ids. The group is addressed by its full path.
+    """
+    if not group_path:
+        raise GitLabAPIError("The GraphQL collector needs the group's full path")
+    base = {"env": environment, "since": _time(start_date), "until": _time(end_date), "labels": INCIDENT_LABELS}
+    projects, paths = [], {}
+    results = {name: {} for name in ROWS}
+    jobs = {}
+    follow_ups = []  # (kind, project id, extra) still to page through
+
+    def absorb_pipelines(pid, nodes):
+        for node in nodes:
+            pl = _pipeline(node)
+            results["pipelines"][pid].append(pl)
+            conn = node["jobs"]
+            jobs[(pid, pl["id"])] = [_job(j) for j in conn["nodes"]]
+            if conn["pageInfo"].get("hasNextPage"):
+                follow_ups.append(("jobs", pid, (pl["id"], pl["iid"], conn["pageInfo"]["endCursor"])))
+
+    def absorb(pid, name, conn):
+        if name == "pipelines":
+            absorb_pipelines(pid, conn["nodes"])
+        else:
+            results[name][pid].extend(ROWS[name](n) for n in conn["nodes"])
+        if conn["pageInfo"].get("hasNextPage"):
+            follow_ups.append((name, pid, conn["pageInfo"]["endCursor"]))
+
+    # Projects page by page, each with the first page of every connection nested inside
+    after = None
+    while True:
+        data = query(client, GROUP_QUERY, dict(base, group=group_path, after=after))
+        if data["group"] is None:
+            raise GitLabAPIError(f"Group {group_path!r} not found or not visible to the token")
+        page = data["group"]["projects"]
+        for node in page["nodes"]:
+            pid = _gid(node["id"])
+            projects.append({"id": pid, "path_with_namespace": node["fullPath"]})
+            paths[pid] = node["fullPath"]
+            for name in ROWS:
+                results[name][pid] = []
+                absorb(pid, name, _connection(node, name))
+        if not page["pageInfo"]["hasNextPage"]:
+            break
+        after = page["pageInfo"]["endCursor"]
+
+    # Only connections that overflowed their first page are followed, concurrently per round
+    def fetch(task):
+        kind, pid, extra = task
+        if kind == "jobs":
+            pipeline_id, iid, cursor = extra
+            data = query(client, JOBS_QUERY, {"path": paths[pid], "iid": str(iid), "jobsAfter": cursor})
+            return task, data["project"]["pipeline"]["jobs"]
+        names, _ = CONNECTIONS[kind]
+        variables = {n: base[n] for n in names if n in base}
+        variables.update({"path": paths[pid], f"{kind}After": extra})
+        data = query(client, _project_query(kind), variables)
+        return task, _connection(data["project"], kind)
+
+    with ThreadPoolExecutor(max_workers=max_concurrency) as pool:
+        while follow_ups:
+            batch, follow_ups[:] = list(follow_ups), []
+            for (kind, pid, extra), conn in pool.map(fetch, batch):
+                if kind == "jobs":
+                    pipeline_id, iid, _ = extra
+                    jobs[(pid, pipeline_id)].extend(_job(j) for j in conn["nodes"])
+                    if conn["pageInfo"].get("hasNextPage"):
+                        follow_ups.append(("jobs", pid, (pipeline_id, iid, conn["pageInfo"]["endCursor"])))
+                else:
+                    absorb(pid, kind, conn)
+
+    return projects, results["deployments"], results["pipelines"], jobs, results["incidents"]
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Incremental GitLab DORA collection
+Per-project high-water marks (JSON) + append-only Parquet store
+"""
+
+import glob
+import json
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, UTC
+import pandas as pd
+from gitlab_collector import (
+    MAX_CONCURRENCY, project_team, fetch_projects, fetch_deployments, fetch_pipelines, fetch_jobs, fetch_incidents
+)
+
+DEFAULT_STATE_FILE = "gitlab_dora_state.json"
+DEFAULT_STORE_DIR = "gitlab_dora_store"
+
+# Columns that identify a record; the newest `updated_at` wins on read
+KEYS = {
+    "deployments": ["project_id", "id"],
+    "pipelines": ["project_id", "id"],
+    "jobs": ["project_id", "id"],
+    "incidents": ["project_id", "id"],
+}
+
+
+# =========================
+# HIGH-WATER MARKS
+# =========================
+class HighWaterMarks:
+    """{project_id: {resource: last updated_at seen}} persisted as JSON"""
+
+    def __init__(self, path=DEFAULT_STATE_FILE):
+        self.path = path
+        self.marks = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.marks = json.load(f)
+
+    def get(self, project_id, resource):
+        return self.marks.get(str(project_id), {}).get(resource)
+
+    def advance(self, project_id, resource, rows):
+        stamps = [r["updated_at"] for r in rows if r.get("updated_at")]
+        if not stamps:
+            return
+        current = self.get(project_id, resource)
+        newest = max(stamps, key=pd.Timestamp)
+        if current is None or pd.Timestamp(newest) > pd.Timestamp(current):
+            self.marks.setdefault(str(project_id), {})[resource] = newest
+
+    def save(self):
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.marks, f, indent=2, sort_keys=True)
+        os.replace(tmp, self.path)
+
+
+# =========================
+# COLUMNAR STORE
+# =========================
+class ColumnarStore:
+    """One directory per resource, one Parquet part file per append"""
+
+    def __init__(self, root=DEFAULT_STORE_DIR):
+        self.root = root
+
+    def append(self, resource, rows):
+        if not rows:
+            return
+        folder = os.path.join(self.root, resource)
+        os.makedirs(folder, exist_ok=True)
+        stamp = datetime.now(UTC).strftime("%Y%m%dT%H%M%S")
+        pd.DataFrame(rows).to_parquet(os.path.join(folder, f"part-{stamp}-{uuid.uuid4().hex[:8]}.parquet"), index=False)
+
+    def read(self, resource):
+        parts = sorted(glob.glob(os.path.join(self.root, resource, "*.parquet")))
+        if not parts:
+            return pd.DataFrame()
+        df = pd.concat([pd.read_parquet(p) for p in parts], ignore_index=True)
+        # Re-fetched records (updated since last run) supersede older copies
+        if "updated_at" in df.columns:
+            df = df.sort_values("updated_at", kind="stable")
+        return df.drop_duplicates(KEYS[resource], keep="last").reset_index(drop=True)
+
+
+# =========================
+# ROW SHAPES
+# =========================
+def _project_cols(p):
+    return {"project_id": p["id"], "project": p["path_with_namespace"], "team": project_team(p)}
+
+
+def deployment_row(p, d):
+    return {
+        **_project_cols(p), "id": d["id"], "updated_at": d.get("updated_at"),
+        "created_at": d["created_at"],
+        "commit_time": d["deployable"]["commit"]["created_at"]
+    }
+
+
+def pipeline_row(p, pl):
+    return {
+        **_project_cols(p), "id": pl["id"], "updated_at": pl.get("updated_at"),
+        "created_at": pl["created_at"], "status": pl["status"]
+    }
+
+
+def job_row(p, pipeline_id, j):
+    return {
+        **_project_cols(p), "pipeline_id": pipeline_id, "id": j["id"],
+        "created_at": j["created_at"], "duration": j["duration"]
+    }
+
+
+def incident_row(p, i):
+    return {
+        **_project_cols(p), "id": i["id"], "updated_at": i.get("updated_at"),
+        "created_at": i["created_at"], "closed_at": i.get("closed_at")
+    }
+
+
+# =========================
+# INCREMENTAL COLLECTION
+# =========================
+def collect_incremental(client, store, marks, group_id, environment, initial_since, max_concurrency=MAX_CONCURRENCY):
+    """
+    Fetch only records updated since each project's mark (or initial_since on
+    the first run), append them to the store, then advance and save the marks.
+    Returns the number of new rows per resource.
+    """
+    projects = fetch_projects(client, group_id)
+
+    def per_project(p):
+        pid = p["id"]
+        deployments = fetch_deployments(client, pid, environment, marks.get(pid, "deployments") or initial_since)
+        pipelines = fetch_pipelines(client, pid, marks.get(pid, "pipelines") or initial_since)
+        incidents = fetch_incidents(client, pid, updated_after=marks.get(pid, "incidents") or initial_since)
+        return deployments, pipelines, incidents
+
+    with ThreadPoolExecutor(max_workers=max_concurrency) as pool:
+        fetched = list(pool.map(per_project, projects))
+        # Jobs only for pipelines that are new or changed since the last run
+        refs = [(p, pl["id"]) for p, (_, pls, _) in zip(projects, fetched) for pl in pls]
+        jobs = list(pool.map(lambda ref: fetch_jobs(client, ref[0]["id"], ref[1]), refs))
+
+    rows = {
+        "deployments": [deployment_row(p, d) for p, (ds, _, _) in zip(projects, fetched) for d in ds],
+        "pipelines": [pipeline_row(p, pl) for p, (_, pls, _) in zip(projects, fetched) for pl in pls],
+        "jobs": [job_row(p, plid, j) for (p, plid), js in zip(refs, jobs) for j in js],
+        "incidents": [incident_row(p, i) for p, (_, _, inc) in zip(projects, fetched) for i in inc],
+    }
+    for resource, resource_rows in rows.items():
+        store.append(resource, resource_rows)
+
+    # Marks move only after the data is safely stored
+    for p, (ds, pls, inc) in zip(projects, fetched):
+        marks.advance(p["id"], "deployments", ds)
+        marks.advance(p["id"], "pipelines", pls)
+        marks.advance(p["id"], "incidents", inc)
+    marks.save()
+
+    return {resource: len(resource_rows) for resource, resource_rows in rows.items()}
+
+
+def load_frames(store):
+    """Stored data shaped like gitlab_dora_report.collect_data() output."""
+    deploy_df = store.read("deployments")
+    pipeline_df = store.read("pipelines")
+    jobs_df = store.read("jobs")
+    incident_df = store.read("incidents")
+
+    if not jobs_df.empty:
+        jobs_df = jobs_df[jobs_df["duration"].fillna(0) > 0].reset_index(drop=True)
+    if not incident_df.empty:
+        incident_df = incident_df[incident_df["closed_at"].notna()].reset_index(drop=True)
+    return deploy_df, pipeline_df, jobs_df, incident_df
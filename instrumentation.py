@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Run instrumentation for the downtime reports
+Stage timings, AWS calls and throttles per operation, bytes and datapoints,
+emitted as JSON and/or a Prometheus textfile at the end of a run
+"""
+
+import json
+import logging
+import logging.handlers
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, UTC
+import aws_retry
+
+LOG_BUFFER_RECORDS = 500   # status-file lines held in memory between writes
+
+
+# =========================
+# BUFFERED LOGGING
+# =========================
+def buffered_logger(name, path, capacity=LOG_BUFFER_RECORDS):
+    """
+    Console output as before, file output batched through a MemoryHandler.
+    The buffer flushes when full, on ERROR and at interpreter exit.
+    """
+    logger = logging.getLogger(name)
+    if logger.handlers:
+        return logger
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+    console = logging.StreamHandler(sys.stdout)
+    console.setFormatter(logging.Formatter("%(message)s"))
+    status_file = logging.FileHandler(path, encoding="utf-8", delay=True)
+    status_file.setFormatter(logging.Formatter("%(message)s"))
+
+    logger.addHandler(console)
+    logger.addHandler(logging.handlers.MemoryHandler(capacity, flushLevel=logging.ERROR, target=status_file))
+    return logger
+
+
+# =========================
+# RUN METRICS
+# =========================
+class RunMetrics:
+    """
+    Stage seconds are summed across threads, so stages running concurrently
+    (e.g. several regions) can add up to more than the run's wall time.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.started_at = datetime.now(UTC)
+        self._t0 = time.perf_counter()
+        self._lock = threading.Lock()
+        self.stages = {}                # stage -> seconds
+        self.calls = {}                 # operation -> API calls
+        self.errors = {}                # operation -> calls that returned an error
+        self.throttled_responses = {}   # operation -> throttled HTTP attempts seen by botocore
+        self.backoff_retries = {}       # operation -> aws_retry.call_with_backoff retries
+        self.counters = {}              # (name, stage) -> value
+        self.bytes = 0
+        aws_retry.add_retry_listener(self._on_backoff_retry)
+
+    def _add(self, table, key, value=1):
+        with self._lock:
+            table[key] = table.get(key, 0) + value
+
+    # ---------- RECORDING ----------
+    @contextmanager
+    def stage(self, name):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._add(self.stages, name, time.perf_counter() - t0)
+
+    def count(self, name, value=1, stage=None):
+        self._add(self.counters, (name, stage), value)
+
+    def instrument(self, client):
+        """Count calls, errors, throttles and response bytes for a boto3 client."""
+        events = client.meta.events
+        events.register("after-call", self._after_call, unique_id=f"run-metrics-after-call-{id(self)}")
+        events.register("needs-retry", self._needs_retry, unique_id=f"run-metrics-needs-retry-{id(self)}")
+        return client
+
+    def _after_call(self, http_response, model, **kwargs):
+        self._add(self.calls, model.name)
+        if http_response.status_code >= 300:
+            self._add(self.errors, model.name)
+        length = http_response.headers.get("content-length") or http_response.headers.get("Content-Length")
+        if length:
+            with self._lock:
+                self.bytes += int(length)
+
+    def _needs_retry(self, response, operation, **kwargs):
+        if response is None:
+            return
+        code = response[1].get("Error", {}).get("Code")
+        if code in aws_retry.THROTTLE_CODES:
+            self._add(self.throttled_responses, operation.name)
+
+    def _on_backoff_retry(self, operation, error, attempt):
+        self._add(self.backoff_retries, operation)
+
+    # ---------- OUTPUT ----------
+    def summary(self):
+        with self._lock:
+            stages = {}
+            for stage, seconds in self.stages.items():
+                datapoints = self.counters.get(("datapoints", stage), 0)
+                stages[stage] = {
+                    "seconds": round(seconds, 3),
+                    "datapoints": datapoints,
+                    "datapoints_per_sec": round(datapoints / seconds, 1) if seconds and datapoints else 0.0,
+                }
+            return {
+                "run": self.name,
+                "started_at": self.started_at.isoformat(),
+                "duration_seconds": round(time.perf_counter() - self._t0, 3),
+                "stages": stages,
+                "api_calls": dict(self.calls),
+                "api_errors": dict(self.errors),
+                "throttled_responses": dict(self.throttled_responses),
+                "backoff_retries": dict(self.backoff_retries),
+                "bytes_downloaded": self.bytes,
+                "counters": {name if stage is None else f"{name}.{stage}": v for (name, stage), v in self.counters.items()},
+            }
+
+    def write_json(self, path):
+        _atomic_write(path, json.dumps(self.summary(), indent=2))
+
+    def write_prometheus(self, path, prefix="downtime_report"):
+        """node_exporter textfile-collector format; the file is replaced atomically."""
+        s = self.summary()
+        run = f'run="{self.name}"'
+        lines = [
+            f"# TYPE {prefix}_duration_seconds gauge",
+            f"{prefix}_duration_seconds{{{run}}} {s['duration_seconds']}",
+            f"# TYPE {prefix}_last_run_timestamp_seconds gauge",
+            f"{prefix}_last_run_timestamp_seconds{{{run}}} {self.started_at.timestamp():.0f}",
+            f"# TYPE {prefix}_stage_seconds gauge",
+            *(f'{prefix}_stage_seconds{{{run},stage="{k}"}} {v["seconds"]}' for k, v in s["stages"].items()),
+            f"# TYPE {prefix}_stage_datapoints_per_second gauge",
+            *(f'{prefix}_stage_datapoints_per_second{{{run},stage="{k}"}} {v["datapoints_per_sec"]}'
+              for k, v in s["stages"].items() if v["datapoints"]),
+            f"# TYPE {prefix}_bytes_downloaded gauge",
+            f"{prefix}_bytes_downloaded{{{run}}} {s['bytes_downloaded']}",
+        ]
+        for table in ("api_calls", "api_errors", "throttled_responses", "backoff_retries"):
+            lines.append(f"# TYPE {prefix}_{table} gauge")
+            lines.extend(f'{prefix}_{table}{{{run},operation="{op}"}} {n}' for op, n in sorted(s[table].items()))
+        _atomic_write(path, "\n".join(lines) + "\n")
+
+    def emit(self, json_path=None, prom_path=None):
+        if json_path:
+            self.write_json(json_path)
+        if prom_path:
+            self.write_prometheus(prom_path)
+        return self.summary()
+
+
+def _atomic_write(path, text):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, path)
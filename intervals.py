@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Array-backed interval sets for outage timelines
+Sorted, disjoint [start, end) epoch-second intervals in one N x 2 int64 array,
+with union / intersection / difference / clip in O(n log n), plus adapters
+for CloudWatch downtime results and CloudTrail state events
+"""
+
+import numpy as np
+from downtime_engine import epoch_seconds
+
+DOWN_EVENTS = ("StopInstances", "TerminateInstances")
+UP_EVENTS = ("StartInstances",)
+
+
+def _secs(t):
+    # Epoch seconds pass through; datetimes are converted (naive = UTC)
+    return int(t) if isinstance(t, (int, np.integer)) else epoch_seconds(t)
+
+
+def _normalize(bounds):
+    """Sort and merge overlapping or touching intervals; drops empty ones."""
+    bounds = np.asarray(bounds, dtype=np.int64).reshape(-1, 2)
+    bounds = bounds[bounds[:, 1] > bounds[:, 0]]
+    if len(bounds) < 2:
+        return bounds
+    bounds = bounds[np.argsort(bounds[:, 0], kind="stable")]
+    reach = np.maximum.accumulate(bounds[:, 1])
+    # A new run starts wherever an interval begins after everything before it has ended
+    new = np.empty(len(bounds), dtype=bool)
+    new[0] = True
+    new[1:] = bounds[1:, 0] > reach[:-1]
+    first = np.flatnonzero(new)
+    last = np.append(first[1:], len(bounds)) - 1
+    return np.column_stack([bounds[first, 0], reach[last]])
+
+
+def _coverage(sets, at_least):
+    """Intervals covered by at least `at_least` of the (normalized) sets."""
+    bounds = [s.bounds for s in sets if len(s)]
+    if len(bounds) < at_least:
+        return np.empty((0, 2), dtype=np.int64)
+    both = np.concatenate(bounds)
+    pos = np.concatenate([both[:, 0], both[:, 1]])
+    delta = np.concatenate([np.ones(len(both), np.int64), -np.ones(len(both), np.int64)])
+    # Ends sort before starts at the same instant, so touching intervals never overlap
+    order = np.lexsort((delta, pos))
+    pos, depth = pos[order], np.cumsum(delta[order])
+    inside = depth >= at_least
+    lo, hi = pos[:-1][inside[:-1]], pos[1:][inside[:-1]]
+    return _normalize(np.column_stack([lo, hi]))
+
+
+class IntervalSet:
+    __slots__ = ("bounds",)
+
+    def __init__(self, bounds=()):
+        self.bounds = _normalize(bounds)
+
+    @classmethod
+    def _raw(cls, bounds):
+        s = cls.__new__(cls)
+        s.bounds = bounds
+        return s
+
+    @classmethod
+    def from_datetimes(cls, pairs):
+        return cls([(epoch_seconds(a), epoch_seconds(b)) for a, b in pairs])
+
+    @classmethod
+    def union_all(cls, sets):
+        sets = list(sets)
+        if not sets:
+            return cls()
+        return cls(np.concatenate([s.bounds for s in sets]))
+
+    # ---------- SET OPERATIONS ----------
+    def union(self, other):
+        return IntervalSet.union_all([self, other])
+
+    def intersection(self, other):
+        return IntervalSet._raw(_coverage([self, other], 2))
+
+    def complement(self, start, end):
+        """Everything in [start, end) not covered by this set."""
+        lo, hi = _secs(start), _secs(end)
+        inner = self.clip(lo, hi).bounds
+        # [lo, s1], [e1, s2], ..., [en, hi]
+        return IntervalSet(np.concatenate([[lo], inner.ravel(), [hi]]).reshape(-1, 2))
+
+    def difference(self, other):
+        if not len(self) or not len(other):
+            return self
+        return self.intersection(other.complement(int(self.bounds[0, 0]), int(self.bounds[-1, 1])))
+
+    def clip(self, start, end):
+        lo, hi = _secs(start), _secs(end)
+        clipped = self.bounds.clip(lo, hi)
+        return IntervalSet._raw(clipped[clipped[:, 1] > clipped[:, 0]])
+
+    # ---------- MEASURES ----------
+    def __len__(self):
+        return len(self.bounds)
+
+    def __iter__(self):
+        return (tuple(map(int, row)) for row in self.bounds)
+
+    def __repr__(self):
+        return f"IntervalSet({len(self)} intervals, {self.total_seconds()}s)"
+
+    def total_seconds(self):
+        return int((self.bounds[:, 1] - self.bounds[:, 0]).sum())
+
+    def total_minutes(self):
+        return self.total_seconds() / 60
+
+    def longest_seconds(self):
+        return int((self.bounds[:, 1] - self.bounds[:, 0]).max()) if len(self) else 0
+
+
+# =========================
+# ADAPTERS
+# =========================
+def from_downtime(result, include_gaps=False):
+    """downtime_engine.DowntimeResult -> outage IntervalSet (optionally counting gaps as down)"""
+    if include_gaps:
+        return IntervalSet(np.concatenate([result.outages, result.gaps]))
+    return IntervalSet._raw(np.asarray(result.outages, dtype=np.int64).reshape(-1, 2))
+
+
+def from_state_events(events, start, end, down_events=DOWN_EVENTS, up_events=UP_EVENTS):
+    """
+    CloudTrail [{"time", "event"}] -> stopped intervals within [start, end).
+    Down from the first Stop/Terminate until the next Start; still down at `end` if never started.
+    """
+    bounds, down_since = [], None
+    for e in sorted(events, key=lambda e: e["time"]):
+        if e["event"] in down_events and down_since is None:
+            down_since = e["time"]
+        elif e["event"] in up_events and down_since is not None:
+            bounds.append((epoch_seconds(down_since), epoch_seconds(e["time"])))
+            down_since = None
+    if down_since is not None:
+        bounds.append((epoch_seconds(down_since), epoch_seconds(end)))
+    return IntervalSet(bounds).clip(start, end)
+
+
+def composite(*sets):
+    """Union of several sources' outages: overlapping outages count once."""
+    return IntervalSet.union_all(sets)
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Local SQLite cache for CloudWatch series
+Only missing or still-mutable time ranges are fetched on each run
+"""
+
+import json
+import sqlite3
+import time
+from datetime import datetime, UTC
+from aws_clients import client_scope
+from cw_metrics import RETENTION_TIERS, fetch_metric_data, retention_segments
+
+DEFAULT_CACHE_PATH = "cloudwatch_metric_cache.sqlite"
+# Datapoints older than this are evicted: the oldest age retention_segments still serves (455 days),
+# so long windows stay cached instead of being refetched on every run
+RETENTION_DAYS = RETENTION_TIERS[-1][0].days
+MUTABLE_SECONDS = 3 * 3600  # CloudWatch may still revise the most recent buckets
+
+
+def _epoch(dt):
+    # Naive datetimes (datetime.utcnow()) are UTC, as botocore treats them
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=UTC)
+    return int(dt.timestamp())
+
+
+def series_key(query, scope=(None, None)):
+    """
+    Stable key over account, region, namespace, metric, dimensions, period and statistic.
+    scope: (account id, region), as from aws_clients.client_scope
+    """
+    return json.dumps([
+        *scope,
+        query["Namespace"],
+        query["MetricName"],
+        sorted(query["Dimensions"].items()),
+        query["Period"],
+        query["Stat"],
+    ], separators=(",", ":"))
+
+
+class MetricCache:
+    def __init__(self, path=DEFAULT_CACHE_PATH, retention_days=RETENTION_DAYS, mutable_seconds=MUTABLE_SECONDS):
+        self.retention_seconds = retention_days * 86400
+        self.mutable_seconds = mutable_seconds
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS datapoints (
+                series TEXT NOT NULL,
+                ts     INTEGER NOT NULL,
+                value  REAL NOT NULL,
+                PRIMARY KEY (series, ts)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS coverage (
+                series TEXT NOT NULL,
+                start  INTEGER NOT NULL,
+                end    INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS coverage_series ON coverage (series);
+        """)
+
+    def close(self):
+        self.conn.close()
+
+    # ---------- COVERAGE ----------
+    def _coverage(self, key):
+        rows = self.conn.execute(
+            "SELECT start, end FROM coverage WHERE series = ? ORDER BY start", (key,)
+        ).fetchall()
+        return rows
+
+    def missing_ranges(self, key, start, end):
+        """Sub-ranges of [start, end) (epoch seconds) not yet cached as final."""
+        missing, cursor = [], start
+        for cov_start, cov_end in self._coverage(key):
+            if cov_end <= cursor:
+                continue
+            if cov_start >= end:
+                break
+            if cov_start > cursor:
+                missing.append((cursor, cov_start))
+            cursor = max(cursor, cov_end)
+        if cursor < end:
+            missing.append((cursor, end))
+        return missing
+
+    def _add_coverage(self, key, start, end):
+        ranges = self._coverage(key) + [(start, end)]
+        ranges.sort()
+        merged = [list(ranges[0])]
+        for s, e in ranges[1:]:
+            if s <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], e)
+            else:
+                merged.append([s, e])
+        self.conn.execute("DELETE FROM coverage WHERE series = ?", (key,))
+        self.conn.executemany(
+            "INSERT INTO coverage (series, start, end) VALUES (?, ?, ?)",
+            [(key, s, e) for s, e in merged]
+        )
+
+    # ---------- DATA ----------
+    def store(self, key, points, start, end, period, now=None):
+        """Replace [start, end) for one series with freshly fetched points."""
+        now = now if now is not None else time.time()
+        with self.conn:
+            self.conn.execute(
+                "DELETE FROM datapoints WHERE series = ? AND ts >= ? AND ts < ?", (key, start, end)
+            )
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO datapoints (series, ts, value) VALUES (?, ?, ?)",
+                [(key, _epoch(ts), value) for ts, value in points]
+            )
+            # Only buckets that CloudWatch will no longer revise count as covered
+            final_end = min(end, int(now - self.mutable_seconds) // period * period)
+            if final_end > start:
+                self._add_coverage(key, start, final_end)
+
+    def load(self, key, start, end):
+        rows = self.conn.execute(
+            "SELECT ts, value FROM datapoints WHERE series = ? AND ts >= ? AND ts < ? ORDER BY ts",
+            (key, start, end)
+        )
+        return [(datetime.fromtimestamp(ts, UTC), value) for ts, value in rows]
+
+    def evict(self, now=None):
+        cutoff = int((now if now is not None else time.time()) - self.retention_seconds)
+        with self.conn:
+            self.conn.execute("DELETE FROM datapoints WHERE ts < ?", (cutoff,))
+            self.conn.execute("DELETE FROM coverage WHERE end <= ?", (cutoff,))
+            self.conn.execute("UPDATE coverage SET start = ? WHERE start < ?", (cutoff, cutoff))
+
+
+# ================= CACHED FETCH ================= #
+
+def fetch_cached(cw, cache, queries, start, end, max_workers=1, now=None, scope=None):
+    """
+    Same contract as cw_metrics.fetch_metric_data, but served from `cache`.
+    Series missing the same range are fetched together in one batched sweep.
+    Each retention segment is cached under its own (coarser) period.
+    scope: (account id, region) the series belong to; default from the client
+    """
+    cache.evict()
+    scope = scope if scope is not None else client_scope(cw)
+    series = {k: [] for k in queries}
+    finest_period = min((q["Period"] for q in queries.values()), default=60)
+    for seg_start, seg_end, finest in retention_segments(start, end, finest_period, now):
+        seg_queries = {k: dict(q, Period=max(q["Period"], finest)) for k, q in queries.items()}
+        for k, points in _fetch_cached_segment(cw, cache, seg_queries, seg_start, seg_end, max_workers, scope).items():
+            series[k].extend(points)
+    return series
+
+
+def _fetch_cached_segment(cw, cache, queries, start, end, max_workers, scope):
+    keys = {k: series_key(q, scope) for k, q in queries.items()}
+
+    # Align to the period grid so partial buckets are never cached as final
+    pending = {}
+    for k, q in queries.items():
+        period = q["Period"]
+        lo = _epoch(start) // period * period
+        hi = -(-_epoch(end) // period) * period
+        for rng in cache.missing_ranges(keys[k], lo, hi):
+            pending.setdefault(rng, []).append(k)
+
+    for (lo, hi), group in pending.items():
+        fetched = fetch_metric_data(
+            cw, {k: queries[k] for k in group},
+            datetime.fromtimestamp(lo, UTC), datetime.fromtimestamp(hi, UTC),
+            max_workers=max_workers, retention=False
+        )
+        for k in group:
+            cache.store(keys[k], fetched[k], lo, hi, queries[k]["Period"])
+
+    return {
+        k: cache.load(keys[k], _epoch(start) // q["Period"] * q["Period"], _epoch(end))
+        for k, q in queries.items()
+    }
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Metric-existence discovery with a local TTL cache
+One paginated list_metrics per (namespace, metric, filter) tells which
+dimension sets exist, so series that were never published are skipped
+instead of fetched and mistaken for downtime
+"""
+
+import json
+import os
+import time
+from aws_clients import client_scope
+from aws_retry import call_with_backoff
+
+DEFAULT_DISCOVERY_PATH = "cloudwatch_metric_discovery.json"
+DISCOVERY_TTL = 6 * 3600   # seconds a listing is trusted; list_metrics itself only covers ~2 weeks
+
+
+def _listing_key(scope, namespace, metric_name, filters):
+    # scope = (account id, region): same-named clusters elsewhere have their own listings
+    return json.dumps([*scope, namespace, metric_name, sorted(filters.items())], separators=(",", ":"))
+
+
+class MetricDiscovery:
+    """{listing key: {"listed_at", "dimensions": [{name: value}, ...]}} persisted as JSON"""
+
+    def __init__(self, path=DEFAULT_DISCOVERY_PATH, ttl=DISCOVERY_TTL):
+        self.path = path
+        self.ttl = ttl
+        self.listings = {}
+        if path and os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.listings = json.load(f)
+
+    def save(self):
+        if not self.path:
+            return
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.listings, f)
+        os.replace(tmp, self.path)
+
+    # ---------- LISTING ----------
+    def dimension_sets(self, cw, namespace, metric_name, filters):
+        """Every dimension set of namespace/metric that includes `filters` ({name: value})."""
+        key = _listing_key(client_scope(cw), namespace, metric_name, filters)
+        cached = self.listings.get(key)
+        if cached and time.time() - cached["listed_at"] < self.ttl:
+            return cached["dimensions"]
+
+        dimensions = []
+        kwargs = {
+            "Namespace": namespace,
+            "MetricName": metric_name,
+            "Dimensions": [{"Name": k, "Value": v} for k, v in filters.items()],
+        }
+        while True:
+            page = call_with_backoff(cw.list_metrics, **kwargs)
+            dimensions.extend({d["Name"]: d["Value"] for d in m["Dimensions"]} for m in page.get("Metrics", []))
+            if not page.get("NextToken"):
+                break
+            kwargs["NextToken"] = page["NextToken"]
+
+        unique = list({json.dumps(d, sort_keys=True): d for d in dimensions}.values())
+        self.listings[key] = {"listed_at": time.time(), "dimensions": unique}
+        return unique
+
+    def resolve(self, cw, candidates, dimensions, filters=None):
+        """
+        First (namespace, metric_name) in `candidates` publishing exactly `dimensions`,
+        or None. `filters` (default: all of `dimensions`) scopes the listing, so one
+        listing per cluster can serve all of its services.
+        """
+        filters = filters if filters is not None else dimensions
+        for namespace, metric_name in candidates:
+            if dimensions in self.dimension_sets(cw, namespace, metric_name, filters):
+                return namespace, metric_name
+        return None
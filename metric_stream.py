@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""
+Push ingestion of CloudWatch Metric Streams (Firehose JSON output)
+Reads newly delivered objects from S3 or a local directory, keeps one
+down/up flag per resource and minute in SQLite, and answers downtime
+queries from that state, without polling CloudWatch
+"""
+
+import gzip
+import io
+import json
+import os
+import sqlite3
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, UTC
+import numpy as np
+import pandas as pd
+from aws_retry import call_with_backoff, paginate
+from downtime_engine import analyze, down_if_zero, down_if_positive, epoch_seconds
+
+DEFAULT_STATE_PATH = "metric_stream_state.sqlite"
+MAX_WORKERS = 8            # objects read and decoded concurrently
+RETENTION_DAYS = 45        # minute flags older than this are evicted
+LATE_DELIVERY = 3600       # seconds; S3 keys ingested this recently are re-listed in case of late siblings
+PERIOD = 60                # Metric Streams deliver one-minute aggregates
+
+# (namespace, metric) -> (resource kind, identifying dimensions, down predicate on the minute's average)
+STREAM_METRICS = {
+    ("ECS/ContainerInsights", "RunningTaskCount"): ("ecs", ("ClusterName", "ServiceName"), down_if_zero),
+    ("AWS/ApplicationELB", "HealthyHostCount"): ("alb", ("LoadBalancer", "TargetGroup"), down_if_zero),
+    ("AWS/EC2", "StatusCheckFailed"): ("ec2", ("InstanceId",), down_if_positive),
+}
+
+
+class StreamReadError(Exception): pass
+
+
+# =========================
+# SOURCES
+# =========================
+class LocalSource:
+    """Firehose output copied (or synced) to a local directory."""
+
+    def __init__(self, root):
+        self.root = root
+
+    def keys(self, start_after=None):
+        keys = []
+        for folder, _, files in os.walk(self.root):
+            keys.extend(os.path.relpath(os.path.join(folder, f), self.root) for f in files)
+        return sorted(k for k in keys if start_after is None or k > start_after)
+
+    def open(self, key):
+        return open(os.path.join(self.root, key), "rb")
+
+
+class S3Source:
+    """Firehose delivery bucket; keys carry the YYYY/MM/DD/HH delivery time, so they list in arrival order."""
+
+    def __init__(self, s3, bucket, prefix=""):
+        self.s3, self.bucket, self.prefix = s3, bucket, prefix
+
+    def keys(self, start_after=None):
+        params = {"Bucket": self.bucket, "Prefix": self.prefix}
+        if start_after:
+            params["StartAfter"] = start_after
+        keys = []
+        for page in paginate(self.s3.list_objects_v2, "ContinuationToken", "NextContinuationToken", **params):
+            keys.extend(obj["Key"] for obj in page.get("Contents", []))
+        return keys
+
+    def open(self, key):
+        return call_with_backoff(self.s3.get_object, Bucket=self.bucket, Key=key)["Body"]
+
+
+# =========================
+# DECODE
+# =========================
+def iter_stream_records(fileobj):
+    """
+    Yield each metric record of one delivered object (gzip or plain).
+    Records are newline-delimited, but several may share a line when the
+    stream's Firehose adds no delimiter.
+    """
+    raw = io.BufferedReader(fileobj) if not hasattr(fileobj, "peek") else fileobj
+    if raw.peek(2)[:2] == b"\x1f\x8b":
+        raw = gzip.GzipFile(fileobj=raw)
+    decoder = json.JSONDecoder()
+    for line in io.TextIOWrapper(raw, encoding="utf-8"):
+        pos, line = 0, line.strip()
+        while pos < len(line):
+            record, pos = decoder.raw_decode(line, pos)
+            yield record
+            while pos < len(line) and line[pos] in " \t,":
+                pos += 1
+
+
+def minute_flags(records):
+    """
+    Metric records -> [(resource, account, region, minute epoch, down)] for STREAM_METRICS only.
+    resource is "<kind>/<account>/<region>/<dimension values>", e.g. "ecs/<account>/<region>/<cluster>/<service>"
+    """
+    flags = []
+    for r in records:
+        spec = STREAM_METRICS.get((r.get("namespace"), r.get("metric_name")))
+        if spec is None:
+            continue
+        kind, dims, is_down = spec
+        # Exact dimension set only: e.g. skip per-AZ HealthyHostCount
+        if set(r.get("dimensions", {})) != set(dims):
+            continue
+        value = r.get("value") or {}
+        if not value.get("count"):
+            continue
+        average = value["sum"] / value["count"]
+        # Same-named services / target groups exist in other accounts and regions of one stream
+        account, region = r.get("account_id") or "", r.get("region") or ""
+        resource = "/".join([kind, account, region, *(r["dimensions"][d] for d in dims)])
+        minute = int(r["timestamp"]) // 1000 // PERIOD * PERIOD
+        flags.append((resource, account, region, minute, int(bool(is_down(np.float64(average))))))
+    return flags
+
+
+def read_object(source, key):
+    try:
+        with source.open(key) as f:
+            return minute_flags(iter_stream_records(f))
+    except Exception as e:
+        raise StreamReadError(f"Failed to read {key}") from e
+
+
+# =========================
+# STATE
+# =========================
+class StreamState:
+    def __init__(self, path=DEFAULT_STATE_PATH, retention_days=RETENTION_DAYS):
+        self.retention_seconds = retention_days * 86400
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS minutes (
+                resource TEXT NOT NULL,
+                ts       INTEGER NOT NULL,
+                down     INTEGER NOT NULL,
+                PRIMARY KEY (resource, ts)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS resources (
+                resource  TEXT PRIMARY KEY,
+                account   TEXT,
+                region    TEXT,
+                last_seen INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS ingested_keys (
+                key         TEXT PRIMARY KEY,
+                ingested_at INTEGER NOT NULL
+            );
+        """)
+
+    def close(self):
+        self.conn.close()
+
+    # ---------- INGEST ----------
+    def _start_after(self):
+        # Re-list from the oldest key taken in the last LATE_DELIVERY seconds; ingested keys are skipped
+        row = self.conn.execute(
+            "SELECT MIN(key) FROM ingested_keys WHERE ingested_at >= ?", (int(time.time()) - LATE_DELIVERY,)
+        ).fetchone()
+        if row[0] is None:
+            row = self.conn.execute("SELECT MAX(key) FROM ingested_keys").fetchone()
+        return row[0]
+
+    def ingest(self, source, max_workers=MAX_WORKERS):
+        """Read objects not yet ingested; each object is applied and checkpointed in one transaction."""
+        # StartAfter is exclusive, which is fine: the boundary key itself is already ingested
+        keys = source.keys(self._start_after())
+        done = set()
+        for i in range(0, len(keys), 500):
+            chunk = keys[i:i + 500]
+            done.update(k for (k,) in self.conn.execute(
+                f"SELECT key FROM ingested_keys WHERE key IN ({','.join('?' * len(chunk))})", chunk
+            ))
+        new_keys = [k for k in keys if k not in done]
+
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            for key, flags in zip(new_keys, pool.map(lambda k: read_object(source, k), new_keys)):
+                self._apply(key, flags)
+        self.evict()
+        return len(new_keys)
+
+    def _apply(self, key, flags):
+        with self.conn:
+            # A minute that was ever reported down stays down (late or duplicate deliveries)
+            self.conn.executemany(
+                "INSERT INTO minutes (resource, ts, down) VALUES (?, ?, ?) "
+                "ON CONFLICT (resource, ts) DO UPDATE SET down = MAX(down, excluded.down)",
+                [(res, ts, down) for res, _, _, ts, down in flags]
+            )
+            self.conn.executemany(
+                "INSERT INTO resources (resource, account, region, last_seen) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (resource) DO UPDATE SET last_seen = MAX(last_seen, excluded.last_seen)",
+                [(res, acct, region, ts) for res, acct, region, ts, _ in flags]
+            )
+            self.conn.execute(
+                "INSERT OR REPLACE INTO ingested_keys (key, ingested_at) VALUES (?, ?)", (key, int(time.time()))
+            )
+
+    def evict(self, now=None):
+        cutoff = int((now if now is not None else time.time()) - self.retention_seconds)
+        with self.conn:
+            self.conn.execute("DELETE FROM minutes WHERE ts < ?", (cutoff,))
+            self.conn.execute("DELETE FROM ingested_keys WHERE ingested_at < ?", (cutoff,))
+
+    # ---------- QUERY ----------
+    def resources(self):
+        return [row[0] for row in self.conn.execute("SELECT resource FROM resources ORDER BY resource")]
+
+    def downtime(self, resource, start, end):
+        """downtime_engine.DowntimeResult over [start, end) from the ingested minutes"""
+        rows = self.conn.execute(
+            "SELECT ts, down FROM minutes WHERE resource = ? AND ts >= ? AND ts < ? ORDER BY ts",
+            (resource, epoch_seconds(start) // PERIOD * PERIOD, epoch_seconds(end))
+        ).fetchall()
+        ts = np.fromiter((t for t, _ in rows), dtype=np.int64, count=len(rows))
+        down = np.fromiter((d for _, d in rows), dtype=np.float64, count=len(rows))
+        # down flags are 1/0, so "down" is the value 1: invert onto the zero = down predicate
+        return analyze([(ts, 1 - down)], start, end, PERIOD, down_if_zero)[0]
+
+    def summary(self, start, end, resources=None):
+        total_minutes = (end - start).total_seconds() / 60
+        rows = []
+        for resource in resources or self.resources():
+            r = self.downtime(resource, start, end)
+            last_seen = self.conn.execute(
+                "SELECT last_seen FROM resources WHERE resource = ?", (resource,)
+            ).fetchone()
+            rows.append({
+                "Resource": resource,
+                "Downtime_Minutes": r.downtime_minutes,
+                "Gap_Minutes": r.gap_minutes,
+                "Outages": len(r.outages),
+                "Uptime_%": round(100 - (r.downtime_minutes / total_minutes * 100), 2),
+                "Last_Seen": datetime.fromtimestamp(last_seen[0], UTC) if last_seen else None,
+            })
+        return rows
+
+
+# =========================
+# MAIN
+# =========================
+if __name__ == "__main__":
+    # Local directory (e.g. `aws s3 sync` of the delivery bucket) or the bucket itself
+    STREAM_DIR = "metric_stream_output"
+    STREAM_BUCKET = None           # e.g. "cw-metric-stream-delivery"
+    STREAM_PREFIX = ""
+    REGION = "eu-west-1"
+    WINDOW = timedelta(hours=24)   # downtime window printed after each poll
+    POLL_SECONDS = 60
+    FOLLOW = True                  # False = ingest once and exit
+
+    try:
+        if STREAM_BUCKET:
+            from aws_clients import get_client
+            source = S3Source(get_client("s3", REGION), STREAM_BUCKET, STREAM_PREFIX)
+        else:
+            source = LocalSource(STREAM_DIR)
+
+        state = StreamState()
+        while True:
+            new = state.ingest(source)
+            end = datetime.now(UTC)
+            print(f"\n[{end:%Y-%m-%d %H:%M:%S}] ingested {new} new objects")
+            summary = state.summary(end - WINDOW, end)
+            if summary:
+                print(pd.DataFrame(summary).to_string(index=False))
+            if not FOLLOW:
+                break
+            time.sleep(POLL_SECONDS)
+        state.close()
+
+    except KeyboardInterrupt:
+        pass
+    except Exception:
+        print("\n❌ SCRIPT FAILED")
+        traceback.print_exc()
+        raise SystemExit(1)
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+ALB downtime sweep across accounts and regions
+Every (account, region) target runs in parallel on pooled clients;
+results merge into one summary with Account / Region / Cluster columns
+"""
+
+import logging
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, UTC, date
+import pandas as pd
+from aws_clients import get_client
+from aws_retry import paginate
+from metric_cache import MetricCache
+from rollups import RollupStore
+from report_writers import make_writer
+import ecs_alb_downtime as alb
+
+DAYS = 30
+MAX_PARALLEL_TARGETS = 4  # each target also runs alb.MAX_WORKERS concurrent calls
+DATE = date.today()
+
+# role_arn None = the default credential chain (the account this runs in)
+TARGETS = [
+    {"account": "prod", "role_arn": None, "region": "eu-west-1", "clusters": ["analytics-dashboards-prod"]},
+    {"account": "prod", "role_arn": None, "region": "me-central-1", "clusters": ["uae-pass-prod-cluster"]},
+    {"account": "prod", "role_arn": None, "region": "us-east-1", "clusters": []},
+    # {"account": "shared", "role_arn": "arn:aws:iam::123456789012:role/downtime-report-readonly",
+    #  "region": "eu-west-1", "clusters": ["PaymentDashboard-Prod"]},
+]
+
+OUTPUT_MODE = "xlsx"
+OUTPUT_FILE = f"multi_region_downtime_summary_{DATE}.xlsx"
+METRICS_JSON = f"multi_region_downtime_metrics_{DATE}.json"
+METRICS_PROM = None
+
+
+def list_clusters(ecs_client):
+    clusters = []
+    for page in paginate(ecs_client.list_clusters, "nextToken"):
+        clusters.extend(arn.split("/")[-1] for arn in page["clusterArns"])
+    return clusters
+
+
+# ---------- ONE (ACCOUNT, REGION) ----------
+def sweep_target(target, start, end):
+    """Summary rows for every ALB-backed service in the target's clusters (all clusters if none listed)."""
+    account, region, role_arn = target["account"], target["region"], target.get("role_arn")
+    ecs_client = alb.run.instrument(get_client("ecs", region, role_arn))
+    elbv2_client = alb.run.instrument(get_client("elbv2", region, role_arn))
+    cw_client = alb.run.instrument(get_client("cloudwatch", region, role_arn))
+
+    # sqlite connections stay on the thread that opened them
+    cache = MetricCache()
+    rollups = RollupStore()
+    total_minutes = (end - start).total_seconds() / 60
+    rows = []
+    try:
+        for cluster in target.get("clusters") or list_clusters(ecs_client):
+            with alb.run.stage("discovery"):
+                services = alb.get_services(cluster, ecs_client)
+                topology = alb.resolve_topology(cluster, services, ecs_client, elbv2_client)
+            targets = {
+                arn.split("/")[-1]: (tg_name, lb_name)
+                for arn, (tg_name, lb_name) in topology.items() if tg_name
+            }
+            results = alb.get_downtime_series(targets, start, end, cache=cache, cw_client=cw_client,
+                                              rollups=rollups, rollup_prefix=f"alb/{account}/{region}/{cluster}")
+
+            for svc_name in targets:
+                _, downtime = results[svc_name]
+                rows.append({
+                    "Account": account,
+                    "Region": region,
+                    "Cluster": cluster,
+                    "Service": svc_name,
+                    "Downtime_Minutes": downtime,
+                    "Uptime_%": round(100 - (downtime / total_minutes * 100), 2)
+                })
+            alb.log(f"  [{account}/{region}] {cluster}: {len(targets)} of {len(services)} services behind an ALB")
+    finally:
+        cache.close()
+        rollups.close()
+    return rows
+
+
+# ---------- ALL TARGETS ----------
+def sweep(targets, start, end, max_parallel=MAX_PARALLEL_TARGETS):
+    """-> (summary rows in TARGETS order, [(target, error)] for targets that failed)"""
+    def run(target):
+        try:
+            return sweep_target(target, start, end), None
+        except Exception as e:
+            alb.log(f"  ❌ [{target['account']}/{target['region']}] failed: {e}", logging.ERROR)
+            alb.log(traceback.format_exc(), logging.ERROR)
+            return [], e
+
+    with ThreadPoolExecutor(max_workers=max_parallel) as pool:
+        outcomes = list(pool.map(run, targets))
+
+    summary = [row for rows, _ in outcomes for row in rows]
+    failed = [(t, err) for t, (_, err) in zip(targets, outcomes) if err is not None]
+    return summary, failed
+
+
+# ---------- MAIN ----------
+def main():
+    alb.log(f"=== MULTI-REGION ALB DOWNTIME REPORT STARTED {datetime.now(UTC)} ===")
+
+    end = datetime.now(UTC)
+    start = end - timedelta(days=DAYS)
+
+    summary, failed = sweep(TARGETS, start, end)
+
+    with alb.run.stage("write"):
+        writer = make_writer(OUTPUT_MODE, OUTPUT_FILE)
+        writer.write_summary(summary)
+        writer.close()
+
+    if summary:
+        print(pd.DataFrame(summary).to_string(index=False))
+    for target, err in failed:
+        alb.log(f"⚠ Not included: {target['account']}/{target['region']} ({err})")
+
+    alb.log(f"Report saved: {OUTPUT_FILE}")
+    alb.log_run_metrics(METRICS_JSON, METRICS_PROM)
+    alb.log("=== FINISHED ===")
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except Exception:
+        alb.log("❌ SCRIPT FAILED", logging.ERROR)
+        alb.log(traceback.format_exc(), logging.ERROR)
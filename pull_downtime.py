@@ -4,6 +4,8 @@ config.py
 AWS_REGION = "us-east-1"
 CLOUDTRAIL_BUCKET = "my-org-cloudtrail-logs"
 CLOUDTRAIL_PREFIX = "AWSLogs/123456789012/CloudTrail/"
+CLOUDTRAIL_REGIONS = [AWS_REGION]   # region partitions to scan under the prefix
+CLOUDTRAIL_INDEX_PATH = "cloudtrail_state_index.sqlite"
 
 
 utils.py
@@ -21,63 +23,42 @@ EC2 Downtime Analyzer from CloudTrail S3 Logs
 """
 
 import boto3, pandas as pd
-from datetime import datetime, timedelta
-from utils import read_gzip_json_from_s3
+from botocore.config import Config
+from datetime import datetime, timedelta, UTC
 from config import *
+from cloudtrail_scanner import MAX_WORKERS, day_prefixes, list_keys
+from cloudtrail_index import CloudTrailIndex
+from intervals import from_state_events
 import traceback
 
-s3 = boto3.client("s3")
+# Connection pool sized for the concurrent scanner
+s3 = boto3.client("s3", config=Config(max_pool_connections=MAX_WORKERS))
 
 # ---------------- MAIN ---------------- #
 
 def list_cloudtrail_files(start, end):
-    keys = []
-    paginator = s3.get_paginator("list_objects_v2")
+    # Only the region/YYYY/MM/DD partitions that overlap [start, end]
+    prefixes = day_prefixes(CLOUDTRAIL_PREFIX, CLOUDTRAIL_REGIONS, start, end)
+    return list_keys(s3, CLOUDTRAIL_BUCKET, prefixes)
+
 
-    for page in paginator.paginate(Bucket=CLOUDTRAIL_BUCKET, Prefix=CLOUDTRAIL_PREFIX):
-        for obj in page.get("Contents", []):
-            keys.append(obj["Key"])
-    return keys
+def parse_ec2_state_events_many(instance_ids, start, end):
+    """{instance_id: events}: one incremental index update, then local lookups"""
+    index = CloudTrailIndex(CLOUDTRAIL_INDEX_PATH)
+    try:
+        index.update(s3, CLOUDTRAIL_BUCKET, CLOUDTRAIL_PREFIX, CLOUDTRAIL_REGIONS, start, end)
+        return index.events_many(instance_ids, start, end)
+    finally:
+        index.close()
 
 
 def parse_ec2_state_events(instance_id, start, end):
-    files = list_cloudtrail_files(start, end)
-    events = []
-
-    for key in files:
-        if not key.endswith(".gz"):
-            continue
-
-        data = read_gzip_json_from_s3(CLOUDTRAIL_BUCKET, key)
-        for record in data.get("Records", []):
-            if record.get("eventSource") == "ec2.amazonaws.com":
-                if record.get("eventName") in ["StartInstances", "StopInstances", "TerminateInstances"]:
-                    for res in record.get("resources", []):
-                        if res.get("resourceName") == instance_id:
-                            events.append({
-                                "time": datetime.fromisoformat(record["eventTime"].replace("Z","+00:00")),
-                                "event": record["eventName"]
-                            })
-    return events
+    return parse_ec2_state_events_many([instance_id], start, end)[instance_id]
 
 
 def calculate_downtime(events, start, end):
-    events.sort(key=lambda x: x["time"])
-    downtime = 0
-    last_stop = None
-
-    for e in events:
-        if e["event"] in ["StopInstances", "TerminateInstances"]:
-            last_stop = e["time"]
-
-        elif e["event"] == "StartInstances" and last_stop:
-            downtime += (e["time"] - last_stop).total_seconds()
-            last_stop = None
-
-    if last_stop:
-        downtime += (end - last_stop).total_seconds()
-
-    return downtime
+    # Seconds stopped in [start, end); a repeated Stop does not restart the outage
+    return from_state_events(events, start, end).total_seconds()
 
 
 # ---------------- RUN ---------------- #
@@ -86,7 +67,7 @@ if __name__ == "__main__":
     try:
         INSTANCE_ID = "i-xxxxxxxxxxxx"
 
-        END = datetime.utcnow()
+        END = datetime.now(UTC)
         START = END - timedelta(days=30)
 
         events = parse_ec2_state_events(INSTANCE_ID, START, END)
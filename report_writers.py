@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Pluggable output layer for the ALB downtime report
+Each writer takes one service series at a time as (timestamp, value) pairs,
+then the summary rows, then close()
+
+  xlsx     constant-memory xlsxwriter, rows streamed straight to the sheet
+  parquet  dataset partitioned by service and day (BI tools / Athena)
+  csv      one gzip CSV per service + summary.csv
+  pandas   previous path: DataFrame per service through pd.ExcelWriter
+"""
+
+import csv
+import gzip
+import os
+import re
+from datetime import UTC
+
+EXCEL_SHEET_MAX = 31
+
+
+class ReportWriteError(Exception): pass
+
+
+def _naive(ts):
+    # Excel has no time zones; keep UTC wall time like the previous tz_localize(None)
+    return ts.astimezone(UTC).replace(tzinfo=None) if ts.tzinfo else ts
+
+
+def _safe_name(name):
+    return re.sub(r"[^A-Za-z0-9._=-]", "_", name)
+
+
+# ---------- XLSX (CONSTANT MEMORY) ----------
+class XlsxStreamWriter:
+    def __init__(self, path, value_column="HealthyHosts"):
+        import xlsxwriter
+        self.value_column = value_column
+        # constant_memory flushes each row as soon as the next one starts
+        self.workbook = xlsxwriter.Workbook(path, {"constant_memory": True})
+        self.date_format = self.workbook.add_format({"num_format": "yyyy-mm-dd hh:mm:ss"})
+
+    def write_service(self, service, points):
+        sheet = self.workbook.add_worksheet(service[:EXCEL_SHEET_MAX])
+        sheet.write_row(0, 0, ["Timestamp", self.value_column])
+        sheet.set_column(0, 0, 20)
+        for row, (ts, value) in enumerate(points, start=1):
+            sheet.write_datetime(row, 0, _naive(ts), self.date_format)
+            sheet.write_number(row, 1, value)
+
+    def write_summary(self, rows):
+        sheet = self.workbook.add_worksheet("SUMMARY")
+        if not rows:
+            return
+        columns = list(rows[0])
+        sheet.write_row(0, 0, columns)
+        for i, r in enumerate(rows, start=1):
+            sheet.write_row(i, 0, [r[c] for c in columns])
+
+    def close(self):
+        self.workbook.close()
+
+
+# ---------- PARQUET DATASET ----------
+class ParquetDatasetWriter:
+    """<root>/service=<name>/day=<YYYY-MM-DD>/part-0.parquet plus <root>/summary.parquet"""
+
+    def __init__(self, root, value_column="HealthyHosts"):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        self.pa, self.pq = pa, pq
+        self.root = root
+        self.value_column = value_column
+        os.makedirs(root, exist_ok=True)
+
+    def write_service(self, service, points):
+        by_day = {}
+        for ts, value in points:
+            day = by_day.setdefault(ts.astimezone(UTC).date() if ts.tzinfo else ts.date(), ([], []))
+            day[0].append(ts)
+            day[1].append(value)
+
+        for day, (stamps, values) in by_day.items():
+            folder = os.path.join(self.root, f"service={_safe_name(service)}", f"day={day.isoformat()}")
+            os.makedirs(folder, exist_ok=True)
+            table = self.pa.table({
+                "Timestamp": self.pa.array(stamps, type=self.pa.timestamp("s", tz="UTC")),
+                self.value_column: self.pa.array(values, type=self.pa.float64()),
+            })
+            self.pq.write_table(table, os.path.join(folder, "part-0.parquet"))
+
+    def write_summary(self, rows):
+        self.pq.write_table(self.pa.Table.from_pylist(rows), os.path.join(self.root, "summary.parquet"))
+
+    def close(self):
+        pass
+
+
+# ---------- CSV + GZIP ----------
+class CsvGzipWriter:
+    def __init__(self, root, value_column="HealthyHosts"):
+        self.root = root
+        self.value_column = value_column
+        os.makedirs(root, exist_ok=True)
+
+    def write_service(self, service, points):
+        path = os.path.join(self.root, f"{_safe_name(service)}.csv.gz")
+        with gzip.open(path, "wt", newline="", encoding="utf-8", compresslevel=6) as f:
+            writer = csv.writer(f)
+            writer.writerow(["Timestamp", self.value_column])
+            writer.writerows((_naive(ts).isoformat(sep=" "), value) for ts, value in points)
+
+    def write_summary(self, rows):
+        with open(os.path.join(self.root, "summary.csv"), "w", newline="", encoding="utf-8") as f:
+            if not rows:
+                return
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+
+    def close(self):
+        pass
+
+
+# ---------- PANDAS (PREVIOUS PATH) ----------
+class PandasExcelWriter:
+    def __init__(self, path, value_column="HealthyHosts"):
+        import pandas as pd
+        self.pd = pd
+        self.value_column = value_column
+        self.writer = pd.ExcelWriter(path, engine="xlsxwriter")
+
+    def write_service(self, service, points):
+        df = self.pd.DataFrame(list(points), columns=["Timestamp", self.value_column])
+        df["Timestamp"] = self.pd.to_datetime(df["Timestamp"]).dt.tz_localize(None)
+        df.to_excel(self.writer, sheet_name=service[:EXCEL_SHEET_MAX], index=False)
+
+    def write_summary(self, rows):
+        self.pd.DataFrame(rows).to_excel(self.writer, sheet_name="SUMMARY", index=False)
+
+    def close(self):
+        self.writer.close()
+
+
+WRITERS = {
+    "xlsx": XlsxStreamWriter,
+    "parquet": ParquetDatasetWriter,
+    "csv": CsvGzipWriter,
+    "pandas": PandasExcelWriter,
+}
+
+
+def make_writer(mode, target, value_column="HealthyHosts"):
+    """target is a file path for xlsx/pandas and a directory for parquet/csv."""
+    cls = WRITERS.get(mode)
+    if cls is None:
+        raise ReportWriteError(f"Unknown output mode {mode!r}; choose from {sorted(WRITERS)}")
+    return cls(target, value_column)
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Daily downtime rollups for long-horizon SLO reporting
+Each report run stores one row per (resource, UTC day); quarterly / yearly
+availability, error budget and DORA reliability are then SQL sums over
+those rows, with no raw CloudWatch data fetched again
+"""
+
+import sqlite3
+import traceback
+from datetime import date, datetime, timedelta, UTC
+import numpy as np
+import pandas as pd
+from downtime_engine import epoch_seconds
+from intervals import IntervalSet, from_downtime
+
+DEFAULT_ROLLUP_PATH = "downtime_rollups.sqlite"
+SLO_TARGET = 99.9           # availability %, error budget = the rest
+DAY_SECONDS = 86400
+
+
+def _day_start(day):
+    return datetime(day.year, day.month, day.day, tzinfo=UTC)
+
+
+def full_days(start, end):
+    """UTC days lying entirely inside [start, end)"""
+    first = -(-epoch_seconds(start) // DAY_SECONDS)
+    last = epoch_seconds(end) // DAY_SECONDS
+    return [datetime.fromtimestamp(d * DAY_SECONDS, UTC).date() for d in range(first, last)]
+
+
+def daily_rows(result, start, end, gaps_as_down=False):
+    """
+    downtime_engine.DowntimeResult -> one rollup row per full UTC day in [start, end).
+    Outages are counted (and measured whole) on the day they start; minutes are split per day.
+    gaps_as_down: missing buckets count as downtime, as in the ECS report.
+    """
+    outages = from_downtime(result)
+    gaps = IntervalSet(np.asarray(result.gaps, dtype=np.int64).reshape(-1, 2))
+    counted = outages.union(gaps) if gaps_as_down else outages
+    starts = counted.bounds[:, 0]
+    lengths = counted.bounds[:, 1] - counted.bounds[:, 0]
+
+    rows = []
+    for day in full_days(start, end):
+        lo = epoch_seconds(_day_start(day))
+        hi = lo + DAY_SECONDS
+        starting = (starts >= lo) & (starts < hi)
+        rows.append({
+            "day": day.isoformat(),
+            "downtime_minutes": counted.clip(lo, hi).total_minutes(),
+            "down_minutes": outages.clip(lo, hi).total_minutes(),
+            "gap_minutes": gaps.clip(lo, hi).total_minutes(),
+            "outages": int(starting.sum()),
+            "longest_outage_minutes": float(lengths[starting].max()) / 60 if starting.any() else 0.0,
+        })
+    return rows
+
+
+# =========================
+# STORE
+# =========================
+class RollupStore:
+    def __init__(self, path=DEFAULT_ROLLUP_PATH):
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS daily_rollups (
+                resource               TEXT NOT NULL,
+                day                    TEXT NOT NULL,   -- YYYY-MM-DD (UTC)
+                downtime_minutes       REAL NOT NULL,   -- what the source report counts as down
+                down_minutes           REAL NOT NULL,
+                gap_minutes            REAL NOT NULL,
+                outages                INTEGER NOT NULL,
+                longest_outage_minutes REAL NOT NULL,
+                updated_at             TEXT NOT NULL,
+                PRIMARY KEY (resource, day)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS daily_rollups_day ON daily_rollups (day);
+        """)
+
+    def close(self):
+        self.conn.close()
+
+    def record(self, resource, result, start, end, gaps_as_down=False):
+        """Store (or replace) the full days of one resource's result; returns the number of days written."""
+        rows = daily_rows(result, start, end, gaps_as_down)
+        stamp = datetime.now(UTC).isoformat()
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO daily_rollups VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [(resource, r["day"], r["downtime_minutes"], r["down_minutes"], r["gap_minutes"],
+                  r["outages"], r["longest_outage_minutes"], stamp) for r in rows]
+            )
+        return len(rows)
+
+    def days(self, resource):
+        return [d for (d,) in self.conn.execute(
+            "SELECT day FROM daily_rollups WHERE resource = ? ORDER BY day", (resource,)
+        )]
+
+    # ---------- SLO ----------
+    def slo_report(self, first_day, last_day, slo_target=SLO_TARGET, resources=None):
+        """
+        Per-resource availability and error budget over [first_day, last_day] (inclusive).
+        Days without a rollup are reported as missing and left out of the denominator.
+        """
+        sql = """
+            SELECT resource, COUNT(*), SUM(downtime_minutes), SUM(down_minutes), SUM(gap_minutes),
+                   SUM(outages), MAX(longest_outage_minutes)
+            FROM daily_rollups WHERE day BETWEEN ? AND ?
+        """
+        params = [first_day.isoformat(), last_day.isoformat()]
+        if resources:
+            sql += f" AND resource IN ({','.join('?' * len(resources))})"
+            params.extend(resources)
+        sql += " GROUP BY resource ORDER BY resource"
+
+        window_days = (last_day - first_day).days + 1
+        budget_share = 1 - slo_target / 100
+        report = []
+        for resource, days, downtime, down, gaps, outages, longest in self.conn.execute(sql, params):
+            covered = days * 1440
+            budget = covered * budget_share
+            report.append({
+                "Resource": resource,
+                "From": first_day.isoformat(),
+                "To": last_day.isoformat(),
+                "Days": days,
+                "Days_Missing": window_days - days,
+                "Downtime_Minutes": round(downtime, 1),
+                "Down_Minutes": round(down, 1),
+                "Gap_Minutes": round(gaps, 1),
+                "Outages": outages,
+                "Longest_Outage_Minutes": round(longest, 1),
+                "MTTR_Minutes": round(downtime / outages, 1) if outages else 0.0,
+                "Reliability_%": round((covered - downtime) / covered * 100, 4),
+                "SLO_%": slo_target,
+                "Error_Budget_Minutes": round(budget, 1),
+                "Budget_Used_%": round(downtime / budget * 100, 1) if budget else 0.0,
+                "Budget_Remaining_Minutes": round(budget - downtime, 1),
+            })
+        return report
+
+
+# ---------- WINDOWS ----------
+def trailing(days, today=None):
+    """(first, last) for the `days` complete UTC days before today"""
+    today = today or datetime.now(UTC).date()
+    return today - timedelta(days=days), today - timedelta(days=1)
+
+
+def quarter_to_date(today=None):
+    today = today or datetime.now(UTC).date()
+    return date(today.year, 3 * ((today.month - 1) // 3) + 1, 1), today - timedelta(days=1)
+
+
+def year_to_date(today=None):
+    today = today or datetime.now(UTC).date()
+    return date(today.year, 1, 1), today - timedelta(days=1)
+
+
+# =========================
+# MAIN
+# =========================
+if __name__ == "__main__":
+    try:
+        store = RollupStore()
+        windows = {
+            "Last 90 days": trailing(90),
+            "Last 365 days": trailing(365),
+            "Quarter to date": quarter_to_date(),
+            "Year to date": year_to_date(),
+        }
+        for label, (first, last) in windows.items():
+            report = store.slo_report(first, last)
+            print(f"\n========== {label.upper()} ({first} → {last}, SLO {SLO_TARGET}%) ==========")
+            if not report:
+                print("No rollups stored for this window")
+                continue
+            print(pd.DataFrame(report).drop(columns=["From", "To"]).to_string(index=False))
+            pd.DataFrame(report).to_csv(f"slo_{label.lower().replace(' ', '_')}.csv", index=False)
+        store.close()
+
+    except Exception:
+        print("\n❌ SCRIPT FAILED")
+        traceback.print_exc()
+        raise SystemExit(1)
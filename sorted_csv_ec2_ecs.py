@@ -4,11 +4,18 @@ Enterprise CloudWatch Downtime Analyzer
 EC2 + ECS with Sorted Datapoints + CSV Export
 """
 
-import boto3
+import numpy as np
 import pandas as pd
 import traceback
-from datetime import datetime, timedelta
-from botocore.exceptions import ClientError, BotoCoreError
+from datetime import datetime, timedelta, UTC
+import cw_metrics
+from cw_metrics import (
+    fetch_metric_arrays, ec2_status_check_query, ecs_running_tasks_query, retention_segments, to_frame
+)
+from metric_cache import MetricCache, fetch_cached
+from downtime_engine import analyze_segments, join_results, to_arrays, down_if_positive, down_if_zero
+from intervals import from_downtime, composite
+from aws_clients import get_client
 
 # ================= EXCEPTIONS ================= #
 
@@ -19,96 +26,257 @@ class NoDataError(Exception): pass
 # ================= INIT ================= #
 
 def init_cw(region):
+    # Cached per region: one client and connection pool for every instance / service
     try:
-        return boto3.client("cloudwatch", region_name=region)
+        return get_client("cloudwatch", region)
     except Exception:
         traceback.print_exc()
         raise Exception("CloudWatch init failed")
 
 
+def fetch_datapoints(cw, query, start, end, cache=None, now=None):
+    """-> (int64 epoch seconds, float64 values), sorted by time"""
+    try:
+        if cache is not None:
+            return to_arrays(fetch_cached(cw, cache, {"q": query}, start, end, now=now)["q"])
+        return fetch_metric_arrays(cw, {"q": query}, start, end, now=now)["q"]
+    except cw_metrics.MetricFetchError:
+        traceback.print_exc()
+        raise MetricFetchError(f"Failed to fetch {query['Namespace']} {query['MetricName']}")
+
+
 # =====================================================
 # EC2 METRICS
 # =====================================================
 
-def get_ec2_metrics(instance_id, region, start, end):
+def get_ec2_timeline(instance_id, region, start, end, cache=None):
+    """-> (frame, downtime_engine.DowntimeResult with the outage intervals)"""
     cw = init_cw(region)
+    now = datetime.now(UTC)
 
-    try:
-        response = cw.get_metric_statistics(
-            Namespace="AWS/EC2",
-            MetricName="StatusCheckFailed",
-            Dimensions=[{"Name": "InstanceId", "Value": instance_id}],
-            StartTime=start,
-            EndTime=end,
-            Period=300,
-            Statistics=["Sum"]
-        )
-    except (ClientError, BotoCoreError):
-        traceback.print_exc()
-        raise MetricFetchError("Failed to fetch EC2 metrics")
-
-    datapoints = response.get("Datapoints", [])
-    if not datapoints:
+    ts, values = fetch_datapoints(cw, ec2_status_check_query(instance_id, period=300), start, end, cache, now)
+    if not len(ts):
         raise NoDataError("No EC2 metrics found")
 
-    # Sort by timestamp
-    datapoints = sorted(datapoints, key=lambda x: x["Timestamp"])
+    # Columnar DataFrame over the fetched arrays (already sorted by timestamp)
+    df = to_frame(ts, values, "EC2", instance_id)
+
+    # Calculate downtime (StatusCheckFailed > 0); the result also carries the outage intervals
+    result = analyze_segments(ts, values, retention_segments(start, end, 300, now), down_if_positive)
 
-    # Convert to DataFrame
-    df = pd.DataFrame(datapoints)
-    df["Timestamp"] = pd.to_datetime(df["Timestamp"])
-    df["Service"] = "EC2"
-    df["Resource"] = instance_id
-    df.rename(columns={"Sum": "MetricValue"}, inplace=True)
+    return df, result
 
-    # Calculate downtime
-    downtime_minutes = sum(5 for d in datapoints if d["Sum"] > 0)
 
-    return df[["Timestamp", "Service", "Resource", "MetricValue"]], downtime_minutes
+def get_ec2_metrics(instance_id, region, start, end, cache=None):
+    """-> (frame, downtime minutes)"""
+    df, result = get_ec2_timeline(instance_id, region, start, end, cache)
+    return df, result.downtime_minutes
 
 
 # =====================================================
 # ECS METRICS
 # =====================================================
 
-def get_ecs_metrics(cluster, service, region, start, end):
+def get_ecs_timeline(cluster, service, region, start, end, cache=None):
+    """-> (frame, downtime_engine.DowntimeResult with the outage intervals)"""
     cw = init_cw(region)
+    now = datetime.now(UTC)
 
-    try:
-        response = cw.get_metric_statistics(
-            Namespace="AWS/ECS",
-            MetricName="RunningTaskCount",
-            Dimensions=[
-                {"Name": "ClusterName", "Value": cluster},
-                {"Name": "ServiceName", "Value": service}
-            ],
-            StartTime=start,
-            EndTime=end,
-            Period=300,
-            Statistics=["Average"]
-        )
-    except (ClientError, BotoCoreError):
-        traceback.print_exc()
-        raise MetricFetchError("Failed to fetch ECS metrics")
-
-    datapoints = response.get("Datapoints", [])
-    if not datapoints:
+    query = ecs_running_tasks_query(cluster, service, namespace="AWS/ECS", period=300)
+    ts, values = fetch_datapoints(cw, query, start, end, cache, now)
+    if not len(ts):
         raise NoDataError("No ECS metrics found")
 
-    # Sort by timestamp
-    datapoints = sorted(datapoints, key=lambda x: x["Timestamp"])
-
-    # Convert to DataFrame
-    df = pd.DataFrame(datapoints)
-    df["Timestamp"] = pd.to_datetime(df["Timestamp"])
-    df["Service"] = "ECS"
-    df["Resource"] = f"{cluster}/{service}"
-    df.rename(columns={"Average": "MetricValue"}, inplace=True)
+    # Columnar DataFrame over the fetched arrays (already sorted by timestamp)
+    df = to_frame(ts, values, "ECS", f"{cluster}/{service}")
 
     # Downtime = RunningTaskCount == 0
-    downtime_minutes = sum(5 for d in datapoints if d["Average"] == 0)
+    result = analyze_segments(ts, values, retention_segments(start, end, 300, now), down_if_zero)
+
+    return df, result
+
 
-    return df[["Timestamp", "Service", "Resource", "MetricValue"]], downtime_minutes
+def get_ecs_metrics(cluster, service, region, start, end, cache=None):
+    """-> (frame, downtime minutes)"""
+    df, result = get_ecs_timeline(cluster, service, region, start, end, cache)
+    return df, result.downtime_minutes
+
+
+# =====================================================
+# STREAMING EXPORT
+# =====================================================
+
+EXPORT_BATCH_ROWS = 100_000   # rows merged and written per step
+
+
+def frame_source(df, chunk_rows=EXPORT_BATCH_ROWS):
+    """
+    Per-resource frame (from the getters above) -> (service, resource, chunks), where chunks
+    lazily yields (epoch seconds, values) array slices of at most chunk_rows rows.
+    The frame is already in memory, so this bounds the merge buffers only; SegmentSeries
+    streams from the fetch itself.
+    """
+    ts = df["Timestamp"].dt.as_unit("s").array.asi8  # UTC epoch seconds, no copy for to_frame output
+    values = df["MetricValue"].to_numpy()
+    chunks = ((ts[i:i + chunk_rows], values[i:i + chunk_rows]) for i in range(0, len(ts), chunk_rows))
+    return str(df["Service"].iloc[0]), str(df["Resource"].iloc[0]), chunks
+
+
+class SegmentSeries:
+    """
+    One resource fetched one retention segment at a time, as a merge_sorted source.
+    Only the segment being merged is held; downtime is accumulated per segment, so
+    `result` (downtime_engine.DowntimeResult) is complete once the chunks are exhausted.
+    """
+
+    def __init__(self, cw, query, service, resource, start, end, is_down, cache=None, now=None):
+        self.cw, self.query, self.cache = cw, query, cache
+        self.service, self.resource = service, resource
+        self.start, self.end, self.is_down = start, end, is_down
+        self.now = now or datetime.now(UTC)
+        self.points = 0
+        self.result = None
+
+    def source(self):
+        return self.service, self.resource, iter(self)
+
+    def __iter__(self):
+        for seg in retention_segments(self.start, self.end, self.query["Period"], self.now):
+            ts, values = fetch_datapoints(self.cw, self.query, seg[0], seg[1], self.cache, self.now)
+            r = analyze_segments(ts, values, [seg], self.is_down)
+            self.result = r if self.result is None else join_results(self.result, r)
+            self.points += len(ts)
+            yield ts, values
+
+
+class _Cursor:
+    """Read position in one source's chunk iterator; only the current chunk(s) are held."""
+
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.ts = np.empty(0, dtype=np.int64)
+        self.values = np.empty(0, dtype=np.float64)
+        self.pos = 0
+        self.done = False
+
+    def pull(self):
+        """Append the next non-empty chunk to what is left of the current one; False when exhausted."""
+        for ts, values in self.chunks:
+            if len(ts):
+                self.ts = np.concatenate([self.ts[self.pos:], np.asarray(ts, dtype=np.int64)])
+                self.values = np.concatenate([self.values[self.pos:], np.asarray(values, dtype=np.float64)])
+                self.pos = 0
+                return True
+        self.done = True
+        return False
+
+    def left(self):
+        return len(self.ts) - self.pos
+
+    def bound(self):
+        """Rows strictly before this timestamp are final; the next chunk may start at the last one."""
+        return np.inf if self.done else int(self.ts[-1])
+
+
+def merge_sorted(sources, batch_rows=EXPORT_BATCH_ROWS):
+    """
+    k-way merge of per-resource series that are each already sorted by time.
+    sources are (service, resource, chunks) with chunks any iterator of time-ordered
+    (epoch seconds, values) arrays, e.g. SegmentSeries(...).source() or frame_source(df).
+    Yields (ts, values, source index) batches of about batch_rows rows in global time order
+    (ties in source order). Chunks are pulled only when a cursor runs out, so at most the
+    current chunk per source and the current batch are in memory.
+    """
+    cursors = [_Cursor(s[2]) for s in sources]
+    for c in cursors:
+        c.pull()
+    live = [c for c in cursors if c.left()]
+    if not live:
+        return
+    # First guess from the first chunks; adapted below as the density changes
+    span = max(int(c.ts[-1]) for c in live) - min(int(c.ts[0]) for c in live) + 1
+    step = max(1, span * batch_rows // sum(c.left() for c in live))
+
+    while True:
+        for c in cursors:
+            if not c.left() and not c.done:
+                c.pull()
+        heads = [int(c.ts[c.pos]) for c in cursors if c.left()]
+        if not heads:
+            return
+        lo = min(heads)
+        bound = min(c.bound() for c in cursors)
+        if bound <= lo:
+            # A cursor holds nothing but its last timestamp: read on so that timestamp can be closed
+            for c in cursors:
+                if c.bound() == bound:
+                    c.pull()
+            continue
+        while True:
+            cut = min(lo + step, bound)
+            ends = [c.pos + int(np.searchsorted(c.ts[c.pos:], cut)) for c in cursors]
+            rows = sum(e - c.pos for e, c in zip(ends, cursors))
+            # Bursts (e.g. many resources on the same grid) shrink the window; sparse stretches grow it
+            if rows > 2 * batch_rows and step > 1:
+                step //= 2
+                continue
+            break
+
+        idx = [i for i, (e, c) in enumerate(zip(ends, cursors)) if e > c.pos]
+        ts = np.concatenate([cursors[i].ts[cursors[i].pos:ends[i]] for i in idx])
+        vals = np.concatenate([cursors[i].values[cursors[i].pos:ends[i]] for i in idx])
+        src = np.repeat(np.array(idx, dtype=np.int32), [ends[i] - cursors[i].pos for i in idx])
+        order = np.lexsort((src, ts))
+        yield ts[order], vals[order], src[order]
+
+        for c, e in zip(cursors, ends):
+            c.pos = e
+        if rows < batch_rows // 2 and cut == lo + step:
+            step *= 2
+
+
+def export_merged(sources, path, fmt="csv", batch_rows=EXPORT_BATCH_ROWS):
+    """Write merge_sorted batches as one CSV or Parquet file; returns rows written."""
+    sources = list(sources)
+    # Categories are deduplicated: two sources may share a label (e.g. the same resource in two chunks)
+    services = sorted({s[0] for s in sources})
+    resources = list(dict.fromkeys(s[1] for s in sources))
+    service_code = np.array([services.index(s[0]) for s in sources], dtype=np.int32)
+    resource_code = np.array([resources.index(s[1]) for s in sources], dtype=np.int32)
+    rows = 0
+
+    if fmt == "parquet":
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        schema = pa.schema([
+            ("Timestamp", pa.timestamp("s", tz="UTC")),
+            ("Service", pa.dictionary(pa.int32(), pa.string())),
+            ("Resource", pa.dictionary(pa.int32(), pa.string())),
+            ("MetricValue", pa.float64()),
+        ])
+        with pq.ParquetWriter(path, schema) as writer:
+            for ts, vals, src in merge_sorted(sources, batch_rows):
+                writer.write_table(pa.table([
+                    pa.array(ts, type=pa.timestamp("s", tz="UTC")),
+                    pa.DictionaryArray.from_arrays(service_code[src], services),
+                    pa.DictionaryArray.from_arrays(resource_code[src], resources),
+                    pa.array(vals, type=pa.float64()),
+                ], schema=schema))
+                rows += len(ts)
+        return rows
+
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        header = True
+        for ts, vals, src in merge_sorted(sources, batch_rows):
+            pd.DataFrame({
+                "Timestamp": pd.DatetimeIndex(ts.view("datetime64[s]")).tz_localize(UTC),
+                "Service": pd.Categorical.from_codes(service_code[src], services),
+                "Resource": pd.Categorical.from_codes(resource_code[src], resources),
+                "MetricValue": vals,
+            }, copy=False).to_csv(f, header=header, index=False)
+            header = False
+            rows += len(ts)
+    return rows
 
 
 # =====================================================
@@ -127,31 +295,40 @@ if __name__ == "__main__":
         EC2_INSTANCE_ID = "i-xxxxxxxxxxxx"
         ECS_CLUSTER = "prod-cluster"
         ECS_SERVICE = "orders-service"
-
-        # Fetch data
-        ec2_df, ec2_down = get_ec2_metrics(EC2_INSTANCE_ID, REGION, START, END)
-        ecs_df, ecs_down = get_ecs_metrics(ECS_CLUSTER, ECS_SERVICE, REGION, START, END)
-
-        # Combine EC2 + ECS
-        final_df = pd.concat([ec2_df, ecs_df]).sort_values("Timestamp")
-
-        # Save CSV
-        output_file = "cloudwatch_downtime_metrics.csv"
-        final_df.to_csv(output_file, index=False)
+        OUTPUT_FORMAT = "csv"  # "csv" | "parquet" (needs pyarrow)
+
+        # Fetched one retention segment at a time straight into a streaming merge of the
+        # already-sorted series; only missing / still-mutable ranges hit CloudWatch
+        cache = MetricCache()
+        cw, now = init_cw(REGION), datetime.now(UTC)
+        ec2 = SegmentSeries(cw, ec2_status_check_query(EC2_INSTANCE_ID, period=300), "EC2", EC2_INSTANCE_ID,
+                            START, END, down_if_positive, cache, now)
+        ecs = SegmentSeries(cw, ecs_running_tasks_query(ECS_CLUSTER, ECS_SERVICE, namespace="AWS/ECS", period=300),
+                            "ECS", f"{ECS_CLUSTER}/{ECS_SERVICE}", START, END, down_if_zero, cache, now)
+        output_file = f"cloudwatch_downtime_metrics.{OUTPUT_FORMAT}"
+        export_merged([ec2.source(), ecs.source()], output_file, fmt=OUTPUT_FORMAT)
+        cache.close()
+        for series in (ec2, ecs):
+            if not series.points:
+                raise NoDataError(f"No {series.service} metrics found")
+        ec2_result, ecs_result = ec2.result, ecs.result
+        ec2_down, ecs_down = ec2_result.downtime_minutes, ecs_result.downtime_minutes
 
         # Print Summary
         print("\n================ DOWNTIME SUMMARY ================")
         print(f"EC2 Downtime Minutes: {ec2_down}")
         print(f"ECS Downtime Minutes: {ecs_down}")
 
-        total_downtime_seconds = (ec2_down + ecs_down) * 60
+        # Union of both outage timelines, so overlapping outages are not counted twice
+        combined = composite(from_downtime(ec2_result), from_downtime(ecs_result)).clip(START, END)
+        total_downtime_seconds = combined.total_seconds()
         total_time_seconds = (END - START).total_seconds()
 
         reliability = (total_time_seconds - total_downtime_seconds) / total_time_seconds * 100
 
         print(f"Total Downtime (seconds): {total_downtime_seconds}")
         print(f"DORA Reliability %: {reliability:.6f}")
-        print(f"CSV Saved: {output_file}")
+        print(f"{OUTPUT_FORMAT.upper()} Saved: {output_file}")
 
         if ec2_down == 0 and ecs_down == 0:
             print("✅ No downtime observed in this period")
@@ -0,0 +1,102 @@
+import json
+import os
+import sys
+import threading
+from datetime import datetime, UTC
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+import pytest
+
+# The scripts live at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from downtime_engine import epoch_seconds  # noqa: E402
+
+
+class LocalServer:
+    """
+    HTTP server on 127.0.0.1 answering through `handler(method, path, query, body)`
+    -> (status, headers, json body). Every request is kept in `requests`.
+    """
+
+    def __init__(self):
+        self.handler = None
+        self.requests = []
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _serve(self):
+                parts = urlsplit(self.path)
+                length = int(self.headers.get("Content-Length") or 0)
+                body = json.loads(self.rfile.read(length)) if length else None
+                query = {k: v[0] for k, v in parse_qs(parts.query).items()}
+                with server._lock:
+                    server.requests.append((self.command, parts.path, query, body))
+                status, headers, payload = server.handler(self.command, parts.path, query, body)
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, str(value))
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            do_GET = do_POST = _serve
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_port}"
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture
+def local_server():
+    server = LocalServer()
+    yield server
+    server.close()
+
+
+class StubCloudWatch:
+    """
+    GetMetricData over per-minute truths, keyed by a dimension value (target group, instance id...).
+    Like CloudWatch for recent data, buckets start at StartTime rounded down to the minute,
+    not on the period's clock grid.
+    """
+    STATS = {"Minimum": np.min, "Sum": np.sum, "Average": np.mean}
+
+    def __init__(self, origin, minutes):
+        self.origin = origin      # epoch seconds of minute 0
+        self.minutes = minutes    # {dimension value: values per minute}
+        self.periods = []
+
+    def get_metric_data(self, MetricDataQueries, StartTime, EndTime, ScanBy, NextToken=None):
+        anchor = epoch_seconds(StartTime) // 60 * 60
+        stop = epoch_seconds(EndTime)
+        results = []
+        for q in MetricDataQueries:
+            stat = q["MetricStat"]
+            period = stat["Period"]
+            self.periods.append(period)
+            dims = {d["Name"]: d["Value"] for d in stat["Metric"]["Dimensions"]}
+            values = next(self.minutes[v] for v in dims.values() if v in self.minutes)
+            reduce = self.STATS[stat["Stat"]]
+            timestamps, out = [], []
+            for bucket in range(anchor, stop, period):
+                lo = max(0, (bucket - self.origin) // 60)
+                hi = min(len(values), (bucket + period - self.origin) // 60)
+                if lo < hi:
+                    timestamps.append(datetime.fromtimestamp(bucket, UTC))
+                    out.append(float(reduce(values[lo:hi])))
+            results.append({"Id": q["Id"], "Timestamps": timestamps, "Values": out})
+        return {"MetricDataResults": results}
@@ -0,0 +1,104 @@
+import gzip
+import io
+import json
+from datetime import datetime, UTC
+
+import boto3
+import pytest
+from moto import mock_aws
+
+from cloudtrail_scanner import CHUNK_SIZE, day_prefixes, iter_records, scan_object, scan_state_events
+
+BUCKET = "trail-bucket"
+PREFIX = "AWSLogs/123456789012/CloudTrail/"
+
+
+def _event(name, when, *instance_ids, resources=True):
+    record = {
+        "eventSource": "ec2.amazonaws.com",
+        "eventName": name,
+        "eventTime": when,
+        "requestParameters": {"instancesSet": {"items": [{"instanceId": i} for i in instance_ids]}},
+    }
+    if resources:
+        record["resources"] = [{"resourceName": i} for i in instance_ids]
+    return record
+
+
+def _gz(records, **dump_kwargs):
+    return gzip.compress(json.dumps({"Records": records}, **dump_kwargs).encode())
+
+
+@pytest.fixture
+def s3():
+    with mock_aws():
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket=BUCKET)
+        yield client
+
+
+def test_day_prefixes_cover_each_region_and_day():
+    start = datetime(2025, 1, 30, 22, tzinfo=UTC)
+    end = datetime(2025, 2, 1, 1, tzinfo=UTC)
+    assert day_prefixes(PREFIX, ["eu-west-1", "us-east-1"], start, end) == [
+        f"{PREFIX}eu-west-1/2025/01/30/",
+        f"{PREFIX}eu-west-1/2025/01/31/",
+        f"{PREFIX}eu-west-1/2025/02/01/",
+        f"{PREFIX}us-east-1/2025/01/30/",
+        f"{PREFIX}us-east-1/2025/01/31/",
+        f"{PREFIX}us-east-1/2025/02/01/",
+    ]
+
+
+@pytest.mark.parametrize("chunk_size", [7, 64, CHUNK_SIZE])
+def test_iter_records_streams_across_chunk_boundaries(chunk_size):
+    # Records larger than the chunk, nested brackets and a "Records" lookalike inside a string
+    records = [
+        {"eventName": f"E{i}", "note": "[\"Records\"] ]," * (i % 5), "items": [[i], {"x": "]"}]}
+        for i in range(50)
+    ]
+    body = _gz(records, indent=2)
+    assert list(iter_records(io.BytesIO(body), chunk_size)) == records
+
+
+def test_iter_records_empty_and_missing_records():
+    assert list(iter_records(io.BytesIO(_gz([])))) == []
+    assert list(iter_records(io.BytesIO(gzip.compress(b'{"Other": 1}')))) == []
+
+
+def test_scan_object_matches_every_instance_in_the_set(s3):
+    records = [
+        _event("StopInstances", "2025-01-31T10:00:00Z", "i-a", "i-b", "i-c", resources=False),
+        _event("StartInstances", "2025-01-31T11:00:00Z", "i-b"),
+        _event("RunInstances", "2025-01-31T11:30:00Z", "i-a"),
+        {"eventSource": "s3.amazonaws.com", "eventName": "StopInstances", "eventTime": "2025-01-31T12:00:00Z"},
+        _event("TerminateInstances", "2025-02-02T00:00:00Z", "i-a"),
+    ]
+    s3.put_object(Bucket=BUCKET, Key="k.json.gz", Body=_gz(records))
+
+    end = datetime(2025, 2, 1, tzinfo=UTC)
+    found = scan_object(s3, BUCKET, "k.json.gz", {"i-a", "i-b"}, end=end)
+    assert sorted((iid, name) for iid, _, name in found) == [
+        ("i-a", "StopInstances"), ("i-b", "StartInstances"), ("i-b", "StopInstances"),
+    ]
+    everyone = scan_object(s3, BUCKET, "k.json.gz", None)
+    assert {iid for iid, _, _ in everyone} == {"i-a", "i-b", "i-c"}
+
+
+def test_scan_state_events_prunes_by_day_and_sorts(s3):
+    day1 = f"{PREFIX}eu-west-1/2025/01/31/"
+    day2 = f"{PREFIX}eu-west-1/2025/02/01/"
+    outside = f"{PREFIX}eu-west-1/2025/02/05/"
+    s3.put_object(Bucket=BUCKET, Key=f"{day2}b.json.gz",
+                  Body=_gz([_event("StartInstances", "2025-02-01T08:00:00Z", "i-a")]))
+    s3.put_object(Bucket=BUCKET, Key=f"{day1}a.json.gz",
+                  Body=_gz([_event("StopInstances", "2025-01-31T20:00:00Z", "i-a", "i-b")]))
+    s3.put_object(Bucket=BUCKET, Key=f"{day1}notes.txt", Body=b"not a log")
+    s3.put_object(Bucket=BUCKET, Key=f"{outside}c.json.gz",
+                  Body=_gz([_event("StopInstances", "2025-02-05T08:00:00Z", "i-a")]))
+
+    events = scan_state_events(s3, BUCKET, PREFIX, ["eu-west-1"],
+                               datetime(2025, 1, 31), datetime(2025, 2, 2), ["i-a", "i-b", "i-z"], max_workers=4)
+    assert [e["event"] for e in events["i-a"]] == ["StopInstances", "StartInstances"]
+    assert [e["event"] for e in events["i-b"]] == ["StopInstances"]
+    assert events["i-z"] == []
@@ -0,0 +1,48 @@
+from datetime import datetime, timedelta, UTC
+
+import numpy as np
+import pytest
+
+import ecs_alb_downtime
+from conftest import StubCloudWatch
+from cw_metrics import retention_segments
+from downtime_engine import compute_segments, epoch_seconds
+
+SERVICES = 40  # enough series that a full sweep takes more than one GetMetricData call
+HEALTHY_HOSTS = 2.0
+
+
+@pytest.fixture
+def window():
+    # Recent enough for 60s data throughout; start 25 minutes past the hour
+    end = datetime.now(UTC).replace(minute=0, second=0, microsecond=0) - timedelta(hours=2)
+    start = end - timedelta(days=3) + timedelta(minutes=25)
+    return start, end
+
+
+def test_coarse_matches_full_for_outage_late_in_unaligned_hour(window):
+    start, end = window
+    origin = epoch_seconds(start) // 3600 * 3600
+    n = (epoch_seconds(end) - origin) // 60
+    minutes = {f"tg-{i}": np.full(n, HEALTHY_HOSTS) for i in range(SERVICES)}
+    # 11:10-11:13 of some hour: inside the 10:25-11:25 bucket an unaligned hourly pass would
+    # file under 10:00, so the suspect window would miss it
+    outage = 30 * 60 + 10
+    minutes["tg-7"][outage:outage + 3] = 0.0
+    targets = {f"svc-{i}": (f"tg-{i}", "app/alb/1") for i in range(SERVICES)}
+
+    results = {}
+    for mode in ("full", "coarse"):
+        stub = StubCloudWatch(origin, minutes)
+        results[mode] = ecs_alb_downtime.get_downtime_series(targets, start, end, cw_client=stub, mode=mode)
+        if mode == "coarse":
+            assert 3600 in stub.periods  # the hourly pass ran; no fallback to full
+
+    segments = retention_segments(start, end, 60)
+    for svc in targets:
+        full_points, full_minutes = results["full"][svc]
+        coarse_points, coarse_minutes = results["coarse"][svc]
+        assert coarse_minutes == full_minutes
+        np.testing.assert_array_equal(compute_segments(coarse_points, segments).outages,
+                                      compute_segments(full_points, segments).outages)
+    assert results["coarse"]["svc-7"][1] == 3.0
@@ -0,0 +1,92 @@
+import time
+from email.utils import formatdate
+
+import pytest
+
+import gitlab_collector
+from gitlab_collector import GitLabAPIError, GitLabClient, retry_after_seconds
+
+
+def _paged(items, query, total_pages_header=True):
+    per_page, page = int(query["per_page"]), int(query.get("page", 1))
+    pages = max(1, -(-len(items) // per_page))
+    headers = {"X-Next-Page": page + 1 if page < pages else ""}
+    if total_pages_header:
+        headers["X-Total-Pages"] = pages
+    return 200, headers, items[(page - 1) * per_page:page * per_page]
+
+
+@pytest.fixture
+def client(local_server):
+    c = GitLabClient(local_server.url, "token", max_concurrency=4, per_page=3)
+    yield c
+    c.close()
+
+
+def test_retry_after_seconds_and_http_dates():
+    assert retry_after_seconds("7") == 7.0
+    assert 25 < retry_after_seconds(formatdate(time.time() + 30, usegmt=True)) <= 30
+    assert retry_after_seconds(formatdate(time.time() - 30, usegmt=True)) == 0.0
+    assert retry_after_seconds("soon") == gitlab_collector.DEFAULT_RETRY_AFTER
+
+
+@pytest.mark.parametrize("total_pages_header", [True, False])
+def test_get_all_pages_keeps_page_order(local_server, client, total_pages_header):
+    items = [{"id": i} for i in range(10)]
+    local_server.handler = lambda method, path, query, body: _paged(items, query, total_pages_header)
+
+    assert client.get_all_pages("/projects/1/pipelines", {"updated_after": "2025-01-01"}) == items
+    pages = sorted(int(q["page"]) for _, _, q, _ in local_server.requests)
+    assert pages == [1, 2, 3, 4]
+    assert all(q["updated_after"] == "2025-01-01" and q["per_page"] == "3" for _, _, q, _ in local_server.requests)
+
+
+@pytest.mark.parametrize("retry_after", ["0", formatdate(time.time() - 60, usegmt=True)])
+def test_429_with_retry_after_is_retried(local_server, client, retry_after):
+    calls = []
+
+    def handler(method, path, query, body):
+        calls.append(time.time())
+        if len(calls) == 1:
+            return 429, {"Retry-After": retry_after}, {"message": "429 Too Many Requests"}
+        return 200, {}, [{"id": 1}]
+
+    local_server.handler = handler
+    assert client.get("/projects").json() == [{"id": 1}]
+    # Neither form falls back to DEFAULT_RETRY_AFTER
+    assert len(calls) == 2 and calls[1] - calls[0] < 2
+
+
+def test_429_with_ratelimit_reset_waits_until_reset(local_server, client):
+    calls = []
+
+    def handler(method, path, query, body):
+        calls.append(time.time())
+        if len(calls) == 1:
+            return 429, {"RateLimit-Reset": int(time.time()) + 2}, {}
+        return 200, {}, {"ok": True}
+
+    local_server.handler = handler
+    assert client.get("/projects").json() == {"ok": True}
+    assert calls[1] - calls[0] >= 1
+
+
+def test_low_remaining_quota_pauses_the_next_request(local_server, client):
+    calls = []
+
+    def handler(method, path, query, body):
+        calls.append(time.time())
+        return 200, {"RateLimit-Remaining": 1, "RateLimit-Reset": time.time() + 1}, {}
+
+    local_server.handler = handler
+    client.get("/a")
+    client.get("/b")
+    assert calls[1] - calls[0] >= 0.8
+
+
+def test_gives_up_after_max_retries(local_server, client, monkeypatch):
+    monkeypatch.setattr(gitlab_collector, "MAX_RETRIES", 3)
+    local_server.handler = lambda method, path, query, body: (429, {"Retry-After": "0"}, {})
+    with pytest.raises(GitLabAPIError):
+        client.get("/projects")
+    assert len(local_server.requests) == 3
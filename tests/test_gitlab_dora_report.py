@@ -0,0 +1,101 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import gitlab_dora_report as report
+
+T0 = pd.Timestamp("2025-01-01", tz="UTC")
+
+
+def _iso(ts):
+    return ts.strftime("%Y-%m-%dT%H:%M:%S.000Z")
+
+
+@pytest.fixture
+def collected():
+    """collect_data()-shaped frames over three months, with team / project keys."""
+    rng = np.random.default_rng(7)
+    keys = [("payments", "acme/payments/api"), ("payments", "acme/payments/web"), ("ops", "acme/ops")]
+
+    def rows(n, **columns):
+        team, project = zip(*(keys[i] for i in rng.integers(0, len(keys), n)))
+        created = sorted(T0 + pd.to_timedelta(rng.integers(0, 90 * 1440, n), "min"))
+        return pd.DataFrame({"team": team, "project": project, "created_at": [_iso(t) for t in created],
+                             **{name: make(created) for name, make in columns.items()}})
+
+    deployments = rows(60, commit_time=lambda c: [_iso(t - pd.Timedelta(minutes=int(m)))
+                                                  for t, m in zip(c, rng.integers(5, 5000, len(c)))])
+    pipelines = rows(200, status=lambda c: rng.choice(["success", "failed", "canceled"], len(c)).tolist())
+    jobs = rows(500, duration=lambda c: rng.uniform(1, 900, len(c)).round(1).tolist())
+    incidents = rows(12, closed_at=lambda c: [_iso(t + pd.Timedelta(minutes=int(m)))
+                                              for t, m in zip(c, rng.integers(1, 600, len(c)))])
+    return deployments, pipelines, jobs, incidents
+
+
+# ---------- previous implementation (row-wise parsing and apply), kept as the reference ----------
+# Only adapted for current pandas: tz dropped before to_period, apply on the status column alone
+def loop_dora(deploy_df, pipeline_df, incident_df):
+    deploy_df, pipeline_df, incident_df = deploy_df.copy(), pipeline_df.copy(), incident_df.copy()
+    deploy_df["month"] = pd.to_datetime(deploy_df["created_at"]).dt.tz_convert(None).dt.to_period("M")
+    deploy_df["lead_time_hours"] = (
+        pd.to_datetime(deploy_df["created_at"]) - pd.to_datetime(deploy_df["commit_time"])
+    ).dt.total_seconds() / 3600
+    pipeline_df["month"] = pd.to_datetime(pipeline_df["created_at"]).dt.tz_convert(None).dt.to_period("M")
+    incident_df["month"] = pd.to_datetime(incident_df["created_at"]).dt.tz_convert(None).dt.to_period("M")
+    incident_df["mttr_minutes"] = (
+        pd.to_datetime(incident_df["closed_at"]) - pd.to_datetime(incident_df["created_at"])
+    ).dt.total_seconds() / 60
+
+    dora = deploy_df.groupby("month").agg(
+        prod_deployments=("created_at", "count"), lead_time_hours=("lead_time_hours", "median")
+    ).reset_index()
+    cfr = pipeline_df.groupby("month")[["status"]].apply(
+        lambda x: (x["status"] == "failed").mean() * 100
+    ).reset_index(name="change_failure_rate")
+    mttr = incident_df.groupby("month")["mttr_minutes"].mean().reset_index()
+    dora = dora.merge(cfr, on="month", how="left").merge(mttr, on="month", how="left")
+    dora["month"] = dora["month"].astype(str)
+    return dora
+
+
+def loop_cost(jobs_df):
+    jobs_df = jobs_df.copy()
+    jobs_df["month"] = pd.to_datetime(jobs_df["created_at"]).dt.tz_convert(None).dt.to_period("M")
+    jobs_df["ci_minutes"] = jobs_df["duration"] / 60
+    cost = jobs_df.groupby("month")["ci_minutes"].sum().reset_index()
+    cost["ci_cost"] = cost["ci_minutes"] * report.RUNNER_COST_PER_MINUTE
+    cost["month"] = cost["month"].astype(str)
+    return cost
+
+
+def test_monthly_results_match_previous_implementation(collected):
+    deployments, pipelines, jobs, incidents = collected
+    frames = report.prepare_frames(deployments, pipelines, jobs, incidents)
+
+    dora = report.calculate_dora(frames)
+    cost = report.calculate_cost(frames)
+    assert list(dora["month"]) == ["2025-01", "2025-02", "2025-03"]
+    pd.testing.assert_frame_equal(dora, loop_dora(deployments, pipelines, incidents), check_dtype=False)
+    pd.testing.assert_frame_equal(cost, loop_cost(jobs), check_dtype=False)
+
+    # Breakdowns add up to the monthly totals
+    by_team = report.calculate_dora(frames, ["team"])
+    assert by_team.groupby("month")["prod_deployments"].sum().tolist() == dora["prod_deployments"].tolist()
+
+
+def test_month_without_deployments_writes_a_summary(collected, tmp_path, monkeypatch):
+    deployments, pipelines, jobs, incidents = collected
+    # Pipelines ran in April, but nothing was deployed to prod
+    april = pipelines.assign(created_at=[_iso(pd.Timestamp("2025-04-02", tz="UTC"))] * len(pipelines))
+    monkeypatch.setattr(report, "INCREMENTAL", True)
+    monkeypatch.setattr(report, "collect_data_incremental", lambda: (deployments, april, jobs, incidents))
+    monkeypatch.setattr(report, "OUTPUT_ROOT", str(tmp_path))
+    monkeypatch.setattr(report, "START_DATE", "2025-04-01")
+    monkeypatch.setattr(report, "END_DATE", "2025-04-30")
+    monkeypatch.setattr(report, "REPORT_MONTH", "2025-04")
+
+    report.main()
+
+    out = tmp_path / "2025-04"
+    assert pd.read_csv(out / "dora_monthly.csv").empty
+    assert "No production deployments in 2025-04" in (out / "executive_summary.txt").read_text()
@@ -0,0 +1,130 @@
+import json
+import os
+
+import pandas as pd
+import pytest
+
+import gitlab_collector
+import gitlab_graphql
+from gitlab_collector import GitLabAPIError, GitLabClient
+
+# Saved responses for one group: 12 projects over two project pages, one project with a
+# second page of pipelines and one pipeline with a second page of jobs. The REST file
+# holds the same records as the v4 endpoints return them.
+DATA = os.path.join(os.path.dirname(__file__), "data", "gitlab")
+START, END = "2025-01-01", "2025-01-31"
+GRAPHQL_VARIABLES = {"env": "prod", "since": "2025-01-01T00:00:00Z", "until": "2025-01-31T00:00:00Z",
+                     "labels": ["type::incident", "env::prod"]}
+
+
+def _load(name):
+    with open(os.path.join(DATA, name), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def graphql_replay(method, path, query, body):
+    """Answers a POST to /api/graphql with the saved response recorded for exactly these variables."""
+    for entry in _load("graphql_responses.json"):
+        if entry["variables"] == body["variables"]:
+            return 200, {}, {"data": entry["data"]}
+    return 200, {}, {"errors": [{"message": f"no recorded response for {body['variables']}"}]}
+
+
+def rest_replay(method, path, query, body):
+    items = _load("rest_responses.json").get(path)
+    if items is None:
+        return 404, {}, {"message": "404 Not Found"}
+    per_page, page = int(query["per_page"]), int(query.get("page", 1))
+    pages = max(1, -(-len(items) // per_page))
+    return 200, {"X-Total-Pages": pages}, items[(page - 1) * per_page:page * per_page]
+
+
+@pytest.fixture
+def client(local_server):
+    c = GitLabClient(local_server.url, "token", max_concurrency=4, per_page=5)
+    yield c
+    c.close()
+
+
+def _graphql_bodies(server):
+    return [body for method, path, _, body in server.requests if path == "/api/graphql"]
+
+
+def test_query_arguments():
+    pipelines = gitlab_graphql.CONNECTIONS["pipelines"][1]
+    deployments = gitlab_graphql.CONNECTIONS["deployments"][1]
+    incidents = gitlab_graphql.CONNECTIONS["incidents"][1]
+    assert "pipelines(updatedAfter: $since, updatedBefore: $until," in pipelines
+    assert "environment(name: $env)" in deployments
+    assert "issues(labelName: $labels, createdAfter: $since, createdBefore: $until," in incidents
+    assert "projects(includeSubgroups: true," in gitlab_graphql.GROUP_QUERY
+    assert "$labels: [String]" in gitlab_graphql.GROUP_QUERY
+
+
+def test_follows_next_pages_of_projects_pipelines_and_jobs(local_server, client):
+    local_server.handler = graphql_replay
+
+    projects, deployments, pipelines, jobs, incidents = gitlab_graphql.collect(client, "acme", "prod", START, END)
+
+    bodies = _graphql_bodies(local_server)
+    assert len(bodies) == 4  # two project pages, one pipelines page, one jobs page
+    assert bodies[0]["variables"]["after"] is None and bodies[1]["variables"]["after"]
+    for b in bodies[:2]:
+        assert {k: b["variables"][k] for k in GRAPHQL_VARIABLES} == GRAPHQL_VARIABLES
+    follow_ups = {tuple(sorted(b["variables"])) for b in bodies[2:]}
+    assert follow_ups == {("path", "pipelinesAfter", "since", "until"), ("iid", "jobsAfter", "path")}
+
+    assert len(projects) == 12
+    first = projects[0]["id"]
+    assert len(pipelines[first]) == 25
+    assert sorted(len(js) for js in jobs.values())[-1] == 60
+    assert all(len(deployments[p["id"]]) == 3 and len(incidents[p["id"]]) == 2 for p in projects)
+
+
+def test_same_shapes_and_ids_as_rest(local_server, client):
+    local_server.handler = graphql_replay
+    from_graphql = gitlab_graphql.collect(client, "acme", "prod", START, END)
+    local_server.requests.clear()
+    local_server.handler = rest_replay
+    from_rest = gitlab_collector.collect(client, "acme", "prod", START, END)
+
+    rest_params = {path: q for _, path, q, _ in local_server.requests}
+    assert rest_params["/api/v4/projects/101/deployments"]["environment"] == "prod"
+    assert rest_params["/api/v4/projects/101/issues"]["labels"] == "type::incident,env::prod"
+    assert rest_params["/api/v4/projects/101/pipelines"]["updated_after"] == START
+
+    g_projects, g_deployments, g_pipelines, g_jobs, g_incidents = from_graphql
+    r_projects, r_deployments, r_pipelines, r_jobs, r_incidents = from_rest
+
+    def same(g_rows, r_rows, fields):
+        assert [row["id"] for row in g_rows] == [row["id"] for row in r_rows]
+        for g, r in zip(g_rows, r_rows):
+            for field in fields:
+                g_value, r_value = g[field], r[field]
+                if field.endswith("_at") and g_value is not None:
+                    g_value, r_value = pd.Timestamp(g_value), pd.Timestamp(r_value)
+                assert g_value == r_value, (field, g, r)
+
+    same(g_projects, r_projects, ["path_with_namespace"])
+    assert list(g_deployments) == list(r_deployments) == [p["id"] for p in r_projects]
+    for pid in r_deployments:
+        same(g_deployments[pid], r_deployments[pid], ["created_at", "updated_at"])
+        for g, r in zip(g_deployments[pid], r_deployments[pid]):
+            assert pd.Timestamp(g["deployable"]["commit"]["created_at"]) == \
+                pd.Timestamp(r["deployable"]["commit"]["created_at"])
+        same(g_pipelines[pid], r_pipelines[pid], ["iid", "status", "created_at", "updated_at"])
+        same(g_incidents[pid], r_incidents[pid], ["created_at", "closed_at", "updated_at"])
+    # Follow-up pages arrive later, so only the key sets match, not their order
+    assert set(g_jobs) == set(r_jobs)
+    for key in r_jobs:
+        same(g_jobs[key], r_jobs[key], ["created_at", "duration"])
+
+
+def test_unknown_group_is_an_error(local_server, client):
+    local_server.handler = lambda method, path, query, body: (200, {}, {"data": {"group": None}})
+
+    with pytest.raises(GitLabAPIError, match="my-group"):
+        gitlab_graphql.collect(client, "my-group", "prod", START, END)
+    with pytest.raises(GitLabAPIError):
+        gitlab_graphql.collect(client, None, "prod", START, END)
+    assert len(local_server.requests) == 1
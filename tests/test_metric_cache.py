@@ -0,0 +1,30 @@
+from datetime import datetime, timedelta, UTC
+
+import numpy as np
+
+from conftest import StubCloudWatch
+from cw_metrics import ec2_status_check_query, retention_segments
+from downtime_engine import epoch_seconds
+from metric_cache import MetricCache, fetch_cached
+
+SCOPE = ("123456789012", "eu-west-1")
+
+
+def test_windows_in_every_retention_tier_are_served_from_cache(tmp_path):
+    # 400 days: 5-minute, then hourly data; everything but the still-mutable hours is final
+    now = datetime.now(UTC)
+    end = now.replace(minute=0, second=0, microsecond=0) - timedelta(hours=6)
+    start = end - timedelta(days=400)
+    assert {p for *_, p in retention_segments(start, end, 300, now)} == {300, 3600}
+    origin = epoch_seconds(start) // 3600 * 3600
+    cw = StubCloudWatch(origin, {"i-1": np.zeros((epoch_seconds(end) - origin) // 60)})
+    queries = {"i-1": ec2_status_check_query("i-1", period=300)}
+    cache = MetricCache(str(tmp_path / "cache.sqlite"))
+
+    first = fetch_cached(cw, cache, queries, start, end, now=now, scope=SCOPE)
+    calls = len(cw.periods)
+    second = fetch_cached(cw, cache, queries, start, end, now=now, scope=SCOPE)
+    cache.close()
+
+    assert calls and len(cw.periods) == calls  # no refetch, including the part older than 45 days
+    assert second == first and first["i-1"][0][0] <= start + timedelta(hours=1)
@@ -0,0 +1,103 @@
+import json
+import os
+import shutil
+from datetime import datetime, timedelta, UTC
+
+import pytest
+
+from metric_stream import LocalSource, StreamState, iter_stream_records, minute_flags
+
+RECORDED = os.path.join(os.path.dirname(__file__), "data", "metric_stream")
+T0 = datetime(2025, 1, 1, tzinfo=UTC)
+HOUR_00 = os.path.join("2025", "01", "01", "00")
+HOUR_01 = os.path.join("2025", "01", "01", "01")
+LATE_KEY = os.path.join(HOUR_01, "downtime-stream-1-2025-01-01-01-00-00-cccc")
+SCOPE = "123456789012/eu-west-1"  # account and region of the recorded objects
+ECS, EC2 = f"ecs/{SCOPE}/orders/api", f"ec2/{SCOPE}/i-0abc"
+
+
+@pytest.fixture
+def stream_dir(tmp_path):
+    # Only the first hour is delivered at first
+    root = tmp_path / "stream"
+    shutil.copytree(os.path.join(RECORDED, HOUR_00), root / HOUR_00)
+    return root
+
+
+@pytest.fixture
+def state(tmp_path):
+    # The recorded minutes are older than RETENTION_DAYS; keep them
+    s = StreamState(str(tmp_path / "state.sqlite"), retention_days=100_000)
+    yield s
+    s.close()
+
+
+def test_decodes_plain_and_gzip_objects():
+    for name in sorted(os.listdir(os.path.join(RECORDED, HOUR_00))):
+        with open(os.path.join(RECORDED, HOUR_00, name), "rb") as f:
+            records = list(iter_stream_records(f))
+        assert records and all("metric_name" in r for r in records)
+
+    with open(os.path.join(RECORDED, HOUR_00, "downtime-stream-1-2025-01-01-00-10-00-bbbb"), "rb") as f:
+        flags = minute_flags(iter_stream_records(f))
+    # Per-AZ, zero-count and unmapped records are skipped
+    assert {res for res, *_ in flags} == {ECS, EC2}
+    assert sum(down for *_, down in flags) == 1
+
+
+def test_ingest_and_downtime(stream_dir, state):
+    source = LocalSource(str(stream_dir))
+    assert state.ingest(source) == 2
+    assert state.resources() == [f"alb/{SCOPE}/app/web/1/targetgroup/web/2", EC2, ECS]
+
+    ecs = state.downtime(ECS, T0, T0 + timedelta(minutes=10))
+    assert ecs.downtime_minutes == 2
+    assert len(ecs.outages) == 1 and ecs.gap_minutes == 0
+
+    ec2 = state.downtime(EC2, T0 + timedelta(minutes=5), T0 + timedelta(minutes=10))
+    assert ec2.downtime_minutes == 1
+
+
+def test_reingest_is_idempotent(stream_dir, state):
+    source = LocalSource(str(stream_dir))
+    state.ingest(source)
+    before = state.summary(T0, T0 + timedelta(minutes=10))
+
+    assert state.ingest(source) == 0
+    assert state.summary(T0, T0 + timedelta(minutes=10)) == before
+
+
+def test_late_delivery_cannot_clear_a_down_minute(stream_dir, state):
+    source = LocalSource(str(stream_dir))
+    state.ingest(source)
+
+    shutil.copytree(os.path.join(RECORDED, HOUR_01), stream_dir / HOUR_01)
+    assert source.keys(max(source.keys()[:2])) == [LATE_KEY]
+    assert state.ingest(source) == 1
+    assert state.ingest(source) == 0
+    assert state.downtime(ECS, T0, T0 + timedelta(minutes=10)).downtime_minutes == 2
+
+
+def test_same_names_in_other_accounts_and_regions_stay_apart(stream_dir, state):
+    # The same cluster / service, always running, from a second account and from a second region
+    records = [
+        {"metric_stream_name": "downtime-stream", "account_id": account, "region": region,
+         "namespace": "ECS/ContainerInsights", "metric_name": "RunningTaskCount",
+         "dimensions": {"ClusterName": "orders", "ServiceName": "api"},
+         "timestamp": int((T0 + timedelta(minutes=m)).timestamp() * 1000),
+         "value": {"max": 3.0, "min": 3.0, "sum": 3.0, "count": 1.0}, "unit": "Count"}
+        for account, region in [("210987654321", "eu-west-1"), ("123456789012", "us-east-1")]
+        for m in range(10)
+    ]
+    (stream_dir / HOUR_00 / "downtime-stream-1-2025-01-01-00-10-00-dddd").write_text(
+        "\n".join(json.dumps(r) for r in records) + "\n")
+    state.ingest(LocalSource(str(stream_dir)))
+
+    others = ["ecs/210987654321/eu-west-1/orders/api", "ecs/123456789012/us-east-1/orders/api"]
+    assert set(others) < set(state.resources())
+    assert state.downtime(ECS, T0, T0 + timedelta(minutes=10)).downtime_minutes == 2
+    for resource in others:
+        assert state.downtime(resource, T0, T0 + timedelta(minutes=10)).downtime_minutes == 0
+    scopes = {r: (a, g) for r, a, g in state.conn.execute("SELECT resource, account, region FROM resources")}
+    assert scopes[others[0]] == ("210987654321", "eu-west-1")
+    assert scopes[others[1]] == ("123456789012", "us-east-1")
@@ -0,0 +1,122 @@
+from datetime import datetime, timedelta, UTC
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import sorted_csv_ec2_ecs
+from conftest import StubCloudWatch
+from cw_metrics import ec2_status_check_query, retention_segments
+from downtime_engine import down_if_positive, epoch_seconds
+from sorted_csv_ec2_ecs import SegmentSeries, export_merged, frame_source, merge_sorted
+
+
+def chunked(ts, values, sizes):
+    """Lazily yields (ts, values) slices of the given sizes; records how far it was read."""
+    def gen():
+        i = 0
+        for n in sizes:
+            gen.pulled += 1
+            yield ts[i:i + n], values[i:i + n]
+            i += n
+    gen.pulled = 0
+    return gen
+
+
+def series(seed, n, grid=60):
+    rng = np.random.default_rng(seed)
+    ts = np.sort(rng.integers(0, n * grid, n)).astype(np.int64)  # repeated timestamps included
+    return ts, rng.random(n)
+
+
+def expected(all_series):
+    ts = np.concatenate([s[0] for s in all_series])
+    vals = np.concatenate([s[1] for s in all_series])
+    src = np.repeat(np.arange(len(all_series)), [len(s[0]) for s in all_series])
+    order = np.lexsort((src, ts))
+    return ts[order], vals[order], src[order]
+
+
+def merged(sources, batch_rows):
+    batches = list(merge_sorted(sources, batch_rows))
+    return tuple(np.concatenate([b[i] for b in batches]) for i in range(3))
+
+
+@pytest.mark.parametrize("batch_rows", [7, 100, 10_000])
+def test_merges_chunked_sources_in_time_then_source_order(batch_rows):
+    data = [series(1, 500), series(2, 50), series(3, 0), series(4, 300, grid=3)]
+    sizes = [[100] * 5, [1, 0, 49], [], [1] * 300]
+    sources = [("EC2", f"r{i}", chunked(*d, s)()) for i, (d, s) in enumerate(zip(data, sizes))]
+
+    for got, want in zip(merged(sources, batch_rows), expected(data)):
+        np.testing.assert_array_equal(got, want)
+
+
+def test_chunk_boundary_inside_a_run_of_equal_timestamps():
+    a = (np.array([0, 5, 5, 5, 5, 9], dtype=np.int64), np.arange(6.0))
+    b = (np.array([5, 5, 6], dtype=np.int64), np.arange(3.0) + 10)
+    sources = [("EC2", "a", chunked(*a, [2, 1, 1, 2])()), ("ECS", "b", chunked(*b, [1, 1, 1])())]
+
+    ts, vals, src = merged(sources, batch_rows=2)
+    np.testing.assert_array_equal(ts, [0, 5, 5, 5, 5, 5, 5, 6, 9])
+    np.testing.assert_array_equal(src, [0, 0, 0, 0, 0, 1, 1, 1, 0])
+    np.testing.assert_array_equal(vals, [0, 1, 2, 3, 4, 10, 11, 12, 5])
+
+
+def test_chunks_are_pulled_as_the_merge_advances():
+    ts, values = series(5, 1000)
+    gen = chunked(ts, values, [100] * 10)
+    batches = merge_sorted([("EC2", "i-1", gen())], batch_rows=100)
+
+    next(batches)
+    assert gen.pulled < 10
+    assert sum(len(b[0]) for b in batches) > 0
+    assert gen.pulled == 10
+
+
+def test_export_with_duplicate_resource_labels(tmp_path):
+    t0 = pd.Timestamp("2025-01-01", tz="UTC")
+    frames = [
+        pd.DataFrame({"Timestamp": t0 + pd.to_timedelta(np.arange(0, 600, 60), "s"), "Service": "ECS",
+                      "Resource": "prod/orders", "MetricValue": 1.0}),
+        pd.DataFrame({"Timestamp": t0 + pd.to_timedelta(np.arange(30, 630, 60), "s"), "Service": "EC2",
+                      "Resource": "i-1", "MetricValue": 0.0}),
+        # Same label as the first source, e.g. a second fetch of the same service
+        pd.DataFrame({"Timestamp": t0 + pd.to_timedelta(np.arange(600, 900, 60), "s"), "Service": "ECS",
+                      "Resource": "prod/orders", "MetricValue": 2.0}),
+    ]
+    path = tmp_path / "out.csv"
+
+    rows = export_merged([frame_source(df, chunk_rows=3) for df in frames], path, batch_rows=4)
+
+    out = pd.read_csv(path, parse_dates=["Timestamp"])
+    assert rows == len(out) == 25
+    assert out["Timestamp"].is_monotonic_increasing
+    assert (out["Resource"] == "prod/orders").sum() == 15
+    assert out.loc[out["Resource"] == "i-1", "Service"].eq("EC2").all()
+
+
+def test_segment_series_streams_what_the_getter_builds(tmp_path, monkeypatch):
+    # 70 days: hourly data beyond 63 days, 5-minute data after that
+    # Same retention reference as the getter's own datetime.now(UTC), up to a few milliseconds
+    now = datetime.now(UTC)
+    end = now.replace(second=0, microsecond=0) - timedelta(hours=1)
+    start = end - timedelta(days=70)
+    origin = epoch_seconds(start) // 3600 * 3600
+    failed = np.zeros((epoch_seconds(end) - origin) // 60)
+    failed[[100, 101, 40_000, 90_000, 90_001, 90_002]] = 1.0
+    cw = StubCloudWatch(origin, {"i-1": failed})
+    monkeypatch.setattr(sorted_csv_ec2_ecs, "get_client", lambda *args, **kwargs: cw)
+
+    df, expected = sorted_csv_ec2_ecs.get_ec2_timeline("i-1", "eu-west-1", start, end)
+    series = SegmentSeries(cw, ec2_status_check_query("i-1", period=300), "EC2", "i-1",
+                           start, end, down_if_positive, now=now)
+    assert len(retention_segments(start, end, 300, now)) == 2
+
+    rows = export_merged([series.source()], tmp_path / "streamed.csv")
+    export_merged([frame_source(df)], tmp_path / "built.csv")
+
+    assert rows == series.points == len(df)
+    assert (tmp_path / "streamed.csv").read_text() == (tmp_path / "built.csv").read_text()
+    assert series.result.downtime_minutes == expected.downtime_minutes > 0
+    np.testing.assert_array_equal(series.result.outages, expected.outages)